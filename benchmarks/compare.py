@@ -0,0 +1,79 @@
+import argparse
+import json
+import sys
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_s")
+
+
+def is_measurement(metric):
+    return metric.endswith("_s")
+
+
+def compare(old, new, threshold):
+    rows = []
+    regressions = []
+    for name, results in sorted(new["results"].items()):
+        before = old["results"].get(name, {})
+        for metric, value in sorted(results.items()):
+            if not is_measurement(metric) or metric not in before:
+                continue
+            previous = before[metric]
+            change = (value - previous) / previous if previous else 0.0
+            worse = -change if higher_is_better(metric) else change
+            flag = ""
+            if worse > threshold:
+                flag = "REGRESSION"
+                regressions.append("{}.{}".format(name, metric))
+            elif worse < -threshold:
+                flag = "improved"
+            rows.append(
+                (
+                    "{}.{}".format(name, metric),
+                    "{:.6g}".format(previous),
+                    "{:.6g}".format(value),
+                    "{:+.1%}".format(change),
+                    flag,
+                )
+            )
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.compare",
+        description="Compare two JSON reports from benchmarks.run.",
+    )
+    parser.add_argument("old", help="Baseline report.")
+    parser.add_argument("new", help="Report to check against the baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        help="Percent change counted as a regression (default: 10).",
+    )
+    options = parser.parse_args(argv)
+    with open(options.old) as fd:
+        old = json.load(fd)
+    with open(options.new) as fd:
+        new = json.load(fd)
+    rows, regressions = compare(old, new, options.threshold / 100.0)
+    labels = (old["meta"]["commit"] or "old", new["meta"]["commit"] or "new")
+    header = ("metric",) + tuple(x[:12] for x in labels) + ("change", "")
+    widths = [max(len(row[i]) for row in rows + [header]) for i in range(5)]
+    for row in [header] + rows:
+        print(
+            "  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+        )
+    if regressions:
+        print(
+            "\n{} regression(s): {}".format(
+                len(regressions), ", ".join(regressions)
+            )
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
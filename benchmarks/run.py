@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+import invoke
+import paramiko
+
+from fabric_forked import Config, Connection, ThreadingGroup, __version__
+
+from .server import Fleet, Link, Server
+
+
+MiB = 1024 * 1024
+
+
+def config():
+    return Config(
+        overrides={
+            "connect_kwargs": {
+                "password": "benchmark",
+                "allow_agent": False,
+                "look_for_keys": False,
+            },
+            "load_ssh_configs": False,
+        }
+    )
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "min_s": samples[0],
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": samples[-1],
+        "samples": len(samples),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def bench_connect(server, options):
+    samples = []
+    for _ in range(options.repeat):
+        cxn = Connection(server.host, config=config())
+        samples.append(timed(cxn.open))
+        cxn.close()
+    return summarize(samples)
+
+
+def bench_command(server, options):
+    with Connection(server.host, config=config()) as cxn:
+        cxn.run("true", hide=True)
+        samples = [
+            timed(cxn.run, "true", hide=True) for _ in range(options.repeat)
+        ]
+    return summarize(samples)
+
+
+def bench_fanout(fleet, options):
+    group = ThreadingGroup(*fleet.hosts, config=config())
+    try:
+        cold = timed(group.run, "true", hide=True)
+        warm = [
+            timed(group.run, "true", hide=True)
+            for _ in range(options.repeat)
+        ]
+    finally:
+        group.close()
+    hosts = len(fleet.hosts)
+    result = summarize(warm)
+    result.update(
+        hosts=hosts,
+        cold_s=cold,
+        cold_hosts_per_s=hosts / cold,
+        warm_hosts_per_s=hosts / result["median_s"],
+    )
+    return result
+
+
+def bench_sftp(server, options):
+    size = int(options.size * MiB)
+    with tempfile.TemporaryDirectory(prefix="fabric-bench-") as tmp:
+        source = os.path.join(tmp, "source")
+        with open(source, "wb") as fd:
+            fd.write(os.urandom(size))
+        remote = os.path.join(tmp, "remote")
+        local = os.path.join(tmp, "local")
+        with Connection(server.host, config=config()) as cxn:
+            cxn.open()
+            put = [
+                timed(cxn.put, source, remote) for _ in range(options.repeat)
+            ]
+            get = [
+                timed(cxn.get, remote, local) for _ in range(options.repeat)
+            ]
+    return {
+        "bytes": size,
+        "put_median_s": statistics.median(put),
+        "put_mb_per_s": size / MiB / statistics.median(put),
+        "get_median_s": statistics.median(get),
+        "get_mb_per_s": size / MiB / statistics.median(get),
+    }
+
+
+def free_port():
+    with closing(socket.socket()) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sink():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+
+    def serve():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            with sock:
+                received = 0
+                for data in iter(lambda: sock.recv(65536), b""):
+                    received += len(data)
+                sock.sendall(str(received).encode())
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener
+
+
+def send_through(port, payload):
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            sock = socket.create_connection(("127.0.0.1", port))
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+    with sock:
+        start = time.perf_counter()
+        sock.sendall(payload)
+        sock.shutdown(socket.SHUT_WR)
+        reply = b"".join(iter(lambda: sock.recv(64), b""))
+        elapsed = time.perf_counter() - start
+    if int(reply) != len(payload):
+        raise RuntimeError(
+            "Tunnel delivered {} of {} bytes".format(reply, len(payload))
+        )
+    return elapsed
+
+
+def bench_tunnel(server, options):
+    payload = os.urandom(int(options.size * MiB))
+    listener = sink()
+    target = listener.getsockname()[1]
+    samples = []
+    try:
+        with Connection(server.host, config=config()) as cxn:
+            for _ in range(options.repeat):
+                port = free_port()
+                with cxn.forward_local(
+                    port,
+                    remote_port=target,
+                    remote_host="127.0.0.1",
+                    local_host="127.0.0.1",
+                ):
+                    samples.append(send_through(port, payload))
+    finally:
+        listener.close()
+    median = statistics.median(samples)
+    return {
+        "bytes": len(payload),
+        "median_s": median,
+        "mb_per_s": len(payload) / MiB / median,
+    }
+
+
+BENCHMARKS = {
+    "connect": bench_connect,
+    "command": bench_command,
+    "fanout": bench_fanout,
+    "sftp": bench_sftp,
+    "tunnel": bench_tunnel,
+}
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark fabric_forked against local SSH servers.",
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="BENCHMARK",
+        help="Benchmarks to run ({}); default: all.".format(
+            ", ".join(BENCHMARKS)
+        ),
+    )
+    parser.add_argument(
+        "--hosts",
+        type=int,
+        default=20,
+        help="Number of servers started for the fan-out benchmark.",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="One-way latency added to every server link, in milliseconds.",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=None,
+        help="Bandwidth limit of every server link, in MiB/s, each way.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=10,
+        help="Samples taken per measurement.",
+    )
+    parser.add_argument(
+        "--size",
+        type=float,
+        default=16,
+        help="Payload size for SFTP and tunnel benchmarks, in MiB.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Write the JSON report to this file instead of stdout.",
+    )
+    options = parser.parse_args(argv)
+    unknown = set(options.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: {}".format(", ".join(unknown)))
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    link = Link(
+        latency=options.latency / 1000.0,
+        bandwidth=options.bandwidth * MiB if options.bandwidth else None,
+    )
+    report = {
+        "meta": {
+            "commit": commit(),
+            "fabric": __version__,
+            "paramiko": paramiko.__version__,
+            "invoke": invoke.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "latency_ms": options.latency,
+            "bandwidth_mib_s": options.bandwidth,
+            "hosts": options.hosts,
+            "repeat": options.repeat,
+            "size_mib": options.size,
+        },
+        "results": {},
+    }
+    names = options.benchmarks or list(BENCHMARKS)
+    with Server(link=link) as server:
+        for name in names:
+            print("Running {}...".format(name), file=sys.stderr)
+            if name == "fanout":
+                with Fleet(options.hosts, link=link) as fleet:
+                    result = bench_fanout(fleet, options)
+            else:
+                result = BENCHMARKS[name](server, options)
+            report["results"][name] = result
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, "w") as fd:
+            fd.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+import logging
+import os
+import select
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+
+import paramiko
+from paramiko import (
+    SFTPAttributes,
+    SFTPHandle,
+    SFTPServer,
+    SFTPServerInterface,
+    SFTP_OK,
+)
+
+
+# Clients dropping connections is routine here; don't log it as an error.
+logging.getLogger("benchmarks.server").setLevel(logging.CRITICAL)
+
+_host_key = None
+_host_key_lock = threading.Lock()
+
+
+def host_key():
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+
+class Link:
+    def __init__(self, latency=0.0, bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    @property
+    def shaped(self):
+        return bool(self.latency or self.bandwidth)
+
+    def __repr__(self):
+        return "<Link latency={}s bandwidth={}B/s>".format(
+            self.latency, self.bandwidth
+        )
+
+
+class ShapedPipe:
+    chunk_size = 65536
+
+    def __init__(self, src, dst, link):
+        self.src = src
+        self.dst = dst
+        self.link = link
+        self._queue = deque()
+        self._ready = threading.Condition()
+
+    def start(self):
+        for target in (self._read, self._write):
+            threading.Thread(target=target, daemon=True).start()
+
+    def _read(self):
+        while True:
+            try:
+                data = self.src.recv(self.chunk_size)
+            except OSError:
+                data = b""
+            with self._ready:
+                due = time.monotonic() + self.link.latency
+                self._queue.append((due, data))
+                self._ready.notify()
+            if not data:
+                return
+
+    def _write(self):
+        free = 0.0
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                due, data = self._queue.popleft()
+            if not data:
+                try:
+                    self.dst.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                return
+            if self.link.bandwidth:
+                due = max(due, free)
+                free = due + len(data) / self.link.bandwidth
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.dst.sendall(data)
+            except OSError:
+                return
+
+
+def shape(sock, link):
+    inner, outer = socket.socketpair()
+    ShapedPipe(sock, outer, link).start()
+    ShapedPipe(outer, sock, link).start()
+    return inner
+
+
+class Handle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        if attr.st_size is not None:
+            self.writefile.flush()
+            os.ftruncate(self.writefile.fileno(), attr.st_size)
+        return SFTP_OK
+
+
+class Filesystem(SFTPServerInterface):
+    def _error(self, e):
+        return SFTPServer.convert_errno(e.errno)
+
+    def list_folder(self, path):
+        try:
+            entries = []
+            for name in os.listdir(path):
+                attr = SFTPAttributes.from_stat(
+                    os.lstat(os.path.join(path, name))
+                )
+                attr.filename = name
+                entries.append(attr)
+            return entries
+        except OSError as e:
+            return self._error(e)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(path))
+        except OSError as e:
+            return self._error(e)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(path, flags, 0o666)
+        except OSError as e:
+            return self._error(e)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = Handle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            return self._error(e)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(oldpath, newpath)
+        except OSError as e:
+            return self._error(e)
+        return SFTP_OK
+
+    posix_rename = rename
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            return self._error(e)
+        return SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(path)
+        except OSError as e:
+            return self._error(e)
+        return SFTP_OK
+
+    def chattr(self, path, attr):
+        try:
+            if attr.st_mode is not None:
+                os.chmod(path, attr.st_mode)
+            if attr.st_size is not None:
+                os.truncate(path, attr.st_size)
+            if attr.st_atime is not None:
+                os.utime(path, (attr.st_atime, attr.st_mtime))
+        except OSError as e:
+            return self._error(e)
+        return SFTP_OK
+
+    def canonicalize(self, path):
+        return os.path.normpath(os.path.join(os.getcwd(), path))
+
+
+def pump_process(channel, process):
+    def forward(src, send):
+        while True:
+            data = os.read(src.fileno(), 32768)
+            if not data:
+                return
+            send(data)
+
+    def feed():
+        writing = True
+        while True:
+            try:
+                data = channel.recv(32768)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            if not writing:
+                # Discard input the process can no longer take, so the client
+                # isn't left waiting for window space.
+                continue
+            try:
+                process.stdin.write(data)
+                process.stdin.flush()
+            except OSError:
+                writing = False
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+    threads = [
+        threading.Thread(
+            target=forward, args=(process.stdout, channel.sendall)
+        ),
+        threading.Thread(
+            target=forward, args=(process.stderr, channel.sendall_stderr)
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    for thread in threads:
+        thread.join()
+    channel.send_exit_status(process.wait())
+    channel.shutdown_write()
+    # Close only once the client has sent EOF (or closed the channel
+    # itself, as Fabric does): a close sent straight away could overtake
+    # the reply to its exec request. OpenSSH clients wait for it.
+    feeder.join()
+    channel.close()
+
+
+def relay(channel, sock):
+    channel_eof = sock_eof = False
+    try:
+        while not (channel_eof and sock_eof):
+            readable = [] if channel_eof else [channel]
+            if not sock_eof:
+                readable.append(sock)
+            ready, _, _ = select.select(readable, [], [], 1)
+            if channel in ready:
+                data = channel.recv(65536)
+                if data:
+                    sock.sendall(data)
+                else:
+                    channel_eof = True
+                    sock.shutdown(socket.SHUT_WR)
+            if sock in ready:
+                data = sock.recv(65536)
+                if data:
+                    channel.sendall(data)
+                else:
+                    sock_eof = True
+                    channel.shutdown_write()
+    except OSError:
+        pass
+    finally:
+        channel.close()
+        sock.close()
+
+
+class BenchServer(paramiko.ServerInterface):
+    def __init__(self, transport):
+        self.transport = transport
+        self._targets = {}
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_env_request(self, *args):
+        return True
+
+    def _spawn(self, channel, command):
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        threading.Thread(
+            target=pump_process, args=(channel, process), daemon=True
+        ).start()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        return self._spawn(channel, command)
+
+    def check_channel_shell_request(self, channel):
+        return self._spawn(channel, "/bin/sh")
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        try:
+            sock = socket.create_connection(destination)
+        except OSError:
+            return paramiko.OPEN_FAILED_CONNECT_FAILED
+        threading.Thread(
+            target=self._relay_when_open, args=(chanid, sock), daemon=True
+        ).start()
+        return paramiko.OPEN_SUCCEEDED
+
+    def _relay_when_open(self, chanid, sock):
+        # The channel object only appears once the open has been answered.
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            channel = self.transport._channels.get(chanid)
+            if channel is not None and channel.active:
+                return relay(channel, sock)
+            time.sleep(0.001)
+        sock.close()
+
+
+class Server:
+    def __init__(self, port=0, link=None):
+        self.link = link or Link()
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(128)
+        self.port = self.sock.getsockname()[1]
+        self.accepted = 0
+        self.transports = []
+        self._closed = False
+
+    @property
+    def host(self):
+        return "127.0.0.1:{}".format(self.port)
+
+    def start(self):
+        host_key()
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(
+                target=self._handle, args=(sock,), daemon=True
+            ).start()
+
+    def _handle(self, sock):
+        # As OpenSSH does for interactive sessions; otherwise Nagle's
+        # algorithm holds back small replies for a delayed ACK (~40ms).
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.link.shaped:
+            sock = shape(sock, self.link)
+        transport = paramiko.Transport(sock)
+        transport.set_log_channel("benchmarks.server")
+        transport.add_server_key(host_key())
+        transport.set_subsystem_handler("sftp", SFTPServer, Filesystem)
+        self.transports.append(transport)
+        try:
+            transport.start_server(server=BenchServer(transport))
+        except (EOFError, paramiko.SSHException):
+            transport.close()
+
+    def close(self):
+        self._closed = True
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Fleet:
+    def __init__(self, size, link=None):
+        self.servers = [Server(link=link) for _ in range(size)]
+
+    @property
+    def hosts(self):
+        return [server.host for server in self.servers]
+
+    def start(self):
+        for server in self.servers:
+            server.start()
+        return self
+
+    def close(self):
+        for server in self.servers:
+            server.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
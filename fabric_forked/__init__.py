@@ -1,19 +1,27 @@
 from ._version import __version_info__, __version__
-from .connection import Connection
+from .connection import Connection, clear_gateway_cache
 from .config import Config
 from .runners import Remote, RemoteShell, Result
 from .group import Group, SerialGroup, ThreadingGroup, GroupResult
 from .tasks import task, Task
 from .executor import Executor
+from .pool import TransportPool
+from .health import HealthMonitor
+from .session import ShellSession
+from .aio import AsyncConnection, AsyncGroup
 
 __all__ = [
     '__version_info__', '__version__',
-    'Connection',
+    'Connection', 'clear_gateway_cache',
     'Config',
     'Remote', 'RemoteShell', 'Result',
     'Group', 'SerialGroup', 'ThreadingGroup', 'GroupResult',
     'task', 'Task',
-    'Executor'
+    'Executor',
+    'TransportPool',
+    'HealthMonitor',
+    'ShellSession',
+    'AsyncConnection', 'AsyncGroup'
 ]
 
 try:
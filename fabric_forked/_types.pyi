@@ -14,9 +14,13 @@ from paramiko.auth_strategy import AuthStrategy
 from paramiko.channel import Channel
 from paramiko.proxy import ProxyCommand
 
+from .capture import Capture
 from .config import Config
 from .connection import Connection
+from .health import HealthMonitor
+from .pool import TransportPool
 from .runners import Result as RunResult
+from .timing import TimingHook
 
 from os import PathLike
 from socket import SocketType
@@ -85,6 +89,10 @@ class InvokeConfigDefaultsRun(TypedDict):
     shell: str = ...
     warn: bool = False
     watchers: list[Any] = []
+    capture: Capture | None = None
+    event_driven: bool = True
+    read_chunk_size: int | None = None
+    sink: Callable[[Connection, str, str], None] | None = None
 
 class InvokeConfigDefaultsSudo(TypedDict):
     password: str | None
@@ -112,25 +120,62 @@ class _FabricConfigNamespace:
     connect_kwargs: 'ConnectKwargs'
     forward_agent: bool
     gateway: 'Gateway' | None
+    health_monitor: HealthMonitor | bool | None
     inline_ssh_env: bool
+    keepalive: 'FabricConfigDefaultsKeepalive'
     load_ssh_configs: bool
     port: str
+    proxy_jump: 'FabricConfigDefaultsProxyJump'
     ssh_config_path: PathLike[str] | None
+    timings: 'FabricConfigDefaultsTimings'
+    transfer: 'FabricConfigDefaultsTransfer'
+    transport_pool: TransportPool | bool | None
 
 
 class FabricConfigDefaultsAuth(TypedDict):
+    agent_ttl: float
     identities: list[tuple[str | None, str | None, int | None]]
     strategy_class: type[AuthStrategy]
 
+class FabricConfigDefaultsKeepalive(TypedDict):
+    interval: int | None
+    probe_after: float | None
+    probe_timeout: float
+
+class FabricConfigDefaultsProxyJump(TypedDict):
+    shared: bool
+    max_channels: int | None
+
+class FabricConfigDefaultsTimings(TypedDict):
+    hooks: list[TimingHook]
+
+class FabricConfigDefaultsTransfer(TypedDict):
+    chunk_size: int
+    delta_block_size: int
+    delta_threshold: int | None
+    hash_algorithm: str
+    hash_command: str | None
+    metadata_ttl: float | None
+    prefetch: int
+    relay_command: str
+    stripe_threshold: int
+    stripes: int
+
 class FabricConfigDefaults(InvokeConfig):
     authentication: 'FabricConfigDefaultsAuth'
     connect_kwargs: 'ConnectKwargs'
     forward_agent: bool = False
     gateway: 'Gateway' | None = None
+    health_monitor: HealthMonitor | bool | None
     inline_ssh_env: bool
+    keepalive: 'FabricConfigDefaultsKeepalive'
     load_ssh_configs: bool
     port: str
+    proxy_jump: 'FabricConfigDefaultsProxyJump'
     ssh_config_path: PathLike[str] | None
+    timings: 'FabricConfigDefaultsTimings'
+    transfer: 'FabricConfigDefaultsTransfer'
+    transport_pool: TransportPool | bool | None = None
 
 # ! CONNECTION TYPES
 
@@ -0,0 +1,493 @@
+import asyncio
+import codecs
+import re
+import sys
+from functools import partial
+from time import monotonic
+
+from invoke.exceptions import (
+    AuthFailure,
+    CommandTimedOut,
+    Failure,
+    ResponseNotAccepted,
+    UnexpectedExit,
+    WatcherError,
+)
+from invoke.runners import default_encoding, normalize_hide
+from invoke.watchers import FailingResponder
+from invoke import pty_size
+
+from .connection import Connection
+from .exceptions import GroupException
+from .group import GroupResult
+from .runners import Result
+from .timing import Timings
+
+
+class AsyncRemote:
+    read_chunk_size = 32768
+    allowed = (
+        "echo",
+        "echo_format",
+        "encoding",
+        "env",
+        "err_stream",
+        "hide",
+        "in_stream",
+        "out_stream",
+        "pty",
+        "replace_env",
+        "timeout",
+        "warn",
+        "watchers",
+    )
+
+    def __init__(self, connection, command, **kwargs):
+        self.connection = connection
+        self.command = command
+        self.opts = self._options(kwargs)
+        self.channel = None
+        self.stdout = []
+        self.stderr = []
+        self.timed_out = False
+        self.watcher_error = None
+        self.timings = None
+        self._queue = None
+        self._loop = None
+        self._timer = None
+        self._stdin = None
+        self._readers = None
+        self._started = None
+        self._session = None
+        self._done = False
+        self._result = None
+        encoding = self.opts["encoding"]
+        self._decoders = {
+            name: codecs.getincrementaldecoder(encoding)(errors="replace")
+            for name in ("stdout", "stderr")
+        }
+
+    def _options(self, kwargs):
+        unexpected = [key for key in kwargs if key not in self.allowed]
+        if unexpected:
+            err = "run() got unexpected keyword arguments: {!r}"
+            raise TypeError(err.format(unexpected))
+        config = self.connection.config
+        opts = {}
+        for key in self.allowed:
+            if key in kwargs:
+                opts[key] = kwargs[key]
+            elif key == "timeout":
+                opts[key] = config.timeouts.command
+            else:
+                opts[key] = config.run.get(key)
+        opts["hide"] = normalize_hide(opts["hide"])
+        opts["encoding"] = opts["encoding"] or default_encoding()
+        opts["watchers"] = list(opts["watchers"] or ())
+        opts["env"] = dict(opts["env"] or {})
+        if opts["replace_env"] is None:
+            opts["replace_env"] = True
+        return opts
+
+    async def start(self):
+        await self.connection.open()
+        cxn = self.connection.connection
+        self.timings = Timings(
+            cxn, cxn.config.timings.hooks, base=cxn._take_open_timings()
+        )
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        if self.opts["echo"]:
+            template = self.opts["echo_format"] or "\033[1;37m{command}\033[0m"
+            print(template.format(command=self.command))
+        self._session = self.connection._get_sessions()
+        if self._session is not None:
+            await self._session.acquire()
+        try:
+            self.channel = await self._loop.run_in_executor(
+                None, self._open_channel
+            )
+        except BaseException:
+            self._release_session()
+            raise
+        try:
+            self._loop.add_reader(self.channel.fileno(), self._on_readable)
+        except NotImplementedError:
+            # Loops that can't watch arbitrary descriptors (such as the
+            # Windows proactor loop) get a blocking reader per stream on the
+            # default executor instead, as Remote uses threads.
+            self._readers = asyncio.gather(
+                *[
+                    self._loop.run_in_executor(None, self._read, name)
+                    for name in ("stdout", "stderr")
+                ]
+            )
+            self._readers.add_done_callback(lambda _: self._finish())
+        if self.opts["timeout"]:
+            self._timer = self._loop.call_later(
+                self.opts["timeout"], self._on_timeout
+            )
+        data = self.opts["in_stream"]
+        if data is not None and data is not False:
+            if hasattr(data, "read"):
+                data = data.read()
+            if isinstance(data, str):
+                data = data.encode(self.opts["encoding"])
+            self._stdin = self._loop.run_in_executor(
+                None, self._send_input, data
+            )
+        return self
+
+    def _open_channel(self):
+        with self.timings.phase("channel"):
+            channel = self.connection.connection.create_session()
+        command = self.command
+        if self.opts["pty"]:
+            cols, rows = pty_size()
+            channel.get_pty(width=cols, height=rows)
+        env = self.opts["env"]
+        if not self.opts["replace_env"]:
+            env = dict(self.connection.config.run.env or {}, **env)
+        if env:
+            if self.connection.inline_ssh_env:
+                parameters = " ".join(
+                    ["{}={}".format(k, v) for k, v in sorted(env.items())]
+                )
+                command = "export {} && {}".format(parameters, command)
+            else:
+                channel.update_environment(env)
+        self._started = monotonic()
+        channel.exec_command(command)
+        return channel
+
+    def _close(self):
+        self.channel.close()
+        self._release_session()
+        self.connection.connection._invalidate_metadata()
+
+    def _release_session(self):
+        if self._session is not None:
+            self._session.release()
+            self._session = None
+
+    def _send_input(self, data):
+        self.channel.sendall(data)
+        self.channel.shutdown_write()
+
+    def _read(self, name):
+        channel = self.channel
+        recv = channel.recv if name == "stdout" else channel.recv_stderr
+        while True:
+            data = recv(self.read_chunk_size)
+            if not data:
+                return
+            self._loop.call_soon_threadsafe(self._handle, name, data)
+
+    def _on_readable(self):
+        channel = self.channel
+        while channel.recv_ready():
+            self._handle("stdout", channel.recv(self.read_chunk_size))
+        while channel.recv_stderr_ready():
+            self._handle("stderr", channel.recv_stderr(self.read_chunk_size))
+        if (
+            channel.closed or channel.eof_received
+        ) and not channel.recv_ready():
+            self._finish()
+
+    def _handle(self, name, data):
+        if self._done:
+            return
+        text = self._decoders[name].decode(data)
+        if not text:
+            return
+        buffer = self.stdout if name == "stdout" else self.stderr
+        buffer.append(text)
+        self._queue.put_nowait((name, text))
+        if not self.opts["watchers"] or self.watcher_error is not None:
+            return
+        stream = "".join(buffer)
+        try:
+            for watcher in self.opts["watchers"]:
+                for response in watcher.submit(stream):
+                    self.channel.sendall(
+                        response.encode(self.opts["encoding"])
+                    )
+        except WatcherError as e:
+            self.watcher_error = e
+            self._finish()
+
+    def _on_timeout(self):
+        self.timed_out = True
+        self._finish()
+
+    def _finish(self):
+        if self._done:
+            return
+        self._done = True
+        if self._readers is None:
+            self._loop.remove_reader(self.channel.fileno())
+        if self._timer is not None:
+            self._timer.cancel()
+        for name, decoder in self._decoders.items():
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                buffer = self.stdout if name == "stdout" else self.stderr
+                buffer.append(tail)
+                self._queue.put_nowait((name, tail))
+        self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.channel is None:
+            await self.start()
+        item = await self._queue.get()
+        if item is None:
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+        return item
+
+    async def wait(self):
+        if self._result is not None:
+            return self._result
+        async for _ in self:
+            pass
+        channel = self.channel
+        try:
+            if self.timed_out or self.watcher_error is not None:
+                exited = -1
+            elif channel.exit_status_ready():
+                exited = channel.exit_status
+            else:
+                exited = await self._loop.run_in_executor(
+                    None, channel.recv_exit_status
+                )
+            ended = self.timings.record("command", self._started)
+        finally:
+            self._close()
+        for future in (self._stdin, self._readers):
+            if future is not None:
+                try:
+                    await future
+                except (EOFError, OSError):
+                    pass
+        self.timings.record("drain", ended)
+        self._result = Result(
+            connection=self.connection.connection,
+            stdout="".join(self.stdout),
+            stderr="".join(self.stderr),
+            encoding=self.opts["encoding"],
+            command=self.command,
+            shell="",
+            env=self.opts["env"],
+            exited=exited,
+            pty=bool(self.opts["pty"]),
+            hide=self.opts["hide"],
+            timings=self.timings,
+        )
+        if self.watcher_error is not None:
+            raise Failure(self._result, reason=self.watcher_error)
+        if self.timed_out:
+            raise CommandTimedOut(self._result, timeout=self.opts["timeout"])
+        if not (self._result.ok or self.opts["warn"]):
+            raise UnexpectedExit(self._result)
+        return self._result
+
+    async def run(self):
+        streams = {
+            "stdout": self.opts["out_stream"] or sys.stdout,
+            "stderr": self.opts["err_stream"] or sys.stderr,
+        }
+        try:
+            async for name, text in self:
+                if name not in self.opts["hide"]:
+                    streams[name].write(text)
+                    streams[name].flush()
+        except BaseException:
+            if self.channel is not None:
+                self._finish()
+                self._close()
+            raise
+        return await self.wait()
+
+
+class AsyncConnection:
+    def __init__(
+        self, host=None, connection=None, max_sessions=None, **kwargs
+    ):
+        if connection is None:
+            connection = Connection(host, **kwargs)
+        elif host is not None or kwargs:
+            raise ValueError(
+                "Give either a Connection or the arguments for one, not both!"
+            )
+        self.connection = connection
+        self.max_sessions = max_sessions
+        self._opening = None
+        self._sessions = None
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def __repr__(self):
+        return "<Async{}".format(repr(self.connection)[1:])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_sessions(self):
+        if self.max_sessions and self._sessions is None:
+            self._sessions = asyncio.Semaphore(self.max_sessions)
+        return self._sessions
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+    async def open(self):
+        if self._opening is None:
+            self._opening = asyncio.Lock()
+        async with self._opening:
+            if self.connection.is_connected:
+                return None
+            return await self._call(self.connection.open)
+
+    async def close(self):
+        return await self._call(self.connection.close)
+
+    def stream(self, command, **kwargs):
+        command = self.connection._prefix_commands(command)
+        return AsyncRemote(self, command, **kwargs)
+
+    async def run(self, command, **kwargs):
+        return await self.stream(command, **kwargs).run()
+
+    async def sudo(self, command, **kwargs):
+        config = self.connection.config
+        prompt = config.sudo.prompt
+        password = kwargs.pop("password", config.sudo.password)
+        user = kwargs.pop("user", config.sudo.user)
+        env = kwargs.get("env", {})
+        user_flags = ""
+        if user is not None:
+            user_flags = "-H -u {} ".format(user)
+        env_flags = ""
+        if env:
+            env_flags = "--preserve-env='{}' ".format(",".join(env.keys()))
+        command = self.connection._prefix_commands(command)
+        cmd_str = "sudo -S -p '{}' {}{}{}".format(
+            prompt, env_flags, user_flags, command
+        )
+        watcher = FailingResponder(
+            pattern=re.escape(prompt),
+            response="{}\n".format(password),
+            sentinel="Sorry, try again.\n",
+        )
+        watchers = kwargs.pop("watchers", list(config.run.watchers))
+        watchers.append(watcher)
+        try:
+            return await AsyncRemote(
+                self, cmd_str, watchers=watchers, **kwargs
+            ).run()
+        except Failure as failure:
+            if isinstance(failure.reason, ResponseNotAccepted):
+                raise AuthFailure(result=failure.result, prompt=prompt)
+            raise
+
+    async def put(self, *args, **kwargs):
+        return await self._call(self.connection.put, *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._call(self.connection.get, *args, **kwargs)
+
+    async def put_tree(self, *args, **kwargs):
+        return await self._call(self.connection.put_tree, *args, **kwargs)
+
+    async def get_tree(self, *args, **kwargs):
+        return await self._call(self.connection.get_tree, *args, **kwargs)
+
+
+class AsyncGroup(list):
+    def __init__(self, *hosts, max_workers=None, **kwargs):
+        self.max_workers = max_workers
+        self.extend([AsyncConnection(host, **kwargs) for host in hosts])
+
+    @classmethod
+    def from_connections(cls, connections, **kwargs):
+        group = cls(**kwargs)
+        group.extend(
+            x if isinstance(x, AsyncConnection) else AsyncConnection(
+                connection=x
+            )
+            for x in connections
+        )
+        return group
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_kwargs(self, args, kwargs):
+        if len(args) < 2 and "local" not in kwargs:
+            kwargs["local"] = "{host}/"
+        return kwargs
+
+    async def as_completed(self, method, *args, **kwargs):
+        semaphore = asyncio.Semaphore(self.max_workers or len(self) or 1)
+
+        async def call(cxn):
+            async with semaphore:
+                try:
+                    result = await getattr(cxn, method)(*args, **kwargs)
+                except Exception as e:
+                    result = e
+            return cxn, result
+
+        for future in asyncio.as_completed([call(x) for x in self]):
+            yield await future
+
+    async def _do(self, method, *args, **kwargs):
+        results = GroupResult()
+        excepted = False
+        async for cxn, result in self.as_completed(method, *args, **kwargs):
+            results[cxn.connection] = result
+            if isinstance(result, BaseException):
+                excepted = True
+        if excepted:
+            raise GroupException(results)
+        return results
+
+    async def run(self, *args, **kwargs):
+        return await self._do("run", *args, **kwargs)
+
+    def run_iter(self, *args, **kwargs):
+        return self.as_completed("run", *args, **kwargs)
+
+    async def sudo(self, *args, **kwargs):
+        return await self._do("sudo", *args, **kwargs)
+
+    def sudo_iter(self, *args, **kwargs):
+        return self.as_completed("sudo", *args, **kwargs)
+
+    async def put(self, *args, **kwargs):
+        return await self._do("put", *args, **kwargs)
+
+    def put_iter(self, *args, **kwargs):
+        return self.as_completed("put", *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        kwargs = self._get_kwargs(args, kwargs)
+        return await self._do("get", *args, **kwargs)
+
+    def get_iter(self, *args, **kwargs):
+        kwargs = self._get_kwargs(args, kwargs)
+        return self.as_completed("get", *args, **kwargs)
+
+    async def close(self):
+        await asyncio.gather(*[cxn.close() for cxn in self])
@@ -0,0 +1,366 @@
+"""
+`asyncio` front-ends for `.Connection` and `.Group`.
+"""
+
+import asyncio
+import codecs
+
+from invoke.exceptions import WatcherError
+from paramiko.channel import Channel
+
+from typing_extensions import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Self,
+    TypeVar,
+    Unpack,
+)
+
+from .connection import Connection, RunKwargs
+from .group import GroupResult
+from .runners import Result
+from .timing import Timings
+from .transfer import Result as TransferResult, TreeResult
+
+_T = TypeVar("_T")
+
+
+class AsyncRemote:
+    """
+    Run one remote command without tying up a thread while it runs.
+
+    The asynchronous counterpart of `.Remote`, used by
+    `AsyncConnection.run`, `AsyncConnection.sudo` and
+    `AsyncConnection.stream`. The session channel is opened (one or two
+    network round trips) on the event loop's default executor. After that, the
+    channel's file descriptor is registered with the event loop via
+    `~asyncio.loop.add_reader` and output is consumed as it arrives. No thread
+    is held for the lifetime of the command.
+
+    Event loops without ``add_reader`` support (notably the default
+    `~asyncio.ProactorEventLoop` on Windows) fall back to reading stdout and
+    stderr with blocking calls on the default executor, which holds two of
+    its threads per running command.
+
+    As with `.Connection.run`, results carry `.Timings` (reported to the
+    ``timings.hooks`` configured) and running a command invalidates the
+    connection's `.RemoteMetadataCache`.
+
+    Instances are async iterators of ``(stream_name, text)`` tuples, where
+    ``stream_name`` is ``"stdout"`` or ``"stderr"`` and ``text`` is decoded
+    output. Use `wait` for the final `.Result`::
+
+        proc = cxn.stream("tail -n 100 /var/log/syslog")
+        async for name, text in proc:
+            handle(name, text)
+        result = await proc.wait()
+
+    .. versionadded:: 3.3
+    """
+
+    read_chunk_size: int
+    """
+    Maximum number of bytes read from the channel per ``recv`` call.
+    """
+
+    allowed: tuple[str, ...]
+    """
+    Keyword arguments accepted, with the same meaning as for
+    `.Connection.run`: ``echo``, ``echo_format``, ``encoding``, ``env``,
+    ``err_stream``, ``hide``, ``in_stream``, ``out_stream``, ``pty``,
+    ``replace_env``, ``timeout``, ``warn`` and ``watchers``. Those not given
+    fall back to the ``run.*`` (and ``timeouts.command``) configuration.
+
+    ``in_stream`` differs slightly: it may be a string, bytes or a file-like
+    object, which is read in full and sent to the command's stdin, followed
+    by end-of-file. The default (``None``) sends nothing, because there is no
+    terminal to forward.
+    """
+
+    connection: AsyncConnection
+    command: str
+    opts: dict[str, Any]
+    channel: Channel | None
+    stdout: list[str]
+    stderr: list[str]
+    timed_out: bool
+    watcher_error: WatcherError | None
+    timings: Timings | None
+    """
+    The command's `.Timings`, created when it starts.
+    """
+
+    _queue: asyncio.Queue[tuple[str, str] | None] | None
+    _loop: asyncio.AbstractEventLoop | None
+    _timer: asyncio.TimerHandle | None
+    _stdin: asyncio.Future[None] | None
+    _readers: asyncio.Future[list[None]] | None
+    _started: float | None
+    _session: asyncio.Semaphore | None
+    _done: bool
+    _result: Result | None
+    _decoders: dict[str, codecs.IncrementalDecoder]
+
+    def __init__(self,
+        connection: AsyncConnection,
+        command: str,
+        **kwargs: Unpack[RunKwargs]
+    ) -> None: ...
+
+    def _options(self, kwargs: dict[str, Any]) -> dict[str, Any]: ...
+
+    async def start(self) -> Self:
+        """
+        Open the session channel and start the command.
+
+        Called implicitly by iteration, `wait` and `run`.
+        """
+        ...
+
+    def _open_channel(self) -> Channel: ...
+
+    def _close(self) -> None: ...
+
+    def _release_session(self) -> None: ...
+
+    def _send_input(self, data: bytes) -> None: ...
+
+    def _read(self, name: str) -> None: ...
+
+    def _on_readable(self) -> None: ...
+
+    def _handle(self, name: str, data: bytes) -> None: ...
+
+    def _on_timeout(self) -> None: ...
+
+    def _finish(self) -> None: ...
+
+    def __aiter__(self) -> Self: ...
+
+    async def __anext__(self) -> tuple[str, str]: ...
+
+    async def wait(self) -> Result:
+        """
+        Wait for the command to exit and return its `.Result`.
+
+        Output not consumed by iteration is still captured on the result.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` on a nonzero exit status
+            (unless ``warn`` is set), `~invoke.exceptions.CommandTimedOut`
+            if ``timeout`` expired, or `~invoke.exceptions.Failure` wrapping
+            a watcher's `~invoke.exceptions.WatcherError`.
+        """
+        ...
+
+    async def run(self) -> Result:
+        """
+        Start the command, echo its output as `.Remote` would, and return
+        `wait`'s result.
+
+        Output is written to ``out_stream``/``err_stream`` (default:
+        `sys.stdout`/`sys.stderr`) unless hidden.
+        """
+        ...
+
+
+class AsyncConnection:
+    """
+    Awaitable wrapper around a `.Connection`.
+
+    Commands run through `AsyncRemote`, so a single event loop thread can
+    have thousands of commands in flight. Connecting, SFTP transfers and
+    channel setup still use blocking Paramiko APIs, so those steps run on the
+    event loop's default executor. Size that executor (see
+    `~asyncio.loop.set_default_executor`) to match how many connections or
+    transfers you start at once.
+
+    Anything not defined here (``host``, ``config``, `.Connection.cd`,
+    `.Connection.prefix` and so on) is looked up on the wrapped connection,
+    and command prefixes set via those context managers apply as usual.
+
+    .. versionadded:: 3.3
+    """
+
+    connection: Connection
+    max_sessions: int | None
+    _opening: asyncio.Lock | None
+    _sessions: asyncio.Semaphore | None
+
+    def __init__(self,
+        host: str | None = None,
+        connection: Connection | None = None,
+        max_sessions: int | None = None,
+        **kwargs: Any
+    ) -> None:
+        """
+        :param str host:
+            Passed, along with any other keyword arguments, to `.Connection`
+            to create the wrapped connection.
+
+        :param connection:
+            An existing `.Connection` to wrap instead. It can't be combined
+            with ``host`` or other keyword arguments.
+
+        :param int max_sessions:
+            Maximum number of commands to run at once over this connection;
+            the rest wait their turn. OpenSSH servers refuse more than
+            ``MaxSessions`` (default ``10``) concurrent sessions per
+            connection. Default: ``None`` (no limit).
+        """
+        ...
+
+    def __getattr__(self, name: str) -> Any: ...
+
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(self, *exc: Any) -> None: ...
+
+    def _get_sessions(self) -> asyncio.Semaphore | None: ...
+
+    async def _call(self, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T: ...
+
+    async def open(self) -> None:
+        """
+        Await `.Connection.open`. Concurrent callers share one attempt.
+        """
+        ...
+
+    async def close(self) -> None:
+        """
+        Await `.Connection.close`.
+        """
+        ...
+
+    def stream(self, command: str, **kwargs: Unpack[RunKwargs]) -> AsyncRemote:
+        """
+        Return an `AsyncRemote` for ``command``, to be iterated for output.
+
+        Nothing is printed; the caller consumes the output.
+        """
+        ...
+
+    async def run(self, command: str, **kwargs: Unpack[RunKwargs]) -> Result:
+        """
+        Execute a shell command on the remote end; see `.Connection.run`.
+        """
+        ...
+
+    async def sudo(self, command: str, **kwargs: Unpack[RunKwargs]) -> Result:
+        """
+        Execute a shell command via ``sudo`` on the remote end, answering
+        its password prompt exactly as `.Connection.sudo` does.
+        """
+        ...
+
+    async def put(self, *args: Any, **kwargs: Any) -> TransferResult:
+        """
+        Await `.Connection.put`, run on the default executor.
+        """
+        ...
+
+    async def get(self, *args: Any, **kwargs: Any) -> TransferResult:
+        """
+        Await `.Connection.get`, run on the default executor.
+        """
+        ...
+
+    async def put_tree(self, *args: Any, **kwargs: Any) -> TreeResult: ...
+
+    async def get_tree(self, *args: Any, **kwargs: Any) -> TreeResult: ...
+
+
+class AsyncGroup(list[AsyncConnection]):
+    """
+    A collection of `AsyncConnection` objects operated on concurrently.
+
+    The asynchronous counterpart of `.ThreadingGroup`: each method runs its
+    operation on every member as a task on the current event loop, and
+    results are collected into a `.GroupResult` keyed by the members'
+    underlying `.Connection` objects. A `.GroupException` is raised if any of
+    them failed.
+
+    .. versionadded:: 3.3
+    """
+
+    max_workers: int | None
+
+    def __init__(self, *hosts: str, max_workers: int | None = None, **kwargs: Any) -> None:
+        """
+        :param max_workers:
+            Maximum number of members operated on at once. Default: ``None``
+            (all of them).
+
+        Other keyword arguments are passed to each `AsyncConnection`.
+        """
+        ...
+
+    @classmethod
+    def from_connections(cls,
+        connections: Iterable[Connection | AsyncConnection],
+        **kwargs: Any
+    ) -> Self:
+        """
+        Create a new group from an iterable of connections, wrapping plain
+        `.Connection` objects in `AsyncConnection`.
+        """
+        ...
+
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(self, *exc: Any) -> None: ...
+
+    def _get_kwargs(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, Any]: ...
+
+    def as_completed(self, method: str, *args: Any, **kwargs: Any) -> AsyncIterator[tuple[AsyncConnection, Any]]:
+        """
+        Call ``method`` on every member, yielding ``(connection, result)``
+        pairs as each finishes.
+
+        Exceptions are yielded in place of results rather than raised.
+        """
+        ...
+
+    async def _do(self, method: str, *args: Any, **kwargs: Any) -> GroupResult: ...
+
+    async def run(self, *args: Any, **kwargs: Any) -> GroupResult:
+        """
+        Executes `AsyncConnection.run` on all member connections.
+        """
+        ...
+
+    def run_iter(self, *args: Any, **kwargs: Any) -> AsyncIterator[tuple[AsyncConnection, Result | Exception]]: ...
+
+    async def sudo(self, *args: Any, **kwargs: Any) -> GroupResult:
+        """
+        Executes `AsyncConnection.sudo` on all member connections.
+        """
+        ...
+
+    def sudo_iter(self, *args: Any, **kwargs: Any) -> AsyncIterator[tuple[AsyncConnection, Result | Exception]]: ...
+
+    async def put(self, *args: Any, **kwargs: Any) -> GroupResult:
+        """
+        Executes `AsyncConnection.put` on all member connections.
+        """
+        ...
+
+    def put_iter(self, *args: Any, **kwargs: Any) -> AsyncIterator[tuple[AsyncConnection, TransferResult | Exception]]: ...
+
+    async def get(self, *args: Any, **kwargs: Any) -> GroupResult:
+        """
+        Executes `AsyncConnection.get` on all member connections.
+
+        As with `.Group.get`, ``local`` defaults to ``"{host}/"``.
+        """
+        ...
+
+    def get_iter(self, *args: Any, **kwargs: Any) -> AsyncIterator[tuple[AsyncConnection, TransferResult | Exception]]: ...
+
+    async def close(self) -> None:
+        """
+        Close all member connections.
+        """
+        ...
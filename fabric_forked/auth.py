@@ -1,6 +1,9 @@
+import os
+import time
 from functools import partial
 from getpass import getpass
 from pathlib import Path
+from threading import Lock
 
 from paramiko import Agent, PKey
 from paramiko.auth_strategy import (
@@ -10,21 +13,117 @@ from paramiko.auth_strategy import (
     OnDiskPrivateKey,
 )
 
-from .util import win32
+from .util import debug, win32
+
+
+class SharedAgent(Agent):
+    def __init__(self):
+        self._lock = Lock()
+        super().__init__()
+
+    def _send_message(self, msg):
+        with self._lock:
+            return super()._send_message(msg)
+
+
+class KeyCache:
+    def __init__(self):
+        self._keys = {}
+        self._agent = None
+        self._users = {}
+        self._lock = Lock()
+
+    def _stamp(self, path):
+        cert_suffix = "-cert.pub"
+        if path.endswith(cert_suffix):
+            key_path, cert_path = path[: -len(cert_suffix)], path
+        else:
+            key_path, cert_path = path, path + cert_suffix
+        st = os.stat(os.path.expanduser(key_path))
+        try:
+            cert = os.stat(os.path.expanduser(cert_path)).st_mtime_ns
+        except FileNotFoundError:
+            cert = None
+        return (st.st_mtime_ns, st.st_size, cert)
+
+    def load(self, path):
+        path = str(path)
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._keys.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            key = PKey.from_path(path)
+            self._keys[path] = (stamp, key)
+        debug("Loaded key from {!r}".format(path))
+        return key
+
+    def agent(self, ttl):
+        if not ttl:
+            return Agent()
+        with self._lock:
+            if self._agent is not None:
+                stamp, agent = self._agent
+                if time.monotonic() - stamp < ttl:
+                    self._users[agent] += 1
+                    return agent
+            agent = SharedAgent()
+            self._users[agent] = 1
+            retired = self._retire()
+            self._agent = (time.monotonic(), agent)
+        if retired is not None:
+            retired.close()
+        msg = "Listed {} keys from the SSH agent"
+        debug(msg.format(len(agent.get_keys())))
+        return agent
+
+    def _retire(self):
+        # Replaced agents are closed by whoever releases them last, or right
+        # away if nobody is using them.
+        if self._agent is None:
+            return None
+        agent = self._agent[1]
+        self._agent = None
+        if self._users[agent]:
+            return None
+        del self._users[agent]
+        return agent
+
+    def release(self, agent):
+        with self._lock:
+            self._users[agent] -= 1
+            if self._users[agent]:
+                return
+            if self._agent is not None and self._agent[1] is agent:
+                return
+            del self._users[agent]
+        agent.close()
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            retired = self._retire()
+        if retired is not None:
+            retired.close()
 
 
 class OpenSSHAuthStrategy(AuthStrategy):
+    key_cache = KeyCache()
+
     def __init__(self, ssh_config, fabric_config, username):
         super().__init__(ssh_config=ssh_config)
         self.username = username
         self.config = fabric_config
-        self.agent = Agent()
+        self.agent = self.key_cache.agent(
+            self.config.authentication.agent_ttl
+        )
+        self._agent_released = False
 
     def get_pubkeys(self):
         config_certs, config_keys, cli_certs, cli_keys = [], [], [], []
         for path in self.config.authentication.identities:
             try:
-                key = PKey.from_path(path)
+                key = self.key_cache.load(path)
             except FileNotFoundError:
                 continue
             source = OnDiskPrivateKey(
@@ -36,7 +135,7 @@ class OpenSSHAuthStrategy(AuthStrategy):
             (cli_certs if key.public_blob else cli_keys).append(source)
         for path in self.ssh_config.get("identityfile", []):
             try:
-                key = PKey.from_path(path)
+                key = self.key_cache.load(path)
             except FileNotFoundError:
                 continue
             source = OnDiskPrivateKey(
@@ -51,7 +150,7 @@ class OpenSSHAuthStrategy(AuthStrategy):
             for type_ in ("rsa", "ecdsa", "ed25519", "dsa"):
                 path = user_ssh / f"id_{type_}"
                 try:
-                    key = PKey.from_path(path)
+                    key = self.key_cache.load(path)
                 except FileNotFoundError:
                     continue
                 source = OnDiskPrivateKey(
@@ -99,4 +198,8 @@ class OpenSSHAuthStrategy(AuthStrategy):
             self.close()
 
     def close(self):
-        self.agent.close()
+        if not isinstance(self.agent, SharedAgent):
+            self.agent.close()
+        elif not self._agent_released:
+            self._agent_released = True
+            self.key_cache.release(self.agent)
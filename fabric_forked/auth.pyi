@@ -1,5 +1,6 @@
-from paramiko import Agent
+from paramiko import Agent, PKey
 from paramiko.config import SSHConfig
+from paramiko.message import Message
 from paramiko.transport import Transport
 from paramiko.auth_strategy import (
     AuthStrategy,
@@ -11,7 +12,92 @@ from paramiko.auth_strategy import (
 
 from .config import Config
 
-from typing_extensions import Iterator
+from os import PathLike
+from threading import Lock
+from typing_extensions import ClassVar, Iterator
+
+
+class SharedAgent(Agent):
+    """
+    An `~paramiko.agent.Agent` which may be used by several threads at once.
+
+    Requests to the agent (such as signing during authentication) are
+    serialized over its single socket connection.
+
+    .. versionadded:: 3.3
+    """
+
+    _lock: Lock
+
+    def __init__(self) -> None: ...
+
+    def _send_message(self, msg: Message | bytes) -> tuple[int, Message]: ...
+
+
+class KeyCache:
+    """
+    Process-level cache of private keys and SSH agent key listings.
+
+    Used by `OpenSSHAuthStrategy` (as its ``key_cache`` class attribute) so
+    that authenticating many connections doesn't re-read and re-parse the
+    same key files, or re-list the agent's keys, for each one.
+
+    .. versionadded:: 3.3
+    """
+
+    _keys: dict[str, tuple[tuple[int, int, int | None], PKey]]
+    _agent: tuple[float, SharedAgent] | None
+    _users: dict[SharedAgent, int]
+    _lock: Lock
+
+    def __init__(self) -> None: ...
+
+    def _stamp(self, path: str) -> tuple[int, int, int | None]: ...
+
+    def load(self, path: str | PathLike[str]) -> PKey:
+        """
+        Return the key at ``path``, as loaded by `paramiko.pkey.PKey.from_path`.
+
+        Keys are cached by path, and reloaded when the key file's modification
+        time or size changes, or its ``-cert.pub`` certificate's modification
+        time does.
+
+        :raises:
+            ``FileNotFoundError`` if there is no key file at ``path``, or
+            whatever `~paramiko.pkey.PKey.from_path` raises. Failures aren't
+            cached.
+        """
+        ...
+
+    def agent(self, ttl: float) -> Agent:
+        """
+        Return an SSH agent connection whose key listing is at most ``ttl``
+        seconds old.
+
+        One `SharedAgent` is shared by all callers until ``ttl`` expires;
+        each caller should hand it back via `release` when done with it. If
+        ``ttl`` is falsy, a new, unshared `~paramiko.agent.Agent` is
+        returned instead, which the caller should close.
+        """
+        ...
+
+    def _retire(self) -> SharedAgent | None: ...
+
+    def release(self, agent: SharedAgent) -> None:
+        """
+        Stop using ``agent``, as returned by `agent`.
+
+        Once it has been replaced (its ``ttl`` expired, or `clear` was
+        called) and its last user releases it, it is closed.
+        """
+        ...
+
+    def clear(self) -> None:
+        """
+        Forget all cached keys and the shared agent connection, closing the
+        latter now if nobody is using it or else on its last `release`.
+        """
+        ...
 
 
 class OpenSSHAuthStrategy(AuthStrategy):
@@ -38,9 +124,18 @@ class OpenSSHAuthStrategy(AuthStrategy):
     .. versionadded:: 3.1
     """
     
+    key_cache: ClassVar[KeyCache]
+    """
+    The `KeyCache` used to load identity files and list agent keys; shared
+    process-wide by default.
+
+    .. versionadded:: 3.3
+    """
+
     username: str
     config: Config
     agent: Agent
+    _agent_released: bool
     
     def __init__(self, ssh_config: SSHConfig, fabric_config: Config, username: str) -> None:
         """
@@ -56,13 +151,31 @@ class OpenSSHAuthStrategy(AuthStrategy):
 
         Also handles connecting to an SSH agent, if possible, for easier
         lifecycle tracking.
+
+        .. versionchanged:: 3.3
+            The agent connection and its key listing are shared with other
+            strategies for ``authentication.agent_ttl`` seconds (see
+            `KeyCache.agent`).
         """
         ...
     
-    def get_pubkeys(self) -> Iterator[OnDiskPrivateKey | InMemoryPrivateKey]: ...
+    def get_pubkeys(self) -> Iterator[OnDiskPrivateKey | InMemoryPrivateKey]:
+        """
+        Yield key sources in the order OpenSSH would try them.
+
+        .. versionchanged:: 3.3
+            Key files are loaded through ``key_cache``, so each is parsed
+            only once per process while it's unchanged on disk.
+        """
+        ...
     
     def get_sources(self) -> Iterator[OnDiskPrivateKey | InMemoryPrivateKey | Password]: ...
     
     def authenticate(self, transport: Transport) -> list[SourceResult]: ...
     
-    def close(self) -> None: ...
\ No newline at end of file
+    def close(self) -> None:
+        """
+        Close the agent connection, or release a shared one back to
+        ``key_cache``.
+        """
+        ...
\ No newline at end of file
@@ -0,0 +1,175 @@
+from collections import deque
+from tempfile import NamedTemporaryFile
+from threading import get_ident
+
+
+class CaptureBuffer:
+    def __init__(self):
+        self._chunks = []
+        self.dropped = 0
+
+    @property
+    def truncated(self):
+        return bool(self.dropped)
+
+    def append(self, text):
+        self._chunks.append(text)
+
+    def getvalue(self):
+        return "".join(self._chunks)
+
+    def close(self):
+        pass
+
+
+class TailBuffer(CaptureBuffer):
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+        self._chunks = deque()
+        self._length = 0
+
+    def append(self, text):
+        self._chunks.append(text)
+        self._length += len(text)
+        while self._length > self.size:
+            excess = self._length - self.size
+            first = self._chunks[0]
+            if len(first) <= excess:
+                self._chunks.popleft()
+                removed = len(first)
+            else:
+                self._chunks[0] = first[excess:]
+                removed = excess
+            self._length -= removed
+            self.dropped += removed
+
+
+class HeadTailBuffer(CaptureBuffer):
+    marker = "\n[... {} characters omitted ...]\n"
+
+    def __init__(self, head, tail):
+        self._chunks = []
+        self.head = head
+        self._head_length = 0
+        self._tail = TailBuffer(tail)
+
+    @property
+    def dropped(self):
+        return self._tail.dropped
+
+    def append(self, text):
+        room = self.head - self._head_length
+        if room > 0:
+            self._chunks.append(text[:room])
+            self._head_length += min(room, len(text))
+            text = text[room:]
+        if text:
+            self._tail.append(text)
+
+    def getvalue(self):
+        head = "".join(self._chunks)
+        tail = self._tail.getvalue()
+        if self.truncated:
+            return head + self.marker.format(self.dropped) + tail
+        return head + tail
+
+
+class SpillBuffer(CaptureBuffer):
+    def __init__(self, threshold, dir=None):
+        super().__init__()
+        self.threshold = threshold
+        self.dir = dir
+        self.file = None
+        self._length = 0
+
+    @property
+    def truncated(self):
+        return self.file is not None
+
+    @property
+    def path(self):
+        return self.file.name if self.file is not None else None
+
+    def append(self, text):
+        if self.file is not None:
+            self.file.write(text)
+            return
+        self._chunks.append(text)
+        self._length += len(text)
+        if self._length > self.threshold:
+            self.file = NamedTemporaryFile(
+                mode="w+",
+                encoding="utf-8",
+                prefix="fabric-output-",
+                dir=self.dir,
+            )
+            self.file.writelines(self._chunks)
+            self._chunks = []
+
+    def getvalue(self):
+        if self.file is None:
+            return super().getvalue()
+        self.file.flush()
+        self.file.seek(0)
+        try:
+            return self.file.read()
+        finally:
+            self.file.seek(0, 2)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self._chunks = []
+
+
+class Capture:
+    def buffer(self):
+        return CaptureBuffer()
+
+
+class Tail(Capture):
+    def __init__(self, size):
+        self.size = size
+
+    def buffer(self):
+        return TailBuffer(self.size)
+
+
+class HeadTail(Capture):
+    def __init__(self, head, tail):
+        self.head = head
+        self.tail = tail
+
+    def buffer(self):
+        return HeadTailBuffer(self.head, self.tail)
+
+
+class Spill(Capture):
+    def __init__(self, threshold=16 * 1024 * 1024, dir=None):
+        self.threshold = threshold
+        self.dir = dir
+
+    def buffer(self):
+        return SpillBuffer(self.threshold, dir=self.dir)
+
+
+class LineSink:
+    def __init__(self, callback):
+        self.callback = callback
+        self._partial = {}
+
+    def __call__(self, connection, stream, text):
+        key = (get_ident(), stream)
+        lines = (self._partial.pop(key, "") + text).split("\n")
+        partial = lines.pop()
+        if partial:
+            self._partial[key] = partial
+        for line in lines:
+            self.callback(connection, stream, line)
+
+    def flush(self, connection, stream):
+        line = self._partial.pop((get_ident(), stream), "")
+        if line:
+            self.callback(connection, stream, line)
@@ -0,0 +1,217 @@
+"""
+Output capture policies and streaming sinks for `.Remote`.
+"""
+
+from collections import deque
+from tempfile import _TemporaryFileWrapper
+
+from typing_extensions import Callable
+
+from .connection import Connection
+
+
+class CaptureBuffer:
+    """
+    Capture buffer keeping all of a stream's output in memory.
+
+    This is what `.Remote` uses when only a ``sink`` is given; it matches
+    the default behavior. Subclasses bound what is kept.
+
+    Buffers are filled by a single IO thread and read once the command has
+    finished, via `getvalue` (which `.Result.stdout` and `.Result.stderr`
+    call on each access).
+
+    .. versionadded:: 3.3
+    """
+
+    dropped: int
+    """
+    Number of characters discarded so far.
+    """
+
+    _chunks: list[str]
+
+    def __init__(self) -> None: ...
+
+    @property
+    def truncated(self) -> bool:
+        """
+        Whether output was discarded or moved out of memory.
+
+        Once this is true, `.Remote` stops feeding the stream to watchers,
+        because their position tracking assumes the whole stream.
+        """
+        ...
+
+    def append(self, text: str) -> None: ...
+
+    def getvalue(self) -> str:
+        """
+        Return the captured text.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Release any resources (such as temporary files) held by the buffer.
+        """
+        ...
+
+
+class TailBuffer(CaptureBuffer):
+    """
+    Keeps only the last ``size`` characters of output.
+
+    .. versionadded:: 3.3
+    """
+
+    size: int
+    _chunks: deque[str]  # type: ignore[assignment]
+    _length: int
+
+    def __init__(self, size: int) -> None: ...
+
+
+class HeadTailBuffer(CaptureBuffer):
+    """
+    Keeps the first ``head`` and the last ``tail`` characters of output.
+
+    If anything was discarded in between, `getvalue` joins the two with
+    `marker`, formatted with the number of characters omitted.
+
+    .. versionadded:: 3.3
+    """
+
+    marker: str
+    head: int
+    _head_length: int
+    _tail: TailBuffer
+
+    def __init__(self, head: int, tail: int) -> None: ...
+
+    @property
+    def dropped(self) -> int: ...  # type: ignore[override]
+
+
+class SpillBuffer(CaptureBuffer):
+    """
+    Keeps output in memory until it exceeds ``threshold`` characters, then
+    moves it to a temporary file (in ``dir``, if given) and appends the rest
+    there.
+
+    Nothing is discarded. `getvalue` reads the file back in full. The file is
+    deleted by `close`, or when the buffer is garbage collected.
+
+    .. versionadded:: 3.3
+    """
+
+    threshold: int
+    dir: str | None
+    file: _TemporaryFileWrapper[str] | None
+    _length: int
+
+    def __init__(self, threshold: int, dir: str | None = None) -> None: ...
+
+    @property
+    def path(self) -> str | None:
+        """
+        Path of the temporary file, or ``None`` if output fit in memory.
+        """
+        ...
+
+
+class Capture:
+    """
+    Capture policy keeping all output in memory (the default behavior).
+
+    Capture policies are given as the ``capture`` argument to `.Connection.run`
+    (or the ``run.capture`` config setting). Each run creates one buffer per
+    stream by calling `buffer`, so a policy object may be shared, e.g. by all
+    the hosts of a `.Group`.
+
+    .. versionadded:: 3.3
+    """
+
+    def buffer(self) -> CaptureBuffer:
+        """
+        Return a new, empty buffer for one stream.
+        """
+        ...
+
+
+class Tail(Capture):
+    """
+    Keep only the last ``size`` characters of each stream (see `TailBuffer`).
+
+    ``Tail(0)`` keeps nothing, which is useful when a ``sink`` processes all
+    the output.
+
+    .. versionadded:: 3.3
+    """
+
+    size: int
+
+    def __init__(self, size: int) -> None: ...
+
+    def buffer(self) -> TailBuffer: ...
+
+
+class HeadTail(Capture):
+    """
+    Keep the first ``head`` and last ``tail`` characters of each stream (see
+    `HeadTailBuffer`).
+
+    .. versionadded:: 3.3
+    """
+
+    head: int
+    tail: int
+
+    def __init__(self, head: int, tail: int) -> None: ...
+
+    def buffer(self) -> HeadTailBuffer: ...
+
+
+class Spill(Capture):
+    """
+    Keep each stream in memory up to ``threshold`` characters (default 16
+    MiB), and in a temporary file beyond that (see `SpillBuffer`).
+
+    .. versionadded:: 3.3
+    """
+
+    threshold: int
+    dir: str | None
+
+    def __init__(self, threshold: int = ..., dir: str | None = None) -> None: ...
+
+    def buffer(self) -> SpillBuffer: ...
+
+
+class LineSink:
+    """
+    A ``sink`` which calls ``callback(connection, stream, line)`` once per
+    complete line of output, without the trailing newline.
+
+    A final line without a newline is passed on when its stream ends.
+    Partial lines are tracked per IO thread, so one `LineSink` may be shared
+    by many concurrent commands (e.g. a `.ThreadingGroup` run). In that
+    case, ``callback`` is called from several threads at once.
+
+    .. versionadded:: 3.3
+    """
+
+    callback: Callable[[Connection, str, str], None]
+    _partial: dict[tuple[int, str], str]
+
+    def __init__(self, callback: Callable[[Connection, str, str], None]) -> None: ...
+
+    def __call__(self, connection: Connection, stream: str, text: str) -> None: ...
+
+    def flush(self, connection: Connection, stream: str) -> None:
+        """
+        Pass on the current thread's partial line for ``stream``, if any.
+
+        Called by `.Remote` when the stream ends.
+        """
+        ...
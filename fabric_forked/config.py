@@ -1,14 +1,90 @@
 import copy
 import errno
 import os
+from threading import Lock
 
 from invoke.config import Config as InvokeConfig, merge_dicts
-from paramiko.config import SSHConfig
+from paramiko.config import SSHConfig, SSHConfigDict
 
 from .runners import Remote, RemoteShell
 from .util import get_local_user, debug
 
 
+class SSHConfigSnapshot(SSHConfig):
+    _files = {}
+    _files_lock = Lock()
+
+    def __init__(self):
+        super().__init__()
+        self._lookups = {}
+        self._sources = ()
+        self._memoize = True
+
+    @classmethod
+    def parse_path(cls, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with cls._files_lock:
+            cached = cls._files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached
+        parsed = SSHConfig()
+        with open(path) as fd:
+            parsed.parse(fd)
+        cached = (stamp, tuple(parsed._config))
+        with cls._files_lock:
+            cls._files[path] = cached
+        return cached
+
+    def load_path(self, path):
+        stamp, rules = self.parse_path(path)
+        source = (os.path.abspath(path), stamp)
+        if source in self._sources:
+            return 0
+        self._extend(rules)
+        self._sources += (source,)
+        return len(rules)
+
+    def parse(self, file_obj):
+        parsed = SSHConfig()
+        parsed.parse(file_obj)
+        self._extend(parsed._config)
+
+    def _extend(self, rules):
+        self._config = self._config + list(rules)
+        self._lookups = {}
+        self._memoize = not any(
+            match["type"] == "exec"
+            for rule in self._config
+            for match in rule.get("matches", ())
+        )
+
+    def copy(self):
+        new = type(self)()
+        new._config = self._config
+        new._lookups = self._lookups
+        new._sources = self._sources
+        new._memoize = self._memoize
+        return new
+
+    def _does_match(self, match_list, *args):
+        if not match_list:
+            return False
+        return super()._does_match(match_list, *args)
+
+    def lookup(self, hostname):
+        options = self._lookups.get(hostname)
+        if options is None:
+            options = super().lookup(hostname)
+            if self._memoize:
+                self._lookups[hostname] = options
+        return SSHConfigDict(
+            (key, value[:] if isinstance(value, list) else value)
+            for key, value in options.items()
+        )
+
+
 class Config(InvokeConfig):
     prefix = "fabric"
 
@@ -46,7 +122,7 @@ class Config(InvokeConfig):
         explicit = ssh_config is not None
         self._set(_given_explicit_object=explicit)
         if ssh_config is None:
-            ssh_config = SSHConfig()
+            ssh_config = SSHConfigSnapshot()
         self._set(base_ssh_config=ssh_config)
         super().__init__(*args, **kwargs)
         if not lazy:
@@ -74,8 +150,11 @@ class Config(InvokeConfig):
 
     def _clone_init_kwargs(self, *args, **kw):
         kwargs = super()._clone_init_kwargs(*args, **kw)
-        new_config = SSHConfig()
-        new_config._config = copy.deepcopy(self.base_ssh_config._config)
+        if isinstance(self.base_ssh_config, SSHConfigSnapshot):
+            new_config = self.base_ssh_config.copy()
+        else:
+            new_config = SSHConfigSnapshot()
+            new_config._extend(copy.deepcopy(self.base_ssh_config._config))
         return dict(kwargs, ssh_config=new_config)
 
     def _load_ssh_files(self):
@@ -92,12 +171,9 @@ class Config(InvokeConfig):
 
     def _load_ssh_file(self, path):
         if os.path.isfile(path):
-            old_rules = len(self.base_ssh_config._config)
-            with open(path) as fd:
-                self.base_ssh_config.parse(fd)
-            new_rules = len(self.base_ssh_config._config)
+            new_rules = self.base_ssh_config.load_path(path)
             msg = "Loaded {} new ssh_config rules from {!r}"
-            debug(msg.format(new_rules - old_rules, path))
+            debug(msg.format(new_rules, path))
         else:
             debug("File not found, skipping")
 
@@ -106,19 +182,50 @@ class Config(InvokeConfig):
         defaults = InvokeConfig.global_defaults()
         ours = {
             "authentication": {
+                "agent_ttl": 5,
                 "identities": [],
                 "strategy_class": None,
             },
             "connect_kwargs": {},
             "forward_agent": False,
             "gateway": None,
+            "health_monitor": None,
             "inline_ssh_env": True,
+            "keepalive": {
+                "interval": None,
+                "probe_after": None,
+                "probe_timeout": 10,
+            },
             "load_ssh_configs": True,
             "port": 22,
+            "proxy_jump": {"shared": False, "max_channels": None},
+            "run": {
+                "capture": None,
+                "event_driven": True,
+                "read_chunk_size": None,
+                "sink": None,
+            },
             "runners": {"remote": Remote, "remote_shell": RemoteShell},
             "ssh_config_path": None,
             "tasks": {"collection_name": "fabfile"},
             "timeouts": {"connect": None},
+            "timings": {"hooks": []},
+            "transfer": {
+                "chunk_size": 32768,
+                "delta_block_size": 1024 * 1024,
+                "delta_threshold": 16 * 1024 * 1024,
+                "hash_algorithm": "sha256",
+                "hash_command": None,
+                "metadata_ttl": 0,
+                "prefetch": 64,
+                "relay_command": (
+                    "ssh -o BatchMode=yes -p {port} {user}@{host} {command}"
+                    " < {path}"
+                ),
+                "stripe_threshold": 64 * 1024 * 1024,
+                "stripes": 1,
+            },
+            "transport_pool": None,
             "user": get_local_user(),
         }
         merge_dicts(defaults, ours)
@@ -1,4 +1,4 @@
-from paramiko.config import SSHConfig
+from paramiko.config import SSHConfig, SSHConfigDict
 from invoke.config import Config as InvokeConfig
 
 from ._types import (
@@ -7,7 +7,81 @@ from ._types import (
 )
 
 from os import PathLike
-from typing_extensions import Any
+from threading import Lock
+from typing_extensions import Any, ClassVar, Iterable, Self
+
+
+class SSHConfigSnapshot(SSHConfig):
+    """
+    A `~paramiko.config.SSHConfig` whose rules are shared copy-on-write.
+
+    This is the type of `Config.base_ssh_config` unless an explicit
+    ``ssh_config`` object was given. The rule list is never modified in
+    place: `parse` and `load_path` build a new list, so `copy` (used when a
+    `Config` is cloned, e.g. for each gateway hop) can share the existing
+    one instead of deep-copying it.
+
+    `lookup` results are memoized per hostname. The memo is shared by copies
+    and discarded whenever new rules are added. Lookups aren't memoized if
+    any ``Match exec`` rule is present, since its result may change between
+    calls.
+
+    .. versionadded:: 3.3
+    """
+
+    _files: ClassVar[dict[str, tuple[tuple[int, int], tuple[dict[str, Any], ...]]]]
+    _files_lock: ClassVar[Lock]
+
+    _lookups: dict[str, SSHConfigDict]
+    _sources: tuple[tuple[str, tuple[int, int]], ...]
+    _memoize: bool
+
+    def __init__(self) -> None: ...
+
+    @classmethod
+    def parse_path(cls, path: str) -> tuple[tuple[int, int], tuple[dict[str, Any], ...]]:
+        """
+        Parse the ssh_config file at ``path``.
+
+        Parsed files are cached process-wide by absolute path, and reused
+        while the file's modification time and size are unchanged.
+
+        :returns:
+            A ``(stamp, rules)`` tuple, where ``stamp`` identifies the file
+            version that was parsed. The rules must not be modified.
+        """
+        ...
+
+    def load_path(self, path: str) -> int:
+        """
+        Append the rules from the ssh_config file at ``path``.
+
+        Does nothing if this version of the file was already loaded.
+
+        :returns: The number of rules added.
+        """
+        ...
+
+    def parse(self, file_obj: Iterable[str]) -> None: ...
+
+    def _extend(self, rules: Iterable[dict[str, Any]]) -> None: ...
+
+    def copy(self) -> Self:
+        """
+        Return a snapshot which shares this one's rules and lookup memo.
+        """
+        ...
+
+    def _does_match(self, match_list: list[dict[str, Any]], *args: Any) -> Any: ...
+
+    def lookup(self, hostname: str) -> SSHConfigDict:
+        """
+        Return the config options for ``hostname``; see
+        `paramiko.config.SSHConfig.lookup`.
+
+        The result is a fresh copy, so callers may modify it.
+        """
+        ...
 
 
 class Config(InvokeConfig, _InvokeConfigNamespace, _FabricConfigNamespace):
@@ -40,7 +114,7 @@ class Config(InvokeConfig, _InvokeConfigNamespace, _FabricConfigNamespace):
     prefix: str
     
     
-    base_ssh_config: SSHConfig
+    base_ssh_config: SSHConfig | SSHConfigSnapshot
     
     _runtime_ssh_path: PathLike[str | bytes] | None
     _system_ssh_path: PathLike[str | bytes]
@@ -87,6 +161,10 @@ class Config(InvokeConfig, _InvokeConfigNamespace, _FabricConfigNamespace):
             Custom/explicit `paramiko.config.SSHConfig` object. If given,
             prevents loading of any SSH config files. Default: ``None``.
 
+            .. versionchanged:: 3.3
+                Clones of this config share an `SSHConfigSnapshot` copy of
+                the object's rules instead of each deep-copying them.
+
         :param str runtime_ssh_path:
             Runtime SSH config path to load. Prevents loading of system/user
             files if given. Default: ``None``.
@@ -150,7 +228,9 @@ class Config(InvokeConfig, _InvokeConfigNamespace, _FabricConfigNamespace):
         """
         Attempt to open and parse an SSH config file at ``path``.
 
-        Does nothing if ``path`` is not a path to a valid file.
+        Does nothing if ``path`` is not a path to a valid file, or if the
+        same version of it was already loaded (see
+        `SSHConfigSnapshot.load_path`).
 
         :returns: ``None``.
         """
@@ -173,5 +253,37 @@ class Config(InvokeConfig, _InvokeConfigNamespace, _FabricConfigNamespace):
         .. versionchanged:: 3.1
             Added the ``authentication`` settings section, plus sub-attributes
             such as ``authentication.strategy_class``.
+        .. versionchanged:: 3.3
+            Added the ``transport_pool`` setting (see `.TransportPool`) and
+            the ``proxy_jump`` settings section (``proxy_jump.shared`` and
+            ``proxy_jump.max_channels``; see `.Connection.get_gateway`).
+        .. versionchanged:: 3.3
+            Added the ``transfer`` settings section controlling striped
+            transfers (see `.Transfer.get`).
+        .. versionchanged:: 3.3
+            Added ``transfer.hash_algorithm``, ``transfer.hash_command``,
+            ``transfer.delta_threshold`` and ``transfer.delta_block_size``,
+            used by ``skip_unchanged`` transfers (see `.Transfer.hash_command`).
+        .. versionchanged:: 3.3
+            Added ``transfer.metadata_ttl`` (see `.RemoteMetadataCache`),
+            defaulting to ``0`` (no caching).
+        .. versionchanged:: 3.3
+            Added ``authentication.agent_ttl`` (see `.KeyCache`).
+        .. versionchanged:: 3.3
+            Added ``run.capture`` and ``run.sink`` (see `.Remote.captures`).
+        .. versionchanged:: 3.3
+            Added the ``timings`` settings section, whose ``timings.hooks``
+            callables are notified of connection and command phase
+            durations (see `.Timings`).
+        .. versionchanged:: 3.3
+            Added the ``keepalive`` settings section (``keepalive.interval``,
+            ``keepalive.probe_after`` and ``keepalive.probe_timeout``; see
+            `.Connection.open`) and the ``health_monitor`` setting (see
+            `.HealthMonitor`).
+        .. versionchanged:: 3.3
+            Added ``transfer.relay_command`` (see `.Transfer.relay`).
+        .. versionchanged:: 3.3
+            Added ``run.event_driven`` and ``run.read_chunk_size`` (see
+            `.Remote.wait` and `.Remote.read_chunk_size`).
         """
         ...
@@ -1,20 +1,44 @@
 from contextlib import contextmanager
+from errno import ECONNREFUSED, EHOSTUNREACH
+from functools import partial
 from io import StringIO
-from threading import Event
+from threading import BoundedSemaphore, Event, RLock
+from time import monotonic
+import hashlib
 import socket
+import sys
+import uuid
 
 from decorator import decorator
 from invoke import Context
-from invoke.exceptions import ThreadException
+from invoke.exceptions import ThreadException, UnexpectedExit
+from invoke.runners import normalize_hide
 from paramiko.agent import AgentRequestHandler
 from paramiko.client import SSHClient, AutoAddPolicy
 from paramiko.config import SSHConfig
 from paramiko.proxy import ProxyCommand
+from paramiko.sftp_client import SFTPClient
+from paramiko.ssh_exception import (
+    ChannelException,
+    NoValidConnectionsError,
+    SSHException,
+)
 
 from .config import Config
 from .exceptions import InvalidV1Env
+from .health import get_default_monitor
+from .metadata import RemoteMetadataCache
+from .pool import get_default_pool
+from .runners import batch_script, split_batch
+from .session import ShellSession
+from .timing import TimedTransport, Timings
 from .transfer import Transfer
-from .tunnels import TunnelManager, Tunnel
+from .tunnels import GatewayChannel, TunnelLoop, TunnelManager
+from .util import debug
+
+
+_gateways = {}
+_gateways_lock = RLock()
 
 
 @decorator
@@ -23,6 +47,21 @@ def opens(method, self, *args, **kwargs):
     return method(self, *args, **kwargs)
 
 
+def clear_gateway_cache():
+    with _gateways_lock:
+        gateways = [gateway for gateway, _ in _gateways.values()]
+        _gateways.clear()
+    for gateway in gateways:
+        gateway.close()
+
+
+def _digest_kwargs(kwargs):
+    # Cache keys end up in debug logs; don't let passwords and the like
+    # appear in them verbatim.
+    items = sorted((k, repr(v)) for k, v in kwargs.items())
+    return hashlib.sha256(repr(items).encode()).hexdigest()
+
+
 def derive_shorthand(host_string):
     user_hostport = host_string.rsplit("@", 1)
     hostport = user_hostport.pop()
@@ -52,7 +91,18 @@ class Connection(Context):
     client = None
     transport = None
     _sftp = None
+    _metadata = None
     _agent_handler = None
+    _pool = None
+    _pool_key = None
+    _open_lock = None
+    _channel_slots = None
+    _gateway_keys = ()
+    _gateways_released = False
+    timings = None
+    _unreported_timings = None
+    _last_used = None
+    _last_alive = None
 
     @classmethod
     def from_v1(cls, env, **kwargs):
@@ -85,6 +135,7 @@ class Connection(Context):
         inline_ssh_env=None,
     ):
         super().__init__(config=config)
+        self._open_lock = RLock()
         if config is None:
             config = Config()
         elif not isinstance(config, Config):
@@ -151,20 +202,67 @@ class Connection(Context):
     def get_gateway(self):
         if "proxyjump" in self.ssh_config:
             hops = reversed(self.ssh_config["proxyjump"].split(","))
+            shared = self.config.proxy_jump.shared
             prev_gw = None
             for hop in hops:
                 if self.derive_shorthand(hop)["host"] == self.host:
                     return None
-                kwargs = dict(config=self.config.clone())
-                if prev_gw is not None:
-                    kwargs["gateway"] = prev_gw
-                cxn = Connection(hop, **kwargs)
+                if shared:
+                    key = (hop, id(prev_gw), self._gateway_cache_key())
+                    with _gateways_lock:
+                        entry = _gateways.get(key)
+                        if entry is None:
+                            entry = [self._make_gateway(hop, prev_gw), 0]
+                            _gateways[key] = entry
+                        entry[1] += 1
+                    cxn = entry[0]
+                    self._gateway_keys = list(self._gateway_keys) + [key]
+                else:
+                    cxn = self._make_gateway(hop, prev_gw)
                 prev_gw = cxn
             return prev_gw
         elif "proxycommand" in self.ssh_config:
             return self.ssh_config["proxycommand"]
         return self.config.gateway
 
+    def _release_gateways(self):
+        keys, self._gateway_keys = self._gateway_keys, ()
+        if keys:
+            # self.gateway may have been closed and evicted; the next open
+            # takes the chain from the cache again.
+            self._gateways_released = True
+        unused = []
+        with _gateways_lock:
+            for key in reversed(keys):
+                entry = _gateways.get(key)
+                if entry is None:
+                    continue
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del _gateways[key]
+                    unused.append(entry[0])
+        for gateway in unused:
+            gateway.close()
+
+    def _make_gateway(self, hop, prev_gw):
+        kwargs = dict(config=self.config.clone())
+        if prev_gw is not None:
+            kwargs["gateway"] = prev_gw
+        return Connection(hop, **kwargs)
+
+    def _gateway_cache_key(self):
+        config = self.config
+        connect_kwargs = _digest_kwargs(config.connect_kwargs)
+        return (
+            config.user,
+            config.port,
+            connect_kwargs,
+            config.authentication.strategy_class,
+            config._runtime_ssh_path,
+            config._user_ssh_path,
+            config._system_ssh_path,
+        )
+
     def __repr__(self):
         bits = [("host", self.host)]
         if self.user != self.config.user:
@@ -201,9 +299,96 @@ class Connection(Context):
     def is_connected(self):
         return self.transport.active if self.transport else False
 
+    def idle_time(self):
+        last = max(self._last_used or 0, self._last_alive or 0)
+        if not last:
+            return 0.0
+        return monotonic() - last
+
+    def is_alive(self, timeout=None):
+        if not self.is_connected:
+            return False
+        if timeout is None:
+            timeout = self.config.keepalive.probe_timeout
+        try:
+            channel = self.transport.open_session(timeout=timeout)
+        except ChannelException:
+            pass
+        except (SSHException, EOFError, OSError) as e:
+            debug("Liveness probe of {!r} failed: {!r}".format(self, e))
+            return False
+        else:
+            channel.close()
+        self._last_alive = monotonic()
+        return True
+
+    def _is_stale(self):
+        probe_after = self.config.keepalive.probe_after
+        if probe_after is None or self.idle_time() < probe_after:
+            return False
+        return not self.is_alive()
+
+    def reconnect(self):
+        with self._open_lock:
+            self._disconnect(broken=True)
+            return self.open()
+
+    def get_health_monitor(self):
+        monitor = self.config.health_monitor
+        if monitor is True:
+            return get_default_monitor()
+        if monitor is False:
+            return None
+        return monitor
+
+    def get_transport_pool(self):
+        pool = self.config.transport_pool
+        if pool is True:
+            return get_default_pool()
+        if pool is False:
+            return None
+        return pool
+
+    def _transport_key(self):
+        gateway = self.gateway
+        if isinstance(gateway, Connection):
+            gateway = gateway._identity()
+        elif not isinstance(gateway, str):
+            gateway = None
+        connect_kwargs = _digest_kwargs(self.connect_kwargs)
+        strategy = self.authentication.strategy_class
+        return (self._identity(), gateway, connect_kwargs, strategy)
+
+    def _release_transport(self, discard=False):
+        if discard:
+            self._pool.discard(self._pool_key, self.transport)
+        else:
+            self._pool.release(self._pool_key, self.transport)
+        self._pool = None
+        self._pool_key = None
+        self.transport = None
+
     def open(self):
-        if self.is_connected:
-            return
+        with self._open_lock:
+            if self.is_connected:
+                if not self._is_stale():
+                    self._last_used = monotonic()
+                    return
+                debug("Reconnecting {!r}".format(self))
+                self._disconnect(broken=True)
+            result = self._connect()
+            self._last_used = monotonic()
+            monitor = self.get_health_monitor()
+            if monitor is not None:
+                monitor.watch(self)
+            return result
+
+    def _connect(self):
+        if self._pool is not None:
+            self._release_transport()
+        if self._gateways_released:
+            self._gateways_released = False
+            self.gateway = self.get_gateway()
         err = "Refusing to be ambiguous: connect() kwarg '{}' was given both via regular arg and via connect_kwargs!"  # noqa
         for key in """
             hostname
@@ -217,16 +402,34 @@ class Connection(Context):
             and self.connect_timeout is not None
         ):
             raise ValueError(err.format("timeout"))
+        timings = self.timings = Timings(self, self.config.timings.hooks)
+        self._unreported_timings = timings
+        pool = self.get_transport_pool()
+        if pool is not None:
+            key = self._transport_key()
+            transport = pool.acquire(key)
+            if transport is not None:
+                self.transport = transport
+                self._pool = pool
+                self._pool_key = key
+                return None
         kwargs = dict(
             self.connect_kwargs,
             username=self.user,
             hostname=self.host,
             port=self.port,
         )
-        if self.gateway:
-            kwargs["sock"] = self.open_gateway()
         if self.connect_timeout:
             kwargs["timeout"] = self.connect_timeout
+        if self.gateway:
+            with timings.phase("gateway"):
+                kwargs["sock"] = self.open_gateway()
+        elif not kwargs.get("sock"):
+            kwargs["sock"] = self._open_socket(kwargs.get("timeout"))
+        if kwargs.get("transport_factory") is None:
+            kwargs["transport_factory"] = partial(
+                TimedTransport, timings=timings
+            )
         if "key_filename" in kwargs and not kwargs["key_filename"]:
             del kwargs["key_filename"]
         auth_strategy_class = self.authentication.strategy_class
@@ -247,29 +450,103 @@ class Connection(Context):
                 fabric_config=self.config,
                 username=self.user,
             )
+        start = monotonic()
         result = self.client.connect(**kwargs)
+        timings.record("auth", timings.marks.get("kex", (None, start))[1])
         self.transport = self.client.get_transport()
+        interval = self.config.keepalive.interval
+        if interval is None:
+            interval = self.ssh_config.get("serveraliveinterval")
+        if interval:
+            self.transport.set_keepalive(int(interval))
+        if pool is not None and pool.add(key, self.client):
+            self._pool = pool
+            self._pool_key = key
         return result
 
+    def _open_socket(self, timeout=None):
+        with self.timings.phase("dns"):
+            to_try = list(
+                self.client._families_and_addresses(self.host, self.port)
+            )
+        errors = {}
+        with self.timings.phase("connect"):
+            for family, addr in to_try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                if timeout is not None:
+                    sock.settimeout(timeout)
+                try:
+                    sock.connect(addr)
+                except socket.error as e:
+                    sock.close()
+                    if e.errno not in (ECONNREFUSED, EHOSTUNREACH):
+                        raise
+                    errors[addr] = e
+                else:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    return sock
+        raise NoValidConnectionsError(errors)
+
     def open_gateway(self):
         if isinstance(self.gateway, str):
             ssh_conf = SSHConfig()
             dummy = "Host {}\n    ProxyCommand {}"
             ssh_conf.parse(StringIO(dummy.format(self.host, self.gateway)))
             return ProxyCommand(ssh_conf.lookup(self.host)["proxycommand"])
-        self.gateway.open()
-        return self.gateway.transport.open_channel(
-            kind="direct-tcpip",
-            dest_addr=(self.host, int(self.port)),
-            src_addr=("", 0),
-        )
+        gateway = self.gateway
+        with gateway._open_lock:
+            gateway.open()
+            slots = gateway._get_channel_slots()
+        if slots is not None:
+            timeout = self.connect_timeout
+            if not slots.acquire(timeout=timeout):
+                raise socket.timeout(
+                    "Timed out waiting for a free channel on {!r}".format(
+                        gateway
+                    )
+                )
+        try:
+            channel = gateway.transport.open_channel(
+                kind="direct-tcpip",
+                dest_addr=(self.host, int(self.port)),
+                src_addr=("", 0),
+            )
+        except BaseException:
+            if slots is not None:
+                slots.release()
+            raise
+        if slots is None:
+            return channel
+        return GatewayChannel(channel, slots)
+
+    def _get_channel_slots(self):
+        max_channels = self.config.proxy_jump.max_channels
+        if max_channels and self._channel_slots is None:
+            self._channel_slots = BoundedSemaphore(max_channels)
+        return self._channel_slots
 
     def close(self):
+        monitor = self.get_health_monitor()
+        if monitor is not None:
+            monitor.unwatch(self)
+        self._disconnect()
+        self._release_gateways()
+
+    def _disconnect(self, broken=False):
+        # Pooled transports may be shared: take them out of the pool instead,
+        # which closes them once every holder has let go.
+        if broken and self.transport is not None and self._pool is None:
+            self.transport.close()
         if self._sftp is not None:
             self._sftp.close()
             self._sftp = None
+        self._invalidate_metadata()
 
-        if self.is_connected:
+        if self._pool is not None:
+            self._release_transport(discard=broken)
+            if self.forward_agent and self._agent_handler is not None:
+                self._agent_handler.close()
+        elif self.is_connected or broken:
             self.client.close()
             if self.forward_agent and self._agent_handler is not None:
                 self._agent_handler.close()
@@ -294,11 +571,49 @@ class Connection(Context):
 
     @opens
     def run(self, command, **kwargs):
-        return self._run(self._remote_runner(), command, **kwargs)
+        try:
+            return self._run(self._remote_runner(), command, **kwargs)
+        finally:
+            self._invalidate_metadata()
+
+    @opens
+    def run_batch(self, commands, stop_on_failure=False, **kwargs):
+        commands = list(commands)
+        opts = {}
+        for key in ("echo", "echo_format", "err_stream", "hide", "out_stream"):
+            opts[key] = kwargs.pop(key, self.config.run[key])
+        warn = kwargs.pop("warn", self.config.run.warn)
+        kwargs.update(hide=True, warn=True, pty=False, in_stream=False)
+        token = "fabric-batch-{}".format(uuid.uuid4().hex)
+        script = batch_script(commands, token, stop_on_failure)
+        outer = self.run(script, **kwargs)
+        hide = normalize_hide(opts["hide"])
+        results = split_batch(outer, commands, token, hide=hide)
+        out_stream = opts["out_stream"] or sys.stdout
+        err_stream = opts["err_stream"] or sys.stderr
+        for result in results:
+            if opts["echo"]:
+                print(opts["echo_format"].format(command=result.command))
+            if "stdout" not in hide:
+                out_stream.write(result.stdout)
+            if "stderr" not in hide:
+                err_stream.write(result.stderr)
+        if not warn:
+            for result in results:
+                if result.failed:
+                    raise UnexpectedExit(result)
+        return results
+
+    @opens
+    def session(self, persist=False, shell=None, env=None):
+        return ShellSession(self, persist=persist, shell=shell, env=env)
 
     @opens
     def sudo(self, command, **kwargs):
-        return self._sudo(self._remote_runner(), command, **kwargs)
+        try:
+            return self._sudo(self._remote_runner(), command, **kwargs)
+        finally:
+            self._invalidate_metadata()
 
     @opens
     def shell(self, **kwargs):
@@ -314,7 +629,10 @@ class Connection(Context):
         if kwargs:
             err = "shell() got unexpected keyword arguments: {!r}"
             raise TypeError(err.format(list(kwargs.keys())))
-        return runner.run(command=None, **new_kwargs)
+        try:
+            return runner.run(command=None, **new_kwargs)
+        finally:
+            self._invalidate_metadata()
 
     def local(self, *args, **kwargs):
         return super().run(*args, **kwargs)
@@ -322,14 +640,47 @@ class Connection(Context):
     @opens
     def sftp(self):
         if self._sftp is None:
-            self._sftp = self.client.open_sftp()
+            self._sftp = SFTPClient.from_transport(self.transport)
         return self._sftp
 
+    def remote_metadata(self):
+        if self._metadata is None:
+            self._metadata = RemoteMetadataCache(
+                self, ttl=self.config.transfer.metadata_ttl
+            )
+        return self._metadata
+
+    def _take_open_timings(self):
+        # Only the first result after opening carries the open phases, so
+        # that aggregating results counts each handshake once.
+        with self._open_lock:
+            timings, self._unreported_timings = self._unreported_timings, None
+        return timings
+
+    def _invalidate_metadata(self):
+        if self._metadata is not None:
+            self._metadata.invalidate()
+
     def get(self, *args, **kwargs):
         return Transfer(self).get(*args, **kwargs)
 
     def put(self, *args, **kwargs):
         return Transfer(self).put(*args, **kwargs)
+
+    def get_tree(self, *args, **kwargs):
+        return Transfer(self).get_tree(*args, **kwargs)
+
+    def put_tree(self, *args, **kwargs):
+        return Transfer(self).put_tree(*args, **kwargs)
+
+    def get_archive(self, *args, **kwargs):
+        return Transfer(self).get_archive(*args, **kwargs)
+
+    def put_archive(self, *args, **kwargs):
+        return Transfer(self).put_archive(*args, **kwargs)
+
+    def relay(self, *args, **kwargs):
+        return Transfer(self).relay(*args, **kwargs)
     
     @contextmanager
     @opens
@@ -355,7 +706,7 @@ class Connection(Context):
         try:
             yield
         finally:
-            finished.set()
+            manager.stop()
             manager.join()
             wrapper = manager.exception()
             if wrapper is not None:
@@ -375,22 +726,21 @@ class Connection(Context):
     ):
         if not local_port:
             local_port = remote_port
-        tunnels = []
+        loop = TunnelLoop()
         def callback(channel, src_addr_tup, dst_addr_tup):
             sock = socket.socket()
             sock.connect((local_host, local_port))
-            tunnel = Tunnel(channel=channel, sock=sock, finished=Event())
-            tunnel.start()
-            tunnels.append(tunnel)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            loop.add_tunnel(channel, sock)
+        loop.start()
         try:
             self.transport.request_port_forward(
                 address=remote_host, port=remote_port, handler=callback
             )
             yield
         finally:
-            for tunnel in tunnels:
-                tunnel.finished.set()
-                tunnel.join()
+            loop.stop()
+            loop.join()
             self.transport.cancel_port_forward(
                 address=remote_host, port=remote_port
             )
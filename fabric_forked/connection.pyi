@@ -10,7 +10,13 @@ from paramiko.transport import Transport
 from paramiko.channel import Channel
 
 from .config import Config
+from .health import HealthMonitor
+from .metadata import RemoteMetadataCache
+from .pool import TransportPool
 from .runners import Remote
+from .session import ShellSession
+from .timing import Timings
+from .transfer import TreeResult
 from ._types import (
     Result, Gateway,
     DictHost, ConnectKwargs,
@@ -19,17 +25,41 @@ from ._types import (
 )
 
 from os import PathLike
+import socket
+from threading import BoundedSemaphore, RLock
 from typing_extensions import (
     Any,
     IO,
+    Iterable,
     Literal,
-    Self, Unpack
+    Self, Sequence, Unpack
 )
 
 
+_gateways: dict[tuple[Any, ...], list[Any]]
+"""
+Shared gateways by cache key, as ``[connection, references]`` pairs.
+"""
+_gateways_lock: RLock
+
+
+def _digest_kwargs(kwargs: dict[str, Any]) -> str: ...
+
+
 def derive_shorthand(host_string: str) -> DictHost: ...
 
 
+def clear_gateway_cache() -> None:
+    """
+    Close and forget every shared ``ProxyJump`` gateway connection.
+
+    See `.Connection.get_gateway` for when gateways are shared.
+
+    .. versionadded:: 3.3
+    """
+    ...
+
+
 class Connection(Context):
     """
     A connection to an SSH daemon, with methods for commands and file transfer.
@@ -117,7 +147,27 @@ class Connection(Context):
     client: SSHClient
     transport: Transport | None
     _sftp: SFTPClient
+    _metadata: RemoteMetadataCache | None
     _agent_handler: AgentRequestHandler | None
+    _pool: TransportPool | None
+    _pool_key: tuple[Any, ...] | None
+    _open_lock: RLock
+    _channel_slots: BoundedSemaphore | None
+    _gateway_keys: Sequence[tuple[Any, ...]]
+    _gateways_released: bool
+    timings: Timings | None
+    """
+    Phase durations of the latest `open` call (empty if it reused a pooled
+    transport), or ``None`` before the first. See `.Timings`.
+
+    These are also copied into the timings of the first command or
+    transfer result after each `open`, and only that one.
+
+    .. versionadded:: 3.3
+    """
+    _unreported_timings: Timings | None
+    _last_used: float | None
+    _last_alive: float | None
     
     @classmethod
     def from_v1(cls, env: AttributeDict, **kwargs) -> Connection:
@@ -321,7 +371,34 @@ class Connection(Context):
     
     def resolve_connect_kwargs(self, connect_kwargs: ConnectKwargs) -> dict[str, Any]: ...
     
-    def get_gateway(self) -> str | Gateway | None: ...
+    def get_gateway(self) -> str | Gateway | None:
+        """
+        Derive this connection's gateway from SSH and Fabric config.
+
+        ``ProxyJump`` hops become a chain of `.Connection` objects. When the
+        ``proxy_jump.shared`` config value is true (default: ``False``), each
+        hop is looked up in a process-wide cache keyed on the hop, its
+        upstream hop and the connection-relevant config, so every target
+        behind the same jump chain reuses one gateway `.Connection` (and thus
+        one gateway transport) per hop, multiplexing its ``direct-tcpip``
+        channels over it.
+
+        Each call takes a reference on the shared hops it returns; `close`
+        releases them, closing a shared gateway once no connection uses it,
+        and reopening the connection calls this method again to take new
+        references.
+        `clear_gateway_cache` closes all shared gateways at once.
+
+        .. versionchanged:: 3.3
+            Optionally share ``ProxyJump`` hops between connections.
+        """
+        ...
+    
+    def _release_gateways(self) -> None: ...
+
+    def _make_gateway(self, hop: str, prev_gw: Connection | None) -> Connection: ...
+    
+    def _gateway_cache_key(self) -> tuple[Any, ...]: ...
     
     def _identity(sellf) -> tuple[str | None, str | None, int | None]: ...
     
@@ -336,6 +413,80 @@ class Connection(Context):
     
     def derive_shorthand(self, host_string: str) -> DictHost: ...
     
+    def idle_time(self) -> float:
+        """
+        Seconds since this connection was last opened or used, or found alive
+        by `is_alive`; ``0.0`` if it was never opened.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def is_alive(self, timeout: float | None = None) -> bool:
+        """
+        Check that the remote end still answers, with one network round trip.
+
+        `is_connected` only reflects local state, so it stays true for a
+        transport whose peer has silently gone away (e.g. after a NAT or
+        firewall dropped the connection); using such a transport hangs. This
+        asks the server to open a session channel and then closes it. Any
+        answer, even a refusal, means the connection is alive.
+
+        :param float timeout:
+            Seconds to wait for the answer. Default: the
+            ``keepalive.probe_timeout`` config value (``10``).
+
+        :returns:
+            ``False`` if not connected, or if there was no answer in time;
+            otherwise ``True``.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def _is_stale(self) -> bool: ...
+    
+    def reconnect(self) -> None:
+        """
+        Drop the current transport, even if it looks active, and `open` a
+        new one.
+
+        Unlike `close`, this keeps the connection registered with its
+        `.HealthMonitor`.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def get_health_monitor(self) -> HealthMonitor | None:
+        """
+        Return the `.HealthMonitor` watching this connection once open, if
+        any.
+
+        Driven by the ``health_monitor`` config value: ``None``/``False``
+        disables monitoring, ``True`` selects the process-wide default
+        monitor, and a `.HealthMonitor` instance is used as-is.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def get_transport_pool(self) -> TransportPool | None:
+        """
+        Return the `.TransportPool` this connection should use, if any.
+
+        Driven by the ``transport_pool`` config value: ``None``/``False``
+        disables pooling, ``True`` selects the process-wide default pool, and
+        a `.TransportPool` instance is used as-is.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def _transport_key(self) -> tuple[Any, ...]: ...
+    
+    def _release_transport(self, discard: bool = False) -> None: ...
+    
     def open(self) -> None:
         """
         Initiate an SSH connection to the host/port this object is bound to.
@@ -354,10 +505,42 @@ class Connection(Context):
             The result of the internal call to `.SSHClient.connect`, if
             performing an initial connection; ``None`` otherwise.
 
+        When :ref:`transport pooling <default-values>` is enabled and a
+        matching authenticated transport is already pooled, it is reused
+        instead and nothing is connected.
+
         .. versionadded:: 2.0
         .. versionchanged:: 3.1
             Now returns the inner Paramiko connect call's return value instead
             of always returning the implicit ``None``.
+        .. versionchanged:: 3.3
+            Added transport pool support.
+        .. versionchanged:: 3.3
+            Without a gateway, resolves the host and opens the TCP socket
+            itself, then passes it to Paramiko, so as to record the
+            connection's `timings`.
+        .. versionchanged:: 3.3
+            If the connection has been idle for ``keepalive.probe_after``
+            seconds, checks it with `is_alive` first and reconnects if it is
+            down. Also enables transport keepalives every
+            ``keepalive.interval`` seconds (default: the SSH config's
+            ``ServerAliveInterval``, if any), and registers the connection
+            with its `get_health_monitor`. Concurrent calls now wait for each
+            other instead of connecting twice.
+        """
+        ...
+    
+    def _connect(self) -> None: ...
+    
+    def _open_socket(self, timeout: float | None = None) -> socket.socket:
+        """
+        Resolve and connect to `host`/`port` as `.SSHClient.connect
+        <paramiko.client.SSHClient.connect>` would, recording the ``dns`` and
+        ``connect`` `timings`.
+
+        The connected socket has ``TCP_NODELAY`` set, as OpenSSH does for
+        interactive sessions, so small packets such as channel requests and
+        exit statuses aren't held back waiting for a delayed ACK.
         """
         ...
     
@@ -365,15 +548,29 @@ class Connection(Context):
         """
         Obtain a socket-like object from `gateway`.
 
+        If the gateway `.Connection` has a ``proxy_jump.max_channels``
+        config value, at most that many channels are kept open through it at
+        once; further callers wait (up to their ``connect_timeout``, if any)
+        for a channel to close. This keeps large fleets within a bastion's
+        ``MaxSessions``.
+
         :returns:
-            A ``direct-tcpip`` `paramiko.channel.Channel`, if `gateway` was a
+            A ``direct-tcpip`` `paramiko.channel.Channel` (wrapped in a
+            `.GatewayChannel` when channels are limited), if `gateway` was a
             `.Connection`; or a `~paramiko.proxy.ProxyCommand`, if `gateway`
             was a string.
 
+        :raises socket.timeout:
+            if no gateway channel became free within ``connect_timeout``.
+
         .. versionadded:: 2.0
+        .. versionchanged:: 3.3
+            Added the ``proxy_jump.max_channels`` limit.
         """
         ...
     
+    def _get_channel_slots(self) -> BoundedSemaphore | None: ...
+    
     def close(self):
         """
         Terminate the network connection to the remote end, if open.
@@ -382,12 +579,24 @@ class Connection(Context):
 
         If no connection or SFTP session is open, this method does nothing.
 
+        Pooled transports are handed back to their `.TransportPool` instead
+        of being closed.
+
         .. versionadded:: 2.0
         .. versionchanged:: 3.0
             Now closes SFTP sessions too (2.x required manually doing so).
+        .. versionchanged:: 3.3
+            Returns pooled transports to their pool, and empties the
+            `remote_metadata` cache.
+        .. versionchanged:: 3.3
+            Stops any `.HealthMonitor` from watching the connection.
+        .. versionchanged:: 3.3
+            Releases shared ``ProxyJump`` gateways (see `get_gateway`).
         """
         ...
     
+    def _disconnect(self, broken: bool = False) -> None: ...
+    
     def create_session(self) -> Channel: ...
     
     def _remote_runner(self) -> Remote: ...
@@ -404,10 +613,93 @@ class Connection(Context):
             settings/behaviors; they are documented under
             `.Config.global_defaults`.
 
+        Two options are specific to Fabric: ``capture``, a
+        `.capture.Capture` policy bounding how much output is kept in
+        memory, and ``sink``, a callback receiving output as it streams. See
+        `.Remote.captures` for details.
+
         .. versionadded:: 2.0
+        Two more tune how the command is waited on: ``event_driven`` and
+        ``read_chunk_size``; see `.Remote.wait` and `.Remote.read_chunk_size`.
+
+        .. versionchanged:: 3.3
+            Added the ``capture`` and ``sink`` options.
+        .. versionchanged:: 3.3
+            Added the ``event_driven`` and ``read_chunk_size`` options.
         """
         ...
     
+    def run_batch(self,
+        commands: Iterable[str],
+        stop_on_failure: bool = False,
+        **kwargs: Unpack[RunKwargs]
+    ) -> list[Result]:
+        """
+        Execute several shell commands over a single session channel.
+
+        A `run` call opens a new channel per command, which costs at least
+        one network round trip. `run_batch` sends all of ``commands`` as one
+        script instead. Each command still runs in its own subshell, so
+        ``cd``, ``exit`` or variable assignments in one don't affect the
+        others, and gets its own `.Result` with separate stdout, stderr and
+        exit code.
+
+        :param commands: The shell commands to run, in order.
+
+        :param bool stop_on_failure:
+            Stop after the first command which exits nonzero, instead of
+            running the rest. Default: ``False``.
+
+        Other keyword arguments are as for `run`, with these differences:
+
+        - Output is shown per command (subject to ``hide``, ``echo`` and
+          the output streams) once the whole batch has finished, instead of
+          while it runs.
+        - ``pty`` and ``in_stream`` are ignored: commands run without a
+          pseudo-terminal or stdin.
+        - ``timeout`` applies to the batch as a whole.
+
+        :returns:
+            A list of `.Result` objects, one per command that ran.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` for the first command which
+            exited nonzero, unless ``warn`` is set.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def session(self,
+        persist: bool = False,
+        shell: str | None = None,
+        env: dict[str, Any] | None = None,
+    ) -> ShellSession:
+        """
+        Return a `.ShellSession`: a remote shell kept running between
+        commands.
+
+        Useful for scripts issuing many small commands, which would otherwise
+        each pay for a new channel and shell. For example::
+
+            with cxn.session(persist=True) as session:
+                session.run("cd /srv/app")
+                for name in names:
+                    session.run("test -e {}".format(name), warn=True)
+
+        :param bool persist:
+            Let changes made by one command (working directory, variables,
+            ...) carry over to the next. Default: ``False``.
+
+        :param str shell: The remote shell. Default: ``run.shell``.
+
+        :param dict env:
+            Extra environment variables exported when the shell starts.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
     def sudo(self, command: str, **kwargs: Unpack[SudoKwargs]) -> Result | None:
         """
         Execute a shell command, via ``sudo``, on the remote end.
@@ -502,14 +794,48 @@ class Connection(Context):
         and state (such as that managed by
         `~paramiko.sftp_client.SFTPClient.chdir`) will be preserved.
 
+        .. note::
+            If you ``chdir`` this client, call
+            ``remote_metadata().invalidate()`` afterwards so transfers stop
+            resolving relative paths against the cached working directory.
+
         .. versionadded:: 2.0
         """
         ...
     
+    def remote_metadata(self) -> RemoteMetadataCache:
+        """
+        Return this connection's `.RemoteMetadataCache`.
+
+        Created on first use with a TTL taken from the
+        ``transfer.metadata_ttl`` config value (default: ``0``, i.e. caching
+        is opt-in). `.Transfer` consults it for the remote working directory
+        and ``stat`` results, so repeated transfers over the same connection
+        skip those round trips. It is emptied after every `run`, `sudo` and
+        `shell` call.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def _take_open_timings(self) -> Timings | None:
+        """
+        Return `timings` if no result has carried them since the latest
+        `open`, else ``None``; used as the ``base`` of each result's
+        `.Timings`.
+        """
+        ...
+
+    def _invalidate_metadata(self) -> None: ...
+    
     def put(self,
         local: PathLike[str | bytes] | IO[str | bytes],
         remote: PathLike[str | bytes] | None = None,
-        preserve_mode: bool = True
+        preserve_mode: bool = True,
+        stripes: int | None = None,
+        chunk_size: int | None = None,
+        prefetch: int | None = None,
+        skip_unchanged: bool | Literal["mtime", "checksum"] = False
     ) -> Result:
         """
         Put a local file (or file-like object) to the remote filesystem.
@@ -521,6 +847,82 @@ class Connection(Context):
         """
         ...
     
+    def get_tree(self,
+        remote: PathLike[str | bytes],
+        local: PathLike[str | bytes] | None = None,
+        **kwargs
+    ) -> TreeResult:
+        """
+        Download a remote directory tree to the local filesystem.
+
+        Simply a wrapper for `.Transfer.get_tree`. Please see its
+        documentation for all details.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def put_tree(self,
+        local: PathLike[str | bytes],
+        remote: PathLike[str | bytes] | None = None,
+        **kwargs
+    ) -> TreeResult:
+        """
+        Upload a local directory tree to the remote filesystem.
+
+        Simply a wrapper for `.Transfer.put_tree`. Please see its
+        documentation for all details.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def get_archive(self,
+        remote: PathLike[str | bytes],
+        local: PathLike[str | bytes] | None = None,
+        **kwargs
+    ) -> TreeResult:
+        """
+        Download a remote directory tree as one tar stream.
+
+        Simply a wrapper for `.Transfer.get_archive`. Please see its
+        documentation for all details.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def put_archive(self,
+        local: PathLike[str | bytes],
+        remote: PathLike[str | bytes] | None = None,
+        **kwargs
+    ) -> TreeResult:
+        """
+        Upload a local directory tree as one tar stream.
+
+        Simply a wrapper for `.Transfer.put_archive`. Please see its
+        documentation for all details.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def relay(self,
+        target: Connection,
+        path: str,
+        remote: str | None = None,
+        **kwargs
+    ) -> Result:
+        """
+        Copy a file from this connection's host directly to ``target``.
+
+        Simply a wrapper for `.Transfer.relay`. Please see its documentation
+        for all details.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
     @contextmanager
     def forward_local(
         self,
@@ -568,6 +970,9 @@ class Connection(Context):
             local operating system state.
 
         .. versionadded:: 2.0
+        .. versionchanged:: 3.3
+            All connections are forwarded by a single `.TunnelManager`
+            thread (see `.TunnelLoop`) instead of a thread per connection.
         """
         ...
     
@@ -622,5 +1027,8 @@ class Connection(Context):
             local operating system state.
 
         .. versionadded:: 2.0
+        .. versionchanged:: 3.3
+            All connections are forwarded by a single `.TunnelLoop` thread
+            instead of a thread per connection.
         """
         ...
\ No newline at end of file
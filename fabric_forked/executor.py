@@ -1,11 +1,94 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Condition, Event, Lock
+
 import invoke
-from invoke import Call, Task
+from invoke import Call, Exit, Task
 
 from .tasks import ConnectionCall
 from .exceptions import NothingToDo
+from .group import GroupResult
 from .util import debug
 
 
+class PrefixedStream:
+    def __init__(self, stream, prefix, lock):
+        self.stream = stream
+        self.prefix = prefix
+        self.lock = lock
+        self._partial = ""
+
+    def write(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        if lines:
+            with self.lock:
+                for line in lines:
+                    self.stream.write("{}{}\n".format(self.prefix, line))
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+
+    def close(self):
+        if self._partial:
+            self.write("\n")
+        self.flush()
+
+    def isatty(self):
+        return False
+
+
+class PipelineBarrier:
+    def __init__(self, name, parties):
+        self.name = name
+        self.parties = parties
+        self._arrived = 0
+        self._callbacks = []
+        self._condition = Condition()
+
+    def _ready(self):
+        return self._arrived >= self.parties
+
+    def _notify(self):
+        # Called with the condition held; returns the callbacks to run.
+        self._condition.notify_all()
+        if not self._ready():
+            return []
+        callbacks, self._callbacks = self._callbacks, []
+        return callbacks
+
+    def wait(self):
+        with self._condition:
+            self._arrived += 1
+            callbacks = self._notify()
+            if not self._ready():
+                debug("Waiting at barrier {!r}".format(self.name))
+        for callback in callbacks:
+            callback()
+        with self._condition:
+            self._condition.wait_for(self._ready)
+
+    def arrive(self, callback):
+        with self._condition:
+            self._arrived += 1
+            self._callbacks.append(callback)
+            callbacks = self._notify()
+            if not self._ready():
+                debug("Waiting at barrier {!r}".format(self.name))
+        for callback in callbacks:
+            callback()
+
+    def leave(self):
+        with self._condition:
+            self.parties -= 1
+            callbacks = self._notify()
+        for callback in callbacks:
+            callback()
+
+
 class Executor(invoke.Executor):
     def normalize_hosts(self, hosts):
         dicts = []
@@ -53,3 +136,295 @@ class Executor(invoke.Executor):
 
     def dedupe(self, tasks):
         return tasks
+
+    def _core_value(self, name, default=None):
+        if not self.core:
+            return default
+        return self.core[0].args[name].value
+
+    def execute(self, *tasks):
+        pipeline = self._core_value("pipeline", False)
+        if not (pipeline or self._core_value("parallel", False)):
+            return super().execute(*tasks)
+        debug("Examining top level tasks {!r}".format([x for x in tasks]))
+        calls = self.normalize(tasks)
+        direct = list(calls)
+        expanded = self.expand_calls(calls)
+        try:
+            dedupe = self.config.tasks.dedupe
+        except AttributeError:
+            dedupe = True
+        calls = self.dedupe(expanded) if dedupe else expanded
+        if pipeline:
+            batches = self.pipeline_calls(calls)
+        else:
+            batches = self.batch_calls(calls)
+        results = {}
+        for batch in batches:
+            call = batch[0]
+            if pipeline and len(batch) > 1:
+                results.update(self.execute_pipelined(batch, direct))
+                continue
+            autoprint = call in direct and call.autoprint
+            config = self.config
+            collection_config = self.collection.configuration(call.called_as)
+            config.load_collection(collection_config)
+            config.load_shell_env()
+            if len(batch) == 1:
+                debug("Executing {!r}".format(call))
+                context = call.make_context(config)
+                result = call.task(context, *call.args, **call.kwargs)
+                if autoprint:
+                    print(result)
+            else:
+                result = self.execute_parallel(batch, config, autoprint)
+            results[call.task] = result
+        return results
+
+    def batch_calls(self, calls):
+        batches = []
+        for call in calls:
+            if batches and self._same_call(batches[-1][0], call):
+                batches[-1].append(call)
+            else:
+                batches.append([call])
+        return batches
+
+    def _same_call(self, first, call):
+        return (
+            isinstance(first, ConnectionCall)
+            and isinstance(call, ConnectionCall)
+            and first.task is call.task
+            and first.called_as == call.called_as
+            and first.args == call.args
+            and first.kwargs == call.kwargs
+        )
+
+    def pipeline_calls(self, calls):
+        batches = []
+        for call in calls:
+            if (
+                batches
+                and isinstance(call, ConnectionCall)
+                and isinstance(batches[-1][-1], ConnectionCall)
+            ):
+                batches[-1].append(call)
+            else:
+                batches.append([call])
+        return batches
+
+    def _host_key(self, call):
+        return tuple(
+            sorted(
+                (key, repr(value))
+                for key, value in call.init_kwargs.items()
+                if key != "config"
+            )
+        )
+
+    def host_label(self, call):
+        label = call.init_kwargs["host"]
+        if call.init_kwargs.get("user"):
+            label = "{}@{}".format(call.init_kwargs["user"], label)
+        if call.init_kwargs.get("port"):
+            label = "{}:{}".format(label, call.init_kwargs["port"])
+        return label
+
+    def host_streams(self, call, lock):
+        prefix = "[{}] ".format(self.host_label(call))
+        return (
+            PrefixedStream(sys.stdout, prefix, lock),
+            PrefixedStream(sys.stderr, prefix, lock),
+        )
+
+    def host_config(self, config, streams):
+        host_config = config.clone()
+        host_config.run.out_stream, host_config.run.err_stream = streams
+        host_config.run.in_stream = False
+        return host_config
+
+    def execute_parallel(self, calls, config, autoprint=False):
+        pool_size = self._core_value("pool-size") or len(calls)
+        lock = Lock()
+        contexts = []
+        for call in calls:
+            streams = self.host_streams(call, lock)
+            host_config = self.host_config(config, streams)
+            contexts.append(call.make_context(host_config))
+
+        def execute(call, context):
+            debug("Executing {!r}".format(call))
+            try:
+                return call.task(context, *call.args, **call.kwargs)
+            except Exception as e:
+                return e
+            finally:
+                context.config.run.out_stream.close()
+                context.config.run.err_stream.close()
+
+        msg = "Executing {!r} on {} hosts, {} at a time"
+        debug(msg.format(calls[0], len(calls), pool_size))
+        with ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="fabric-exec"
+        ) as pool:
+            futures = [
+                pool.submit(execute, call, context)
+                for call, context in zip(calls, contexts)
+            ]
+        results = GroupResult()
+        labels = {}
+        for call, context, future in zip(calls, contexts, futures):
+            results[context] = future.result()
+            labels[context] = self.host_label(call)
+            if autoprint and not isinstance(results[context], Exception):
+                print("[{}] {}".format(labels[context], results[context]))
+        if results.failed:
+            report = self.failure_report(calls[0], results, labels)
+            raise Exit(report, code=1)
+        return results
+
+    def _barrier_keys(self, pipeline):
+        seen = {}
+        keys = []
+        for call, _ in pipeline:
+            name = getattr(call.task, "barrier", None)
+            if name is None:
+                keys.append(None)
+                continue
+            keys.append((name, seen.get(name, 0)))
+            seen[name] = keys[-1][1] + 1
+        return keys
+
+    def pipeline_barriers(self, pipelines):
+        barriers = {}
+        for pipeline in pipelines:
+            for key in self._barrier_keys(pipeline):
+                if key is None:
+                    continue
+                if key not in barriers:
+                    barriers[key] = PipelineBarrier(key[0], 0)
+                barriers[key].parties += 1
+        return barriers
+
+    def execute_pipelined(self, calls, direct=()):
+        lock = Lock()
+        streams = {}
+        pipelines = {}
+        for call in calls:
+            key = self._host_key(call)
+            if key not in streams:
+                streams[key] = self.host_streams(call, lock)
+            collection_config = self.collection.configuration(call.called_as)
+            self.config.load_collection(collection_config)
+            self.config.load_shell_env()
+            host_config = self.host_config(self.config, streams[key])
+            context = call.make_context(host_config)
+            pipelines.setdefault(key, []).append((call, context))
+        pipelines = list(pipelines.values())
+        barriers = self.pipeline_barriers(pipelines)
+        keys = [self._barrier_keys(pipeline) for pipeline in pipelines]
+        pool_size = self._core_value("pool-size") or len(pipelines)
+        done = [[] for _ in pipelines]
+        errors = []
+        remaining = [len(pipelines)]
+        finished = Event()
+        if not pipelines:
+            finished.set()
+        state_lock = Lock()
+
+        # Each step is its own job, queued only once its barrier (if any) has
+        # opened, so a host waiting at a barrier never ties up a worker.
+        def advance(index, step):
+            if step == len(pipelines[index]):
+                return finish(index)
+            submit = partial(pool.submit, execute, index, step)
+            if keys[index][step] is None:
+                submit()
+            else:
+                barriers[keys[index][step]].arrive(submit)
+
+        def leave_barriers(index, step):
+            for key in keys[index][step:]:
+                if key is not None:
+                    barriers[key].leave()
+
+        def execute(index, step):
+            call, context = pipelines[index][step]
+            try:
+                debug("Executing {!r}".format(call))
+                try:
+                    result = call.task(context, *call.args, **call.kwargs)
+                except Exception as e:
+                    result = e
+                done[index].append((call, context, result))
+                if isinstance(result, Exception):
+                    leave_barriers(index, step + 1)
+                    return finish(index)
+                if call in direct and call.autoprint:
+                    with lock:
+                        label = self.host_label(call)
+                        print("[{}] {}".format(label, result))
+            except BaseException as e:
+                errors.append(e)
+                leave_barriers(index, step + 1)
+                return finish(index)
+            advance(index, step + 1)
+
+        def finish(index):
+            context = pipelines[index][0][1]
+            context.config.run.out_stream.close()
+            context.config.run.err_stream.close()
+            with state_lock:
+                remaining[0] -= 1
+                if not remaining[0]:
+                    finished.set()
+
+        msg = "Pipelining {} calls on {} hosts, {} at a time"
+        debug(msg.format(len(calls), len(pipelines), pool_size))
+        with ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="fabric-exec"
+        ) as pool:
+            for index in range(len(pipelines)):
+                advance(index, 0)
+            finished.wait()
+        if errors:
+            raise errors[0]
+        results = {}
+        first_calls = {}
+        labels = {}
+        for steps in done:
+            for call, context, result in steps:
+                first_calls.setdefault(call.task, call)
+                results.setdefault(call.task, GroupResult())[context] = result
+                labels[context] = self.host_label(call)
+        reports = [
+            self.failure_report(first_calls[task], group, labels)
+            for task, group in results.items()
+            if group.failed
+        ]
+        if reports:
+            raise Exit("\n".join(reports), code=1)
+        return results
+
+    def failure_report(self, call, results, labels=None):
+        lines = [
+            "Task {!r} failed on {} of {} hosts:".format(
+                call.called_as or call.task.name,
+                len(results.failed),
+                len(results),
+            )
+        ]
+        for cxn, exception in results.failed.items():
+            result = getattr(exception, "result", None)
+            exited = getattr(result, "exited", None)
+            if exited is not None:
+                reason = "exited with status {}".format(exited)
+            else:
+                reason = "{}: {}".format(type(exception).__name__, exception)
+            label = (labels or {}).get(cxn)
+            if label is None:
+                label = "{}@{}:{}".format(
+                    cxn.user, cxn.original_host, cxn.port
+                )
+            lines.append("  {}: {}".format(label, reason))
+        return "\n".join(lines)
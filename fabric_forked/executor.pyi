@@ -1,9 +1,95 @@
 import invoke
 from invoke import Call, Task
+from invoke.config import Config
+from invoke.parser import ParserContext
 
+from threading import Condition, Lock
+
+from .connection import Connection
+from .group import GroupResult
 from .tasks import ConnectionCall
 
-from typing_extensions import Any, Iterable
+from typing_extensions import Any, Callable, IO, Iterable
+
+
+class PrefixedStream:
+    """
+    Line-buffered output stream which prefixes every line it writes.
+
+    Used by `Executor.execute_parallel` as each host's ``out_stream`` and
+    ``err_stream`` so concurrent output stays readable. Complete lines are
+    written to the wrapped stream while holding ``lock`` (shared by all
+    hosts); a trailing partial line is held until its newline arrives or the
+    stream is closed.
+
+    .. versionadded:: 3.3
+    """
+
+    stream: IO[str]
+    prefix: str
+    lock: Lock
+    _partial: str
+
+    def __init__(self, stream: IO[str], prefix: str, lock: Lock) -> None: ...
+
+    def write(self, text: str) -> int: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None:
+        """
+        Write out any partial line (terminated with a newline) and flush.
+
+        The wrapped stream is left open.
+        """
+        ...
+
+    def isatty(self) -> bool: ...
+
+
+class PipelineBarrier:
+    """
+    A named synchronization point for `Executor.execute_pipelined`.
+
+    Unlike `threading.Barrier`, parties may `leave` instead of arriving, so
+    hosts whose chain failed before reaching the barrier don't keep the
+    others waiting forever. Each instance is single-use.
+
+    .. versionadded:: 3.3
+    """
+
+    name: str
+    parties: int
+    _arrived: int
+    _callbacks: list[Callable[[], Any]]
+    _condition: Condition
+
+    def __init__(self, name: str, parties: int) -> None: ...
+
+    def _ready(self) -> bool: ...
+
+    def _notify(self) -> list[Callable[[], Any]]: ...
+
+    def wait(self) -> None:
+        """
+        Arrive at the barrier and block until all parties have arrived or
+        left.
+        """
+        ...
+
+    def arrive(self, callback: Callable[[], Any]) -> None:
+        """
+        Arrive at the barrier without blocking; ``callback`` is called once
+        all parties have arrived or left, by whichever thread completes it
+        (possibly this one, immediately).
+        """
+        ...
+
+    def leave(self) -> None:
+        """
+        Withdraw one party which will never arrive.
+        """
+        ...
 
 
 class Executor(invoke.Executor):
@@ -61,4 +147,184 @@ class Executor(invoke.Executor):
         """
         ...
     
-    def dedupe(self, tasks: Iterable[Task]) -> list[Task]: ...
\ No newline at end of file
+    def dedupe(self, tasks: Iterable[Task]) -> list[Task]: ...
+    
+    def _core_value(self, name: str, default: Any = None) -> Any: ...
+    
+    def execute(self, *tasks: str | tuple[str, dict[str, Any]] | ParserContext) -> dict[Task, Any]:
+        """
+        Execute one or more ``tasks`` in sequence.
+
+        Identical to the superclass' method unless the ``--parallel`` (``-P``)
+        core flag was given. In that case each task's per-host calls (see
+        `batch_calls`) are run concurrently via `execute_parallel`, and the
+        task's entry in the returned dict is the resulting `.GroupResult`.
+        Calls without hosts, and pre/post tasks, still run one at a time in
+        their usual order. Each batch finishes before the next one starts.
+
+        With the ``--pipeline`` core flag, consecutive per-host calls (see
+        `pipeline_calls`) are instead handed to `execute_pipelined`, so each
+        host moves through its tasks without waiting for other hosts.
+
+        .. versionchanged:: 3.3
+            Added parallel and pipelined execution.
+        """
+        ...
+    
+    def batch_calls(self, calls: Iterable[Call]) -> list[list[Call]]:
+        """
+        Group consecutive calls which only differ by host.
+
+        :returns:
+            A list of batches, in order. Each batch holds either one call, or
+            several `.ConnectionCall` objects parameterizing the same task
+            call for different hosts.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def _same_call(self, first: Call, call: Call) -> bool: ...
+    
+    def pipeline_calls(self, calls: Iterable[Call]) -> list[list[Call]]:
+        """
+        Split calls into batches for `execute_pipelined`.
+
+        Every run of consecutive `.ConnectionCall` objects, whatever their
+        task or host, forms one batch. Each call without a host (e.g. a
+        pre-task run locally) is a batch of its own, so it still runs after
+        everything before it and before everything after it.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def _host_key(self, call: ConnectionCall) -> tuple[tuple[str, str], ...]: ...
+
+    def host_label(self, call: ConnectionCall) -> str:
+        """
+        Label ``call``'s host in prefixed output and failure reports.
+
+        This is the host string the call was parameterized with (e.g.
+        ``user@web1:2222``), plus any ``user`` or ``port`` given separately
+        in a host dict, so hosts differing only by those stay distinct.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def host_streams(self, call: ConnectionCall, lock: Lock) -> tuple[PrefixedStream, PrefixedStream]:
+        """
+        Create the `PrefixedStream` pair used for ``call``'s host output,
+        prefixed with its `host_label`.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def host_config(self,
+        config: Config,
+        streams: tuple[PrefixedStream, PrefixedStream]
+    ) -> Config:
+        """
+        Clone ``config`` for one host's concurrent call, writing output to
+        ``streams`` and disabling stdin.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def execute_parallel(self,
+        calls: list[ConnectionCall],
+        config: Config,
+        autoprint: bool = False
+    ) -> GroupResult:
+        """
+        Run one batch of per-host calls concurrently.
+
+        At most ``--pool-size`` hosts run at once (default: all of them).
+        Each host gets its own clone of ``config``, with
+        ``run.out_stream``/``run.err_stream`` set to `PrefixedStream` objects
+        that prefix output with ``[host]``. Its ``run.in_stream`` is set to
+        ``False``, because concurrent commands cannot share the terminal's
+        stdin.
+
+        :returns:
+            A `.GroupResult` mapping each host's `.Connection` to the task's
+            return value.
+
+        :raises:
+            `~invoke.exceptions.Exit` with `failure_report` as its message
+            (and exit code ``1``), once every host has finished, if any of
+            them raised an exception.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def _barrier_keys(self, pipeline: list[tuple[ConnectionCall, Connection]]) -> list[tuple[str, int] | None]: ...
+
+    def pipeline_barriers(self,
+        pipelines: Iterable[list[tuple[ConnectionCall, Connection]]]
+    ) -> dict[tuple[str, int], PipelineBarrier]:
+        """
+        Create the `PipelineBarrier` objects needed by ``pipelines``.
+
+        Barriers are keyed by name and occurrence: the Nth call of a task
+        with a given ``barrier`` in each pipeline shares one barrier, whose
+        parties are the pipelines with at least N such calls.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def execute_pipelined(self,
+        calls: list[ConnectionCall],
+        direct: Iterable[Call] = ()
+    ) -> dict[Task, GroupResult]:
+        """
+        Run one batch of per-host calls as independent per-host pipelines.
+
+        Calls are grouped by host, keeping their order, and run on a pool of
+        ``--pool-size`` threads (default: one per host). No host waits for
+        others to finish a task before starting its next one, except at
+        barriers (see the ``barrier`` argument to `@task
+        <fabric.tasks.task>`). A host waiting at a barrier doesn't hold a
+        thread: its next task is only queued once the barrier opens.
+
+        Output is prefixed and stdin disabled as for `execute_parallel`. When
+        a task fails on a host, that host's remaining tasks are skipped and
+        it leaves any barriers it would have reached.
+
+        :param direct:
+            The calls given directly on the command line, for autoprinting.
+
+        :returns:
+            A dict mapping each task to a `.GroupResult` of its return values
+            by host's `.Connection`.
+
+        :raises:
+            `~invoke.exceptions.Exit` with a `failure_report` per failed task
+            (and exit code ``1``), once every host has finished, if any of
+            them raised an exception.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def failure_report(self,
+        call: Call,
+        results: GroupResult,
+        labels: dict[Connection, str] | None = None,
+    ) -> str:
+        """
+        Summarize which hosts a parallel call failed on, and why.
+
+        :param labels:
+            Maps each connection in ``results`` to the label its output was
+            prefixed with (see `host_label`). Connections missing from it
+            are labeled ``user@host:port``.
+
+        .. versionadded:: 3.3
+        """
+        ...
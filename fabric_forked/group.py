@@ -1,41 +1,242 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from queue import Queue
+from threading import Lock
 
+from invoke.runners import Result as InvokeResult
 from invoke.util import ExceptionHandlingThread
 
-from .connection import Connection
+from .connection import Connection, derive_shorthand
 from .exceptions import GroupException
+from .timing import percentile
+from .util import debug, warning
+from .transfer import Transfer, _file_hash
+
+
+class HostSpec:
+    __slots__ = ("host", "user", "port", "overrides")
+
+    def __init__(self, host, user=None, port=None, overrides=None):
+        self.host = host
+        self.user = user
+        self.port = port
+        self.overrides = overrides
+
+    @classmethod
+    def from_string(cls, host_string, **overrides):
+        shorthand = derive_shorthand(host_string)
+        return cls(
+            shorthand["host"],
+            user=shorthand["user"],
+            port=shorthand["port"],
+            overrides=overrides or None,
+        )
+
+    def connection(self, **kwargs):
+        if self.overrides:
+            kwargs.update(self.overrides)
+        err = "You supplied the {} via both shorthand and kwarg! Please pick one."  # noqa
+        for name in ("user", "port"):
+            value = getattr(self, name)
+            if value is not None:
+                if kwargs.get(name) is not None:
+                    raise ValueError(err.format(name))
+                kwargs[name] = value
+        return Connection(self.host, **kwargs)
+
+    def __repr__(self):
+        bits = [("host", self.host)]
+        if self.user is not None:
+            bits.append(("user", self.user))
+        if self.port is not None:
+            bits.append(("port", self.port))
+        return "<HostSpec {}>".format(
+            " ".join("{}={!r}".format(*x) for x in bits)
+        )
 
 
 class Group(list):
-    def __init__(self, *hosts, **kwargs):
-        self.extend([Connection(host, **kwargs) for host in hosts])
+    def __init__(
+        self, *hosts, max_workers=None, lazy=False, release=False, **kwargs
+    ):
+        self.max_workers = max_workers
+        self.release = release
+        self._connect_kwargs = kwargs
+        self._connections = {}
+        if lazy:
+            self.extend(
+                HostSpec.from_string(host) if isinstance(host, str) else host
+                for host in hosts
+            )
+        else:
+            self.extend([Connection(host, **kwargs) for host in hosts])
 
     @classmethod
-    def from_connections(cls, connections):
-        group = cls()
+    def from_connections(cls, connections, **kwargs):
+        group = cls(**kwargs)
         group.extend(connections)
         return group
 
-    def _do(self, method, *args, **kwargs):
+    def __iter__(self):
+        for item in self._items():
+            yield self._materialize(item)
+
+    def _items(self):
+        # The members as stored: HostSpecs are left alone, unlike __iter__.
+        return list.__iter__(self)
+
+    def _iter(self, method, *args, **kwargs):
         raise NotImplementedError
 
+    def _materialize(self, item):
+        if not isinstance(item, HostSpec):
+            return item
+        cxn = self._connections.get(item)
+        if cxn is None:
+            cxn = item.connection(**self._connect_kwargs)
+            if not self.release:
+                cxn = self._connections.setdefault(item, cxn)
+        return cxn
+
+    def _release(self, item, cxn):
+        if self.release and isinstance(item, HostSpec):
+            cxn.close()
+
+    def _release_into(self, item, cxn, result):
+        # A failure to close becomes the host's result, unless it already
+        # failed, so callers always get one result per host.
+        try:
+            self._release(item, cxn)
+        except Exception as e:
+            if not isinstance(result, BaseException):
+                result = e
+        return result
+
+    def _do(self, method, *args, **kwargs):
+        results = GroupResult()
+        excepted = False
+        for cxn, result in self._iter(method, *args, **kwargs):
+            results[cxn] = result
+            if isinstance(result, BaseException):
+                excepted = True
+        if excepted:
+            raise GroupException(results)
+        return results
+
+    def _get_kwargs(self, args, kwargs):
+        if len(args) < 2 and "local" not in kwargs:
+            kwargs["local"] = "{host}/"
+        return kwargs
+
+    def as_completed(self, method, *args, **kwargs):
+        return self._iter(method, *args, **kwargs)
+
     def run(self, *args, **kwargs):
         return self._do("run", *args, **kwargs)
 
+    def run_iter(self, *args, **kwargs):
+        return self._iter("run", *args, **kwargs)
+
+    def run_batch(self, *args, **kwargs):
+        return self._do("run_batch", *args, **kwargs)
+
     def sudo(self, *args, **kwargs):
         return self._do("sudo", *args, **kwargs)
 
-    def put(self, *args, **kwargs):
+    def sudo_iter(self, *args, **kwargs):
+        return self._iter("sudo", *args, **kwargs)
+
+    def put(self, *args, fanout=None, **kwargs):
+        if fanout is not None:
+            return self._put_relay(fanout, *args, **kwargs)
         return self._do("put", *args, **kwargs)
 
+    def _put_relay(
+        self,
+        fanout,
+        local,
+        remote=None,
+        preserve_mode=True,
+        verify=True,
+        fallback=True,
+        **kwargs
+    ):
+        if fanout < 1:
+            err = "fanout must be at least 1, got {!r}!"
+            raise ValueError(err.format(fanout))
+        if not isinstance(local, (str, os.PathLike)):
+            raise ValueError("Relayed puts need a local file path!")
+        local = os.path.abspath(local)
+        worker = partial(
+            relay_worker,
+            group=self,
+            local=local,
+            remote=remote,
+            mode=os.stat(local).st_mode if preserve_mode else None,
+            checksums=lru_cache()(partial(_file_hash, local))
+            if verify
+            else None,
+            fallback=fallback,
+            kwargs=dict(kwargs, preserve_mode=preserve_mode),
+        )
+        results = GroupResult()
+        released = []
+        holders = []
+        pending = list(self._items())
+        excepted = False
+        while pending:
+            # Each host holding a verified copy sends it to up to ``fanout``
+            # more per round; we only upload when nobody holds one yet.
+            jobs = []
+            for source in holders or [None]:
+                jobs.extend((source, item) for item in pending[:fanout])
+                pending = pending[fanout:]
+            for item, cxn, result in self._map(worker, jobs):
+                results[cxn] = result
+                if cxn is not item:
+                    released.append((item, cxn))
+                if isinstance(result, BaseException):
+                    excepted = True
+                else:
+                    holders.append((cxn, result.remote))
+        for item, cxn in released:
+            results[cxn] = self._release_into(item, cxn, results[cxn])
+            if isinstance(results[cxn], BaseException):
+                excepted = True
+        if excepted:
+            raise GroupException(results)
+        return results
+
+    def _map(self, func, jobs):
+        return [func(job) for job in jobs]
+
+    def put_iter(self, *args, **kwargs):
+        return self._iter("put", *args, **kwargs)
+
     def get(self, *args, **kwargs):
-        if len(args) < 2 and "local" not in kwargs:
-            kwargs["local"] = "{host}/"
+        kwargs = self._get_kwargs(args, kwargs)
         return self._do("get", *args, **kwargs)
 
+    def get_iter(self, *args, **kwargs):
+        kwargs = self._get_kwargs(args, kwargs)
+        return self._iter("get", *args, **kwargs)
+
+    def put_tree(self, *args, **kwargs):
+        return self._do("put_tree", *args, **kwargs)
+
+    def get_tree(self, *args, **kwargs):
+        kwargs = self._get_kwargs(args, kwargs)
+        return self._do("get_tree", *args, **kwargs)
+
     def close(self):
-        for cxn in self:
-            cxn.close()
+        for item in self._items():
+            if isinstance(item, HostSpec):
+                cxn = self._connections.pop(item, None)
+                if cxn is not None:
+                    cxn.close()
+            else:
+                item.close()
 
     def __enter__(self):
         return self
@@ -45,59 +246,133 @@ class Group(list):
 
 
 class SerialGroup(Group):
-    def _do(self, method, *args, **kwargs):
-        results = GroupResult()
-        excepted = False
-        for cxn in self:
+    def _iter(self, method, *args, **kwargs):
+        for item in self._items():
+            cxn = item
             try:
-                results[cxn] = getattr(cxn, method)(*args, **kwargs)
+                cxn = self._materialize(item)
+                result = getattr(cxn, method)(*args, **kwargs)
             except Exception as e:
-                results[cxn] = e
-                excepted = True
-        if excepted:
-            raise GroupException(results)
-        return results
+                result = e
+            if cxn is not item:
+                result = self._release_into(item, cxn, result)
+            yield cxn, result
+
+
+def thread_worker(cxn, queue, method, args, kwargs, group=None):
+    item = cxn
+    result = None
+    try:
+        if group is not None:
+            cxn = group._materialize(item)
+        result = getattr(cxn, method)(*args, **kwargs)
+    except BaseException as e:
+        result = e
+    # Always report back, or the consumer of _iter waits forever.
+    try:
+        if cxn is not item:
+            result = group._release_into(item, cxn, result)
+    finally:
+        queue.put((cxn, result))
+
+
+def relay_worker(
+    job, group, local, remote, mode, checksums, fallback, kwargs
+):
+    holder, item = job
+    cxn = item
+    try:
+        cxn = group._materialize(item)
+        checksum = None
+        if checksums is not None:
+            checksum = checksums(cxn.config.transfer.hash_algorithm)
+        result = None
+        if holder is not None and not _relayable(cxn):
+            msg = "Not relaying to {!r}, whose address is only known locally"
+            debug(msg.format(cxn))
+            holder = None
+        if holder is not None:
+            source, path = holder
+            try:
+                result = source.relay(
+                    cxn, path, remote, mode=mode, checksum=checksum
+                )
+            except Exception as e:
+                if not fallback:
+                    raise
+                msg = "Relaying to {!r} from {!r} failed ({!r}); uploading"
+                warning(msg.format(cxn, source, e))
+        if result is None:
+            result = cxn.put(local, remote, **kwargs)
+            if checksum is not None:
+                Transfer(cxn).verify(result.remote, checksum)
+    except BaseException as e:
+        result = e
+    return item, cxn, result
 
 
-def thread_worker(cxn, queue, method, args, kwargs):
-    result = getattr(cxn, method)(*args, **kwargs)
-    queue.put((cxn, result))
+def _relayable(cxn):
+    # The relay command dials the target's host, port and user from the
+    # source host, which only works if they mean the same thing there.
+    return not cxn.gateway and cxn.original_host == cxn.host
 
 
 class ThreadingGroup(Group):
-    def _do(self, method, *args, **kwargs):
-        results = GroupResult()
+    _executor = None
+    _executor_lock = None
+
+    def __init__(self, *hosts, **kwargs):
+        super().__init__(*hosts, **kwargs)
+        self._executor_lock = Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="fabric-group",
+                )
+            return self._executor
+
+    def _iter(self, method, *args, **kwargs):
         queue = Queue()
-        threads = []
-        for cxn in self:
-            thread = ExceptionHandlingThread(
-                target=thread_worker,
-                kwargs=dict(
-                    cxn=cxn,
-                    queue=queue,
-                    method=method,
-                    args=args,
-                    kwargs=kwargs,
-                ),
-            )
-            threads.append(thread)
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
-        while not queue.empty():
-            cxn, result = queue.get(block=False)
-            results[cxn] = result
-        excepted = False
-        for thread in threads:
-            wrapper = thread.exception()
-            if wrapper is not None:
-                cxn = wrapper.kwargs["kwargs"]["cxn"]
-                results[cxn] = wrapper.value
-                excepted = True
-        if excepted:
-            raise GroupException(results)
-        return results
+        cxns = list(self._items())
+        if self.max_workers is None:
+            for cxn in cxns:
+                ExceptionHandlingThread(
+                    target=thread_worker,
+                    kwargs=dict(
+                        cxn=cxn,
+                        queue=queue,
+                        method=method,
+                        args=args,
+                        kwargs=kwargs,
+                        group=self,
+                    ),
+                ).start()
+        else:
+            executor = self._get_executor()
+            for cxn in cxns:
+                executor.submit(
+                    thread_worker, cxn, queue, method, args, kwargs, self
+                )
+        for _ in cxns:
+            yield queue.get()
+
+    def _map(self, func, jobs):
+        if self.max_workers is not None:
+            return list(self._get_executor().map(func, jobs))
+        with ThreadPoolExecutor(
+            max_workers=max(len(jobs), 1), thread_name_prefix="fabric-group"
+        ) as executor:
+            return list(executor.map(func, jobs))
+
+    def close(self):
+        super().close()
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
 
 
 class GroupResult(dict):
@@ -105,6 +380,72 @@ class GroupResult(dict):
         super().__init__(*args, **kwargs)
         self._successes = {}
         self._failures = {}
+        self._summaries = {}
+        self._texts = {}
+        for value in self.values():
+            self._intern(value)
+
+    def __setitem__(self, key, value):
+        self._intern(value)
+        super().__setitem__(key, value)
+        self._reset()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._reset()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        for value in self.values():
+            self._intern(value)
+        self._reset()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._reset()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._reset()
+        return item
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def clear(self):
+        super().clear()
+        self._reset()
+
+    def _reset(self):
+        self._successes, self._failures, self._summaries = {}, {}, {}
+
+    def _intern(self, value):
+        results = value if isinstance(value, list) else [value]
+        for result in results:
+            result = self._result_of(result)
+            if result is None:
+                continue
+            for name in ("stdout", "stderr"):
+                text = getattr(result, "_" + name, None)
+                if text is None:
+                    text = getattr(result, name, None)
+                if isinstance(text, str):
+                    setattr(result, name, self._texts.setdefault(text, text))
+
+    @staticmethod
+    def _result_of(value):
+        if isinstance(value, BaseException):
+            value = getattr(value, "result", None)
+        if isinstance(value, InvokeResult):
+            return value
+        return None
 
     def _bifurcate(self):
         if self._successes or self._failures:
@@ -124,3 +465,55 @@ class GroupResult(dict):
     def failed(self):
         self._bifurcate()
         return self._failures
+
+    def _summarize(self, name, get):
+        summary = self._summaries.get(name)
+        if summary is None:
+            summary = {}
+            for key, value in self.items():
+                result = self._result_of(value)
+                group = None if result is None else get(result)
+                summary.setdefault(group, []).append(key)
+            self._summaries[name] = summary
+        return summary
+
+    def by_output(self, stream="stdout"):
+        return self._summarize(stream, lambda x: getattr(x, stream))
+
+    def by_exit_code(self):
+        return self._summarize("exited", lambda x: x.exited)
+
+    def timing_percentiles(self, percentiles=(50, 90, 99)):
+        samples = {}
+        for value in self.values():
+            results = value if isinstance(value, list) else [value]
+            for result in results:
+                if isinstance(result, BaseException):
+                    result = getattr(result, "result", None)
+                timings = getattr(result, "timings", None) or {}
+                for phase, seconds in timings.items():
+                    samples.setdefault(phase, []).append(seconds)
+        return {
+            phase: {pct: percentile(values, pct) for pct in percentiles}
+            for phase, values in samples.items()
+        }
+
+    def report(self, stream="stdout"):
+        blocks = []
+        groups = sorted(
+            self.by_output(stream).items(), key=lambda x: -len(x[1])
+        )
+        for text, keys in groups:
+            header = "{} ({})".format(
+                ",".join(getattr(x, "host", str(x)) for x in keys),
+                len(keys),
+            )
+            rule = "-" * len(header)
+            if text is None:
+                error = self[keys[0]]
+                if isinstance(error, BaseException):
+                    text = "[{}: {}]".format(type(error).__name__, error)
+                else:
+                    text = "[no {}]".format(stream)
+            blocks.append("\n".join((rule, header, rule, text.rstrip("\n"))))
+        return "\n".join(blocks)
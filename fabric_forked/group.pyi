@@ -1,11 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from queue import Queue
+from threading import Lock
+
+from invoke.runners import Result as InvokeResult
+
+from os import PathLike
 
 from .connection import Connection
 from ._types import ConnectKwargs
 
 from typing_extensions import (
     Any,
+    Callable,
     Iterable,
+    Iterator,
     Self,
     TypeVar,
     Never,
@@ -15,6 +23,58 @@ from typing_extensions import (
 DT = TypeVar('DT')
 
 
+class HostSpec:
+    """
+    Compact, not-yet-connected description of one host in a lazy `.Group`.
+
+    Holds only the parsed host shorthand and any per-host keyword
+    arguments; the (much larger) `.Connection` is created by `connection`
+    when the group first works on the host.
+
+    .. versionadded:: 3.3
+    """
+
+    __slots__ = ("host", "user", "port", "overrides")
+
+    host: str
+    user: str | None
+    port: int | None
+    overrides: dict[str, Any] | None
+
+    def __init__(self,
+        host: str,
+        user: str | None = None,
+        port: int | None = None,
+        overrides: dict[str, Any] | None = None
+    ) -> None:
+        """
+        :param dict overrides:
+            `.Connection` keyword arguments for this host only, taking
+            precedence over those given to the group.
+        """
+        ...
+
+    @classmethod
+    def from_string(cls, host_string: str, **overrides: Any) -> HostSpec:
+        """
+        Parse a ``user@host:port`` shorthand string into a `HostSpec`.
+        """
+        ...
+
+    def connection(self, **kwargs: Any) -> Connection:
+        """
+        Create the `.Connection` for this host.
+
+        ``kwargs`` (typically the group's keyword arguments) are combined
+        with ``overrides``. As with `.Connection`, giving the user or port
+        both in the shorthand and as a keyword argument raises
+        ``ValueError``.
+        """
+        ...
+
+    def __repr__(self) -> str: ...
+
+
 class Group(list[Connection]):
     """
     A collection of `.Connection` objects whose API operates on its contents.
@@ -69,7 +129,18 @@ class Group(list[Connection]):
         Added context manager behavior.
     """
     
-    def __init__(self, *hosts: str, **kwargs: ConnectKwargs) -> None:
+    max_workers: int | None
+    release: bool
+    _connect_kwargs: dict[str, Any]
+    _connections: dict[HostSpec, Connection]
+    
+    def __init__(self,
+        *hosts: str | HostSpec,
+        max_workers: int | None = None,
+        lazy: bool = False,
+        release: bool = False,
+        **kwargs: ConnectKwargs
+    ) -> None:
         """
         Create a group of connections from one or more shorthand host strings.
 
@@ -86,22 +157,114 @@ class Group(list[Connection]):
                 "host1", "host2", "host3", user="admin", forward_agent=True,
             )
 
+        :param int max_workers:
+            Upper bound on how many connections are worked on at the same
+            time by concurrent subclasses such as `.ThreadingGroup`. Default:
+            ``None``, meaning every connection gets its own worker. Ignored
+            by `.SerialGroup`.
+
+        :param bool lazy:
+            Store each host as a `HostSpec` instead of a `.Connection`, and
+            only create the connection (ssh_config lookup, `SSHClient
+            <paramiko.client.SSHClient>` and so on) when a group method first
+            works on that host. Connections are created in the worker
+            threads, and are reused by later calls unless ``release`` is set.
+            Worthwhile for very large inventories, where building every
+            `.Connection` upfront takes seconds and a lot of memory. Note
+            that the group's members are then `HostSpec` objects, though
+            iterating over the group still yields `.Connection` objects (see
+            `__iter__`), as do `.GroupResult` keys (except for the
+            `HostSpec` of a host whose connection couldn't be created).
+            Default: ``False``.
+
+        :param bool release:
+            With ``lazy``, close and forget each host's connection as soon as
+            the host's part of a group method call is done, so that at most
+            ``max_workers`` connections are held at a time. The next call
+            creates a new connection. Default: ``False``.
+
         .. versionchanged:: 2.3
             Added ``**kwargs`` (was previously only ``*hosts``).
+        .. versionchanged:: 3.3
+            Added the ``max_workers``, ``lazy`` and ``release`` parameters.
         """
         ...
     
     @classmethod
-    def from_connections(cls, connections: Iterable[Connection]) -> Group[Connection]:
+    def from_connections(cls,
+        connections: Iterable[Connection],
+        **kwargs
+    ) -> Group[Connection]:
         """
         Alternate constructor accepting `.Connection` objects.
 
+        Any keyword arguments (such as ``max_workers``) are handed to the
+        group's constructor.
+
         .. versionadded:: 2.0
+        .. versionchanged:: 3.3
+            Added ``**kwargs``.
         """
         ...
     
     @deprecated('This method is not implemented')
-    def _do(self, method: str, *args, **kwargs) -> Never: ...
+    def _iter(self, method: str, *args, **kwargs) -> Never: ...
+    
+    def __iter__(self) -> Iterator[Connection]:
+        """
+        Iterate over the group's connections.
+
+        Members of lazy groups are `HostSpec` objects, which are turned into
+        their `.Connection` first; as with group methods, those connections
+        are then reused, unless ``release`` is set, in which case closing
+        each one is up to the caller.
+
+        .. versionchanged:: 3.3
+            Yields connections for lazy groups too.
+        """
+        ...
+
+    def _items(self) -> Iterator[Connection | HostSpec]: ...
+
+    def _materialize(self, item: Connection | HostSpec) -> Connection: ...
+
+    def _release(self, item: Connection | HostSpec, cxn: Connection) -> None: ...
+
+    def _release_into(self,
+        item: Connection | HostSpec,
+        cxn: Connection,
+        result: Any | BaseException,
+    ) -> Any | BaseException: ...
+
+    def _do(self, method: str, *args, **kwargs) -> GroupResult: ...
+    
+    def _get_kwargs(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, Any]: ...
+    
+    def as_completed(self, method: str, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]:
+        """
+        Call ``method`` on all member connections, yielding as each finishes.
+
+        Each item is a ``(connection, value)`` tuple, where ``value`` is the
+        method's return value, or the exception it raised (exceptions are
+        yielded, never raised, so one bad host does not end the iteration).
+        Items arrive in completion order, so follow-up work on fast hosts can
+        begin while slower ones are still running. Work starts when iteration
+        does.
+
+        A partial `.GroupResult` may be built up as items arrive::
+
+            results = GroupResult()
+            for cxn, result in group.run_iter("uptime"):
+                results[cxn] = result
+                if results.failed:
+                    break
+
+        :param str method:
+            Name of the `.Connection` method to call, e.g. ``"run"``.
+
+        .. versionadded:: 3.3
+        """
+        ...
     
     def run(self, *args, **kwargs):
         """
@@ -113,6 +276,27 @@ class Group(list[Connection]):
         """
         ...
     
+    def run_iter(self, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]:
+        """
+        Like `run`, but yields results as they complete; see `as_completed`.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def run_batch(self, *args, **kwargs) -> GroupResult:
+        """
+        Executes `.Connection.run_batch` on all member `Connections
+        <.Connection>`.
+
+        :returns:
+            a `.GroupResult` whose values are lists of `.runners.Result`
+            objects.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
     def sudo(self, *args, **kwargs) -> GroupResult:
         """
         Executes `.Connection.sudo` on all member `Connections <.Connection>`.
@@ -123,7 +307,15 @@ class Group(list[Connection]):
         """
         ...
     
-    def put(self, *args, **kwargs) -> GroupResult:
+    def sudo_iter(self, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]:
+        """
+        Like `sudo`, but yields results as they complete; see `as_completed`.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def put(self, *args, fanout: int | None = None, **kwargs) -> GroupResult:
         """
         Executes `.Connection.put` on all member `Connections <.Connection>`.
 
@@ -132,10 +324,72 @@ class Group(list[Connection]):
         result is like running a loop over the connections and calling their
         ``put`` method.
 
+        Given a ``fanout``, the file is instead uploaded to only ``fanout``
+        hosts, which then pass it on host to host with `.Connection.relay`:
+        in each round, every host holding a copy sends it to up to
+        ``fanout`` more. Outgoing traffic from here is thus ``fanout``
+        copies rather than one per host, and a group of ``N`` hosts is
+        covered in about ``log(N) / log(fanout + 1)`` rounds; ``fanout=1``
+        forms chains. Hosts must be able to reach each other; see
+        `.Transfer.relay` for requirements. Hosts reached through a gateway,
+        or whose address comes from an SSH config ``HostName`` alias, are
+        always uploaded to directly, since other hosts can't dial them the
+        way we do. `.SerialGroup` runs each round's
+        copies one at a time, `.ThreadingGroup` concurrently. Then these
+        extra keyword arguments are accepted, and ``local`` must be a path:
+
+        :param bool verify:
+            Check each host's copy against the local file's hash (see
+            `.Transfer.verify`), including those uploaded directly.
+            Default: ``True``.
+
+        :param bool fallback:
+            When relaying to a host fails (e.g. because the source doesn't
+            trust its host key), log a warning and upload to it directly
+            instead. Default: ``True``.
+
+        Hosts which failed don't relay further; hosts still waiting are
+        served by the others, or by direct uploads if none succeeded.
+
         :returns:
-            a `.GroupResult` whose values are `.transfer.Result` instances.
+            a `.GroupResult` whose values are `.transfer.Result` instances;
+            for relayed copies, `~.transfer.Result.relayed_from` names the
+            source.
 
         .. versionadded:: 2.6
+        .. versionchanged:: 3.3
+            Added ``fanout``.
+        """
+        ...
+
+    def _put_relay(self,
+        fanout: int,
+        local: str | PathLike[str],
+        remote: str | None = None,
+        preserve_mode: bool = True,
+        verify: bool = True,
+        fallback: bool = True,
+        **kwargs
+    ) -> GroupResult: ...
+
+    def _map(self,
+        func: Callable[[Any], Any],
+        jobs: list[Any],
+    ) -> list[Any]:
+        """
+        Call ``func`` on each of ``jobs``, returning results in order.
+
+        Runs them one at a time; subclasses may run them concurrently.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def put_iter(self, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]:
+        """
+        Like `put`, but yields results as they complete; see `as_completed`.
+
+        .. versionadded:: 3.3
         """
         ...
     
@@ -166,10 +420,52 @@ class Group(list[Connection]):
         """
         ...
     
+    def get_iter(self, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]:
+        """
+        Like `get`, but yields results as they complete; see `as_completed`.
+
+        The same ``"{host}/"`` default for ``local`` applies.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def put_tree(self, *args, **kwargs) -> GroupResult:
+        """
+        Executes `.Connection.put_tree` on all member `Connections
+        <.Connection>`.
+
+        :returns:
+            a `.GroupResult` whose values are `.transfer.TreeResult`
+            instances.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def get_tree(self, *args, **kwargs) -> GroupResult:
+        """
+        Executes `.Connection.get_tree` on all member `Connections
+        <.Connection>`.
+
+        As with `get`, ``local`` defaults to ``"{host}/"``, so each host's
+        tree lands in its own directory.
+
+        :returns:
+            a `.GroupResult` whose values are `.transfer.TreeResult`
+            instances.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
     def close(self) -> None:
         """
         Executes `.Connection.close` on all member `Connections <.Connection>`.
 
+        For lazy groups, closes (and forgets) every connection created so
+        far.
+
         .. versionadded:: 2.4
         """
         ...
@@ -186,7 +482,32 @@ class SerialGroup(Group):
     .. versionadded:: 2.0
     """
 
-    def _do(self, method: str, *args, **kwargs) -> GroupResult: ...
+    def _iter(self, method: str, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]: ...
+
+
+def relay_worker(
+    job: tuple[tuple[Connection, str] | None, Connection | HostSpec],
+    group: Group,
+    local: str,
+    remote: str | None,
+    mode: int | None,
+    checksums: Callable[[str], str] | None,
+    fallback: bool,
+    kwargs: dict[str, Any],
+) -> tuple[Connection | HostSpec, Connection, Any | BaseException]:
+    """
+    Deliver ``local`` to one host for a `.Group.put` with a ``fanout``.
+
+    ``job`` is a ``(holder, item)`` pair; ``holder`` is a ``(connection,
+    path)`` to relay from, or ``None`` to upload directly. ``checksums``
+    maps a `.Transfer.hash_algorithm` to ``local``'s digest, when verifying.
+
+    .. versionadded:: 3.3
+    """
+    ...
+
+
+def _relayable(cxn: Connection) -> bool: ...
 
 
 def thread_worker(
@@ -194,7 +515,8 @@ def thread_worker(
     queue: Queue[tuple[Connection, Any]],
     method: str,
     args: tuple[Any, ...],
-    kwargs: dict[str, Any]
+    kwargs: dict[str, Any],
+    group: Group | None = None
 ) -> None: ...
 
 
@@ -202,10 +524,38 @@ class ThreadingGroup(Group):
     """
     Subclass of `.Group` which uses threading to execute concurrently.
 
+    By default, each call starts one thread per connection. When
+    ``max_workers`` is given, calls are instead run on a bounded
+    `~concurrent.futures.ThreadPoolExecutor` which is created on first use,
+    reused by every subsequent ``run``/``sudo``/``put``/``get`` call on the
+    same group, and shut down by `close`.
+
     .. versionadded:: 2.0
+    .. versionchanged:: 3.3
+        Added the bounded worker pool used when ``max_workers`` is set.
     """
 
-    def _do(self, method: str, *args, **kwargs) -> GroupResult: ...
+    _executor: ThreadPoolExecutor | None
+    _executor_lock: Lock
+
+    def __init__(self, *hosts: str, **kwargs) -> None: ...
+
+    def _get_executor(self) -> ThreadPoolExecutor: ...
+
+    def _iter(self, method: str, *args, **kwargs) -> Iterator[tuple[Connection, Any | BaseException]]: ...
+
+    def _map(self,
+        func: Callable[[Any], Any],
+        jobs: list[Any],
+    ) -> list[Any]: ...
+
+    def close(self) -> None:
+        """
+        Close all member connections, then shut down the worker pool (if any).
+
+        .. versionadded:: 3.3
+        """
+        ...
 
 
 class GroupResult(dict[Connection, DT | BaseException]):
@@ -226,14 +576,54 @@ class GroupResult(dict[Connection, DT | BaseException]):
       - Of note, these attributes allow high level logic, e.g. ``if
         mygroup.run('command').failed`` and so forth.
 
+    - May be filled in incrementally (e.g. from `.Group.as_completed`);
+      `.succeeded` and `.failed` always reflect the current contents.
+    - Stores each distinct ``stdout``/``stderr`` text once: as results (or
+      exceptions carrying a ``result``, such as
+      `~invoke.exceptions.UnexpectedExit`) are added, their output strings
+      are replaced by a shared copy of any identical text already stored.
+      Memory use for output thus scales with the number of distinct outputs
+      rather than the number of hosts. `by_output`, `by_exit_code` and
+      `report` summarize results the way ``dshbak``/``clubak`` do.
+
     .. versionadded:: 2.0
+    .. versionchanged:: 3.3
+        Added output deduplication and the summary methods.
     """
 
     _successes: dict[Connection, DT]
     _failures: dict[Connection, BaseException]
+    _summaries: dict[str, dict[Any, list[Connection]]]
+    _texts: dict[str, str]
     
     def __init__(self, *args, **kwargs) -> None: ...
 
+    def __setitem__(self, key: Connection, value: DT | BaseException) -> None: ...
+
+    def __delitem__(self, key: Connection) -> None: ...
+
+    def update(self, *args, **kwargs) -> None: ...
+
+    def __ior__(self, other: Any) -> Self: ...
+
+    def pop(self, *args: Any) -> DT | BaseException: ...
+
+    def popitem(self) -> tuple[Connection, DT | BaseException]: ...
+
+    def setdefault(self,
+        key: Connection,
+        default: DT | BaseException | None = None,
+    ) -> DT | BaseException | None: ...
+
+    def clear(self) -> None: ...
+
+    def _reset(self) -> None: ...
+
+    def _intern(self, value: Any) -> None: ...
+
+    @staticmethod
+    def _result_of(value: Any) -> InvokeResult | None: ...
+
     def _bifurcate(self) -> None: ...
 
     @property
@@ -253,3 +643,73 @@ class GroupResult(dict[Connection, DT | BaseException]):
         .. versionadded:: 2.0
         """
         ...
+
+    def _summarize(self,
+        name: str,
+        get: Callable[[InvokeResult], Any]
+    ) -> dict[Any, list[Connection]]: ...
+
+    def by_output(self, stream: str = "stdout") -> dict[str | None, list[Connection]]:
+        """
+        Group connections by identical output.
+
+        :param str stream: ``"stdout"`` (the default) or ``"stderr"``.
+
+        :returns:
+            A dict mapping each distinct output text to the connections which
+            produced it, in insertion order. Connections whose value has no
+            command result (e.g. a connection error, or a transfer result)
+            are listed under ``None``.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def by_exit_code(self) -> dict[int | None, list[Connection]]:
+        """
+        Group connections by command exit code.
+
+        As with `by_output`, connections without a command result are listed
+        under ``None``.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def timing_percentiles(self, percentiles: Iterable[float] = (50, 90, 99)) -> dict[str, dict[float, float]]:
+        """
+        Summarize the results' `.Timings` across hosts.
+
+        Returns a dict mapping each phase name (``dns``, ``kex``, ``command``
+        and so on) to a dict of the requested percentiles of its duration in
+        seconds, e.g. ``{"kex": {50: 0.04, 90: 0.11, 99: 0.3}, ...}``.
+        Percentiles interpolate linearly between the closest ranks.
+
+        Results from both `.Group.run` and the transfer methods are
+        considered, as are the results carried by exceptions such as
+        `~invoke.exceptions.UnexpectedExit`. Hosts which failed to connect
+        have no timings; use a ``timings.hooks`` callback to observe those.
+        Connection phases such as ``kex`` count once per connection opened,
+        not once per result.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def report(self, stream: str = "stdout") -> str:
+        """
+        Render `by_output` as text, most common output first.
+
+        Each block is headed by the comma-separated hosts which produced it,
+        and their count, e.g.::
+
+            -------------
+            web1,web2 (2)
+            -------------
+            ok
+
+        Hosts without a result show their exception instead of output.
+
+        .. versionadded:: 3.3
+        """
+        ...
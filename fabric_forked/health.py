@@ -0,0 +1,133 @@
+import time
+import weakref
+from functools import partial
+from threading import Event, Lock, Thread, current_thread
+
+from .util import debug
+
+
+class MonitorEntry:
+    def __init__(self, connection, callback=None):
+        self.ref = weakref.ref(connection, callback)
+        self.failures = 0
+        self.next_attempt = 0.0
+
+
+class HealthMonitor:
+    def __init__(self, interval=30, idle=60, backoff=1, max_backoff=300):
+        self.interval = interval
+        self.idle = idle
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._entries = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = None
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, connection):
+        entry = self._entries.get(id(connection))
+        return entry is not None and entry.ref() is connection
+
+    def watch(self, connection):
+        # Keyed by id() rather than by the connection, since connections
+        # to the same host compare (and hash) equal. The weakref callback
+        # drops the entry before its id can be reused.
+        key = id(connection)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.ref() is not connection:
+                self._entries[key] = MonitorEntry(
+                    connection, partial(self._forget, key)
+                )
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = Thread(
+                    target=self._run, name="fabric-health", daemon=True
+                )
+                self._thread.start()
+
+    def unwatch(self, connection):
+        with self._lock:
+            entry = self._entries.get(id(connection))
+            if entry is not None and entry.ref() is connection:
+                del self._entries[id(connection)]
+
+    def _forget(self, key, ref):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.ref is ref:
+                del self._entries[key]
+
+    def stop(self):
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not current_thread():
+            thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def check(self):
+        now = time.monotonic()
+        reconnected = 0
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, entry in entries:
+            connection = entry.ref()
+            if connection is None:
+                with self._lock:
+                    self._entries.pop(key, None)
+                continue
+            if now < entry.next_attempt:
+                continue
+            if connection.idle_time() < self.idle:
+                continue
+            if not connection._open_lock.acquire(blocking=False):
+                continue
+            try:
+                if connection.is_alive():
+                    entry.failures = 0
+                    continue
+                debug("{!r} is down; reconnecting".format(connection))
+                connection.reconnect()
+            except Exception as e:
+                entry.failures += 1
+                delay = min(
+                    self.backoff * 2 ** (entry.failures - 1), self.max_backoff
+                )
+                entry.next_attempt = time.monotonic() + delay
+                debug(
+                    "Reconnecting {!r} failed ({!r}); retrying in {}s".format(
+                        connection, e, delay
+                    )
+                )
+            else:
+                entry.failures = 0
+                entry.next_attempt = 0.0
+                reconnected += 1
+            finally:
+                connection._open_lock.release()
+        return reconnected
+
+
+_default_monitor = None
+_default_monitor_lock = Lock()
+
+
+def get_default_monitor():
+    global _default_monitor
+    with _default_monitor_lock:
+        if _default_monitor is None:
+            _default_monitor = HealthMonitor()
+        return _default_monitor
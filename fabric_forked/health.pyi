@@ -0,0 +1,143 @@
+"""
+Background liveness checks and reconnection for long-lived connections.
+"""
+
+import weakref
+from threading import Event, Lock, Thread
+
+from typing_extensions import Any, Callable, Self
+
+from .connection import Connection
+
+
+class MonitorEntry:
+    """
+    Bookkeeping for a single connection watched by a `HealthMonitor`.
+
+    .. versionadded:: 3.3
+    """
+
+    ref: weakref.ref[Connection]
+    failures: int
+    """
+    Consecutive failed reconnection attempts.
+    """
+    next_attempt: float
+    """
+    `time.monotonic` value before which the connection is left alone, while
+    backing off after failures.
+    """
+
+    def __init__(self,
+        connection: Connection,
+        callback: Callable[[weakref.ref[Connection]], Any] | None = None,
+    ) -> None: ...
+
+
+class HealthMonitor:
+    """
+    Keeps idle connections usable by checking them in the background.
+
+    Monitoring is opt-in via the ``health_monitor`` :ref:`configuration
+    value <default-values>`. Set it to ``True`` to use the process-wide
+    monitor returned by `get_default_monitor`, or to a `HealthMonitor`
+    instance to use a specific one. `.Connection.open` then registers the
+    connection with the monitor, and `.Connection.close` removes it.
+
+    Every ``interval`` seconds, a daemon thread checks each connection that
+    has been idle for at least ``idle`` seconds, using `.Connection.is_alive`.
+    Connections that are down, or whose transport died, are reconnected via
+    `.Connection.reconnect`, so the next command doesn't pay the connect and
+    authentication cost. A failed reconnection is retried after ``backoff``
+    seconds, doubling after each further failure up to ``max_backoff``.
+    Connections busy opening in another thread are skipped until the next
+    pass.
+
+    The monitor holds only weak references, so watched connections may still
+    be garbage collected; they are then forgotten. Monitors are shared by reference: copying one (as
+    `.Config.clone` does) returns the same object.
+
+    .. versionadded:: 3.3
+    """
+
+    interval: float
+    idle: float
+    backoff: float
+    max_backoff: float
+    _entries: dict[int, MonitorEntry]
+    _lock: Lock
+    _stopped: Event
+    _thread: Thread | None
+
+    def __init__(self,
+        interval: float = 30,
+        idle: float = 60,
+        backoff: float = 1,
+        max_backoff: float = 300,
+    ) -> None:
+        """
+        :param float interval:
+            Seconds between checks. Default: ``30``.
+
+        :param float idle:
+            Seconds a connection must go unused before it is checked.
+            Default: ``60``.
+
+        :param float backoff:
+            Seconds to wait before retrying a failed reconnection.
+            Default: ``1``.
+
+        :param float max_backoff:
+            Upper bound for the doubling retry delay. Default: ``300``.
+        """
+        ...
+
+    def __copy__(self) -> Self: ...
+
+    def __deepcopy__(self, memo: dict[int, object]) -> Self: ...
+
+    def __len__(self) -> int: ...
+
+    def __contains__(self, connection: Connection) -> bool: ...
+
+    def watch(self, connection: Connection) -> None:
+        """
+        Start monitoring ``connection``, and the monitor thread if needed.
+        """
+        ...
+
+    def unwatch(self, connection: Connection) -> None:
+        """
+        Stop monitoring ``connection``.
+        """
+        ...
+
+    def _forget(self, key: int, ref: weakref.ref[Connection]) -> None: ...
+
+    def stop(self) -> None:
+        """
+        Stop the monitor thread. A later `watch` starts it again.
+        """
+        ...
+
+    def _run(self) -> None: ...
+
+    def check(self) -> int:
+        """
+        Check every idle connection once, reconnecting those found down.
+
+        This is what the monitor thread does every ``interval``. It may also be
+        called directly, e.g. from an existing scheduler.
+
+        :returns: The number of connections reconnected.
+        """
+        ...
+
+
+def get_default_monitor() -> HealthMonitor:
+    """
+    Return the process-wide `HealthMonitor`, creating it on first use.
+
+    .. versionadded:: 3.3
+    """
+    ...
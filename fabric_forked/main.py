@@ -38,6 +38,21 @@ class Fab(Program):
                 kind=bool,
                 help="Display ssh-agent key list, and exit.",
             ),
+            Argument(
+                names=("P", "parallel"),
+                kind=bool,
+                help="Run each task on all of its hosts concurrently.",
+            ),
+            Argument(
+                names=("pipeline",),
+                kind=bool,
+                help="Run each host's chain of tasks independently of other hosts.",  # noqa
+            ),
+            Argument(
+                names=("pool-size",),
+                kind=int,
+                help="Maximum number of hosts to run on at once with --parallel or --pipeline (default: all).",  # noqa
+            ),
             Argument(
                 names=("prompt-for-login-password",),
                 kind=bool,
@@ -0,0 +1,131 @@
+import posixpath
+import shlex
+import stat
+import time
+from threading import Lock
+
+from paramiko.sftp_attr import SFTPAttributes
+
+from .util import debug
+
+
+class RemoteMetadataCache:
+    batch_size = 256
+
+    def __init__(self, connection, ttl=0):
+        self.connection = connection
+        self.ttl = ttl
+        self._cwd = None
+        self._stats = {}
+        self._lock = Lock()
+
+    def _fresh(self, stamp):
+        return bool(self.ttl) and time.monotonic() - stamp < self.ttl
+
+    def cwd(self):
+        with self._lock:
+            cached = self._cwd
+        if cached is not None and self._fresh(cached[0]):
+            return cached[1]
+        sftp = self.connection.sftp()
+        cwd = sftp.getcwd() or sftp.normalize(".")
+        with self._lock:
+            self._cwd = (time.monotonic(), cwd)
+        return cwd
+
+    def get(self, path):
+        with self._lock:
+            cached = self._stats.get(path)
+        if cached is not None and self._fresh(cached[0]):
+            return cached[1]
+        return None
+
+    def stat(self, path):
+        attr = self.get(path)
+        if attr is None:
+            attr = self.connection.sftp().stat(path)
+            self.update(path, attr)
+        return attr
+
+    def is_dir(self, path):
+        try:
+            return stat.S_ISDIR(self.stat(path).st_mode)
+        except IOError:
+            return False
+
+    def stat_many(self, paths):
+        found = {}
+        missing = []
+        for path in paths:
+            attr = self.get(path)
+            if attr is None:
+                missing.append(path)
+            else:
+                found[path] = attr
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i : i + self.batch_size]
+            stats = self._remote_stats(batch)
+            for path in batch:
+                attr = None if stats is None else stats.get(path)
+                if stats is None or "\n" in path:
+                    try:
+                        attr = self.stat(path)
+                    except IOError:
+                        attr = None
+                elif attr is not None:
+                    self.update(path, attr)
+                found[path] = attr
+        return found
+
+    def update(self, path, attr):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._stats[path] = (time.monotonic(), attr)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._cwd = None
+                self._stats.clear()
+                return
+            path = path.rstrip("/") or "/"
+            prefix = posixpath.join(path, "")
+            for key in list(self._stats):
+                if key == path or key.startswith(prefix):
+                    del self._stats[key]
+
+    def _remote_stats(self, paths):
+        command = "stat -L -c '%s %f %u %g %X %Y %n' -- {}".format(
+            " ".join(shlex.quote(x) for x in paths)
+        )
+        # Bypass Connection.run, which would empty this cache afterwards.
+        self.connection.open()
+        result = self.connection._run(
+            self.connection._remote_runner(),
+            command,
+            hide=True,
+            warn=True,
+            in_stream=False,
+        )
+        stats = {}
+        for line in result.stdout.splitlines():
+            fields = line.split(" ", 6)
+            if len(fields) != 7:
+                continue
+            attr = SFTPAttributes()
+            try:
+                attr.st_size = int(fields[0])
+                attr.st_mode = int(fields[1], 16)
+                attr.st_uid = int(fields[2])
+                attr.st_gid = int(fields[3])
+                attr.st_atime = int(fields[4])
+                attr.st_mtime = int(fields[5])
+            except ValueError:
+                continue
+            stats[fields[6]] = attr
+        if not stats and result.failed:
+            msg = "Batched stat failed ({}), falling back to SFTP"
+            debug(msg.format(result.return_code))
+            return None
+        return stats
@@ -0,0 +1,115 @@
+"""
+Caching of remote filesystem metadata for file transfers.
+"""
+
+from threading import Lock
+
+from paramiko.sftp_attr import SFTPAttributes
+
+from typing_extensions import Iterable
+
+from .connection import Connection
+
+
+class RemoteMetadataCache:
+    """
+    Short-lived cache of a connection's remote working directory and
+    ``stat`` results.
+
+    Owned by a `.Connection` (see `.Connection.remote_metadata`) rather than
+    by the throwaway `.Transfer` objects that use it, so it survives across
+    transfers. `.Transfer` resolves relative remote paths against `cwd`,
+    answers `.Transfer.is_remote_dir` from `stat`, and records what it
+    learns from its own uploads and downloads via `update`, so uploading many
+    files to one directory costs no extra ``stat`` or ``getcwd`` round trips
+    per file.
+
+    Entries expire ``ttl`` seconds after they were fetched; a falsey ``ttl``
+    (the default) disables caching altogether. Only successful lookups are
+    cached, never missing paths. The connection empties the cache after each
+    `.Connection.run`, `.Connection.sudo`, `.Connection.shell` or
+    `.ShellSession` command, since those may change the remote filesystem.
+    Changes made behind the cache's back (e.g. by another client) may go
+    unseen until expiry; call `invalidate` after making them.
+
+    .. versionadded:: 3.3
+    """
+
+    batch_size: int
+    """
+    Maximum number of paths `stat_many` passes to a single remote command.
+    """
+
+    connection: Connection
+    ttl: float | None
+    _cwd: tuple[float, str] | None
+    _stats: dict[str, tuple[float, SFTPAttributes]]
+    _lock: Lock
+
+    def __init__(self, connection: Connection, ttl: float | None = 0) -> None:
+        """
+        :param connection: The `.Connection` whose remote end is cached.
+
+        :param float ttl:
+            Seconds to keep each entry. Default: ``0`` (no caching).
+        """
+        ...
+
+    def _fresh(self, stamp: float) -> bool: ...
+
+    def cwd(self) -> str:
+        """
+        Return the SFTP session's normalized working directory.
+        """
+        ...
+
+    def get(self, path: str) -> SFTPAttributes | None:
+        """
+        Return the cached attributes for ``path``, without any I/O.
+        """
+        ...
+
+    def stat(self, path: str) -> SFTPAttributes:
+        """
+        Return attributes for ``path``, fetching them over SFTP on a miss.
+
+        :raises: `IOError` if the remote path doesn't exist.
+        """
+        ...
+
+    def is_dir(self, path: str) -> bool:
+        """
+        Return whether ``path`` is a remote directory (``False`` if missing).
+        """
+        ...
+
+    def stat_many(self, paths: Iterable[str]) -> dict[str, SFTPAttributes | None]:
+        """
+        Stat many remote paths in as few round trips as possible.
+
+        Uncached paths are looked up in batches of `batch_size` by running
+        GNU ``stat`` remotely over one exec channel per batch; if that
+        command is unavailable, each path falls back to an SFTP ``stat``.
+        Results are added to the cache. `.Transfer.get_tree` uses this to
+        resolve each directory's symlinks at once.
+
+        :returns:
+            A dict mapping each path to its attributes, or ``None`` if it
+            doesn't exist.
+        """
+        ...
+
+    def update(self, path: str, attr: SFTPAttributes) -> None:
+        """
+        Record ``attr`` as the current attributes of ``path``.
+        """
+        ...
+
+    def invalidate(self, path: str | None = None) -> None:
+        """
+        Forget ``path`` and anything below it, or everything if ``path`` is
+        ``None`` (including the working directory).
+        """
+        ...
+
+    def _remote_stats(self, paths: list[str]) -> dict[str, SFTPAttributes] | None: ...
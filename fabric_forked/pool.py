@@ -0,0 +1,151 @@
+import time
+from threading import Lock
+
+from .util import debug
+
+
+class PoolEntry:
+    def __init__(self, client):
+        self.client = client
+        self.transport = client.get_transport()
+        self.refs = 1
+        self.last_used = time.monotonic()
+
+    @property
+    def active(self):
+        return self.transport is not None and self.transport.active
+
+
+class TransportPool:
+    def __init__(self, max_size=64, idle_timeout=300):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._retired = []
+        self._lock = Lock()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def acquire(self, key):
+        with self._lock:
+            stale = self._collect_stale()
+            entry = self._entries.get(key)
+            transport = None
+            if entry is not None:
+                entry.refs += 1
+                entry.last_used = time.monotonic()
+                transport = entry.transport
+        self._close_entries(stale)
+        if transport is not None:
+            debug("Reusing pooled transport {!r}".format(transport))
+        return transport
+
+    def add(self, key, client):
+        with self._lock:
+            stale = self._collect_stale()
+            added = False
+            if key not in self._entries:
+                if len(self._entries) >= self.max_size:
+                    idle = [
+                        (entry.last_used, k)
+                        for k, entry in self._entries.items()
+                        if entry.refs == 0
+                    ]
+                    if idle:
+                        _, oldest = min(idle)
+                        stale.append(self._entries.pop(oldest))
+                if len(self._entries) < self.max_size:
+                    self._entries[key] = PoolEntry(client)
+                    added = True
+        self._close_entries(stale)
+        return added
+
+    def release(self, key, transport):
+        with self._lock:
+            entry = self._find(key, transport)
+            released = entry is not None
+            if released:
+                entry.refs = max(entry.refs - 1, 0)
+                entry.last_used = time.monotonic()
+            stale = self._collect_stale()
+        self._close_entries(stale)
+        return released
+
+    def discard(self, key, transport):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.transport is transport:
+                # Other holders may still be using it; close it once they
+                # have all released it.
+                del self._entries[key]
+                self._retired.append(entry)
+        return self.release(key, transport)
+
+    def _find(self, key, transport):
+        entry = self._entries.get(key)
+        if entry is not None and entry.transport is transport:
+            return entry
+        for entry in self._retired:
+            if entry.transport is transport:
+                return entry
+        return None
+
+    def evict_idle(self):
+        with self._lock:
+            stale = self._collect_stale()
+        self._close_entries(stale)
+        return len(stale)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._entries.values()) + self._retired
+            self._entries.clear()
+            self._retired = []
+        self._close_entries(entries)
+
+    def _collect_stale(self):
+        now = time.monotonic()
+        stale = []
+        for key, entry in list(self._entries.items()):
+            idle = entry.refs == 0 and (
+                self.idle_timeout is not None
+                and now - entry.last_used >= self.idle_timeout
+            )
+            if idle or not entry.active:
+                stale.append(self._entries.pop(key))
+        for entry in list(self._retired):
+            if entry.refs == 0:
+                self._retired.remove(entry)
+                stale.append(entry)
+        return stale
+
+    def _close_entries(self, entries):
+        for entry in entries:
+            debug("Closing pooled transport {!r}".format(entry.transport))
+            # The client may have connected again since, e.g. on reconnect.
+            if entry.client.get_transport() is entry.transport:
+                entry.client.close()
+            else:
+                entry.transport.close()
+
+
+_default_pool = None
+_default_pool_lock = Lock()
+
+
+def get_default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = TransportPool()
+        return _default_pool
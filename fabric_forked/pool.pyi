@@ -0,0 +1,159 @@
+"""
+Process-wide pooling of authenticated SSH transports.
+"""
+
+from threading import Lock
+
+from paramiko.client import SSHClient
+from paramiko.transport import Transport
+
+from typing_extensions import Any, Hashable, Self
+
+
+class PoolEntry:
+    """
+    Bookkeeping for a single pooled `~paramiko.transport.Transport`.
+
+    .. versionadded:: 3.3
+    """
+
+    client: SSHClient
+    transport: Transport
+    refs: int
+    last_used: float
+
+    def __init__(self, client: SSHClient) -> None: ...
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether the pooled transport is still usable.
+        """
+        ...
+
+
+class TransportPool:
+    """
+    Shares authenticated transports between `.Connection` objects.
+
+    Pooling is opt-in via the ``transport_pool`` :ref:`configuration value
+    <default-values>`: set it to ``True`` to use the process-wide pool
+    returned by `get_default_pool`, or to a `TransportPool` instance to use a
+    specific one. When enabled, `.Connection.open` looks for a live transport
+    whose key matches the connection's identity (host, user & port), gateway,
+    ``connect_kwargs`` and auth strategy; if one exists, it is reused and the
+    connection opens its own session channels on it instead of connecting and
+    authenticating again. `.Connection.close` then returns the transport to
+    the pool rather than tearing it down.
+
+    Transports are reference counted. Unreferenced transports are closed once
+    they have been idle for ``idle_timeout`` seconds (checked whenever the
+    pool is used, or explicitly via `evict_idle`); dead transports are
+    dropped as soon as they are noticed. At most ``max_size`` transports are
+    kept; when full, the least recently used idle transport makes room, and
+    if every transport is in use, new connections simply go unpooled.
+
+    Pools are shared by reference: copying one (as `.Config.clone` does)
+    returns the same object.
+
+    .. versionadded:: 3.3
+    """
+
+    max_size: int
+    idle_timeout: float | None
+    _entries: dict[Hashable, PoolEntry]
+    _retired: list[PoolEntry]
+    _lock: Lock
+
+    def __init__(self, max_size: int = 64, idle_timeout: float | None = 300) -> None:
+        """
+        :param int max_size:
+            Maximum number of transports to keep. Default: ``64``.
+
+        :param float idle_timeout:
+            Seconds an unreferenced transport may sit idle before it is
+            closed, or ``None`` to keep idle transports until `close`.
+            Default: ``300``.
+        """
+        ...
+
+    def __copy__(self) -> Self: ...
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Self: ...
+
+    def __len__(self) -> int: ...
+
+    def __contains__(self, key: Hashable) -> bool: ...
+
+    def acquire(self, key: Hashable) -> Transport | None:
+        """
+        Return the live transport stored under ``key``, or ``None``.
+
+        A returned transport has its reference count incremented; hand it
+        back with `release` when done.
+        """
+        ...
+
+    def add(self, key: Hashable, client: SSHClient) -> bool:
+        """
+        Start pooling ``client``'s transport under ``key``.
+
+        The new entry starts with one reference, held by the caller.
+
+        :returns:
+            ``True`` if the transport was pooled; ``False`` if ``key`` is
+            already taken or the pool is full of in-use transports, in which
+            case the caller still owns ``client``.
+        """
+        ...
+
+    def release(self, key: Hashable, transport: Transport) -> bool:
+        """
+        Drop one reference to ``transport``, which was pooled under ``key``.
+
+        :returns:
+            ``True`` if the transport was still pooled; ``False`` if it had
+            already been evicted (and closed) by the pool.
+        """
+        ...
+
+    def discard(self, key: Hashable, transport: Transport) -> bool:
+        """
+        Like `release`, but also stop offering ``transport`` to `acquire`,
+        e.g. because the caller found it broken.
+
+        The transport is closed once every other holder has released it
+        too, so connections still using it aren't cut off.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def _find(self, key: Hashable, transport: Transport) -> PoolEntry | None: ...
+
+    def evict_idle(self) -> int:
+        """
+        Close idle and dead transports now.
+
+        :returns: The number of transports closed.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Close every pooled transport, in use or not, and empty the pool.
+        """
+        ...
+
+    def _collect_stale(self) -> list[PoolEntry]: ...
+
+    def _close_entries(self, entries: list[PoolEntry]) -> None: ...
+
+
+def get_default_pool() -> TransportPool:
+    """
+    Return the process-wide `TransportPool`, creating it on first use.
+
+    .. versionadded:: 3.3
+    """
+    ...
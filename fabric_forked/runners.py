@@ -1,7 +1,13 @@
+import shlex
 import signal
 import threading
+from time import monotonic
 
 from invoke import Runner, pty_size, Result as InvokeResult
+from invoke.terminals import character_buffered
+
+from .capture import Capture, CaptureBuffer
+from .timing import Timings
 
 
 def cares_about_SIGWINCH():
@@ -12,12 +18,40 @@ def cares_about_SIGWINCH():
 
 
 class Remote(Runner):
+    read_chunk_size = 32768
+    captures = None
+    timings = None
+    _started = None
+    _exited = None
+    _killed = False
+
     def __init__(self, *args, **kwargs):
         self.inline_env = kwargs.pop("inline_env", None)
         super().__init__(*args, **kwargs)
 
+    def _setup(self, command, kwargs):
+        super()._setup(command, kwargs)
+        self.timings = Timings(
+            self.context,
+            self.context.config.timings.hooks,
+            base=self.context._take_open_timings(),
+        )
+        self._started = self._exited = None
+        self._killed = False
+        if self.opts.get("read_chunk_size"):
+            self.read_chunk_size = self.opts["read_chunk_size"]
+        policy = self.opts.get("capture")
+        self.captures = None
+        if policy is not None or self.opts.get("sink") is not None:
+            policy = policy or Capture()
+            self.captures = {
+                "stdout": policy.buffer(),
+                "stderr": policy.buffer(),
+            }
+
     def start(self, command, shell, env, timeout=None):
-        self.channel = self.context.create_session()
+        with self.timings.phase("channel"):
+            self.channel = self.context.create_session()
         if self.using_pty:
             cols, rows = pty_size()
             self.channel.get_pty(width=cols, height=rows)
@@ -31,6 +65,7 @@ class Remote(Runner):
                 command = "export {} && {}".format(parameters, command)
             else:
                 self.channel.update_environment(env)
+        self._started = monotonic()
         self.send_start_message(command)
 
     def send_start_message(self, command):
@@ -40,6 +75,96 @@ class Remote(Runner):
         kwargs.setdefault("replace_env", True)
         return super().run(command, **kwargs)
 
+    def wait(self):
+        if self.opts.get("event_driven"):
+            status = self.channel.status_event
+            while not (status.is_set() or self.has_dead_threads):
+                status.wait(self.input_sleep)
+            if self._killed and self._timer is not None:
+                # Let the timeout timer finish, so timed_out is accurate.
+                self._timer.join()
+        else:
+            super().wait()
+        self._exited = self.timings.record("command", self._started)
+
+    def handle_stdin(self, input_, output, echo=False):
+        if not self.opts.get("event_driven"):
+            return super().handle_stdin(input_, output, echo)
+        closed_stdin = False
+        with character_buffered(input_):
+            while True:
+                data = self.read_our_stdin(input_)
+                if data:
+                    self.write_proc_stdin(data)
+                    if echo is None:
+                        echo = self.should_echo_stdin(input_, output)
+                    if echo:
+                        self.write_our_output(stream=output, string=data)
+                    continue
+                if data is not None and not (
+                    self.using_pty or closed_stdin
+                ):
+                    self.close_proc_stdin()
+                    closed_stdin = True
+                if self.program_finished.wait(self.input_sleep):
+                    break
+
+    def handle_stdout(self, buffer_, hide, output):
+        if self.captures is None:
+            return super().handle_stdout(buffer_, hide, output)
+        self._capture_output(
+            "stdout", hide, output, reader=self.read_proc_stdout
+        )
+
+    def handle_stderr(self, buffer_, hide, output):
+        if self.captures is None:
+            return super().handle_stderr(buffer_, hide, output)
+        self._capture_output(
+            "stderr", hide, output, reader=self.read_proc_stderr
+        )
+
+    def _capture_output(self, name, hide, output, reader):
+        buffer_ = self.captures[name]
+        sink = self.opts.get("sink")
+        for data in self.read_proc_output(reader):
+            if not hide:
+                self.write_our_output(stream=output, string=data)
+            buffer_.append(data)
+            if sink is not None:
+                sink(self.context, name, data)
+            self.respond(buffer_)
+        flush = getattr(sink, "flush", None)
+        if flush is not None:
+            flush(self.context, name)
+
+    def respond(self, buffer_):
+        if not self.watchers:
+            return
+        if isinstance(buffer_, CaptureBuffer):
+            if buffer_.truncated:
+                return
+            stream = buffer_.getvalue()
+        else:
+            stream = "".join(buffer_)
+        for watcher in self.watchers:
+            for response in watcher.submit(stream):
+                self.write_proc_stdin(response)
+
+    def _collate_result(self, watcher_errors):
+        if self._exited is not None:
+            self.timings.record("drain", self._exited)
+        if self.captures is None:
+            return super()._collate_result(watcher_errors)
+        exited = None if watcher_errors else self.returncode()
+        return self.generate_result(
+            **dict(
+                self.result_kwargs,
+                stdout=self.captures["stdout"],
+                stderr=self.captures["stderr"],
+                exited=exited,
+            )
+        )
+
     def read_proc_stdout(self, num_bytes):
         return self.channel.recv(num_bytes)
 
@@ -67,6 +192,7 @@ class Remote(Runner):
 
     def generate_result(self, **kwargs):
         kwargs["connection"] = self.context
+        kwargs["timings"] = self.timings
         return Result(**kwargs)
 
     def stop(self):
@@ -77,6 +203,7 @@ class Remote(Runner):
             signal.signal(signal.SIGWINCH, signal.SIG_DFL)
 
     def kill(self):
+        self._killed = True
         self.channel.close()
 
     def handle_window_change(self, signum, frame):
@@ -91,5 +218,101 @@ class RemoteShell(Remote):
 class Result(InvokeResult):
     def __init__(self, **kwargs):
         connection = kwargs.pop("connection")
+        timings = kwargs.pop("timings", None)
         super().__init__(**kwargs)
         self.connection = connection
+        self.timings = timings
+
+    @property
+    def stdout(self):
+        if isinstance(self._stdout, CaptureBuffer):
+            return self._stdout.getvalue()
+        return self._stdout
+
+    @stdout.setter
+    def stdout(self, value):
+        self._stdout = value
+
+    @property
+    def stderr(self):
+        if isinstance(self._stderr, CaptureBuffer):
+            return self._stderr.getvalue()
+        return self._stderr
+
+    @stderr.setter
+    def stderr(self, value):
+        self._stderr = value
+
+    @property
+    def captures(self):
+        return {
+            name: value
+            for name, value in (
+                ("stdout", self._stdout),
+                ("stderr", self._stderr),
+            )
+            if isinstance(value, CaptureBuffer)
+        }
+
+
+def batch_script(commands, token, stop_on_failure=False):
+    lines = []
+    for i, command in enumerate(commands):
+        start = shlex.quote("{}:start:{}".format(token, i))
+        end = shlex.quote("{}:end:{}".format(token, i))
+        lines.append(
+            "printf '%s\\n' {0}; printf '%s\\n' {0} >&2".format(start)
+        )
+        lines.append("(\n{}\n)".format(command))
+        lines.append("rc=$?")
+        lines.append(
+            "printf '\\n%s:%d\\n' {0} $rc; printf '\\n%s:%d\\n' {0} $rc >&2".format(  # noqa
+                end
+            )
+        )
+        if stop_on_failure:
+            lines.append("[ $rc -eq 0 ] || exit $rc")
+    lines.append("exit 0")
+    return "\n".join(lines)
+
+
+def split_batch(result, commands, token, hide=()):
+    results = []
+    for i, command in enumerate(commands):
+        start = "{}:start:{}\n".format(token, i)
+        end = "\n{}:end:{}:".format(token, i)
+        streams = []
+        exited = None
+        for text in (result.stdout, result.stderr):
+            begin = text.find(start)
+            if begin == -1:
+                streams.append(None)
+                continue
+            begin += len(start)
+            stop = text.find(end, begin)
+            if stop == -1:
+                streams.append(text[begin:])
+                continue
+            streams.append(text[begin:stop])
+            code = text[stop + len(end) :].split("\n", 1)[0]
+            exited = int(code)
+        if streams[0] is None:
+            break
+        finished = exited is not None
+        results.append(
+            Result(
+                connection=result.connection,
+                stdout=streams[0],
+                stderr=streams[1] or "",
+                encoding=result.encoding,
+                command=command,
+                shell=result.shell,
+                env=result.env,
+                exited=exited if finished else result.exited,
+                pty=False,
+                hide=hide,
+            )
+        )
+        if not finished:
+            break
+    return results
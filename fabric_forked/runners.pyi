@@ -3,9 +3,12 @@ import signal
 from paramiko.channel import Channel
 from invoke import Runner, Result as InvokeResult
 
+from .capture import CaptureBuffer
 from .connection import Connection, RunKwargs
+from .timing import Timings
 
-from typing_extensions import Any, Unpack, NoReturn
+from invoke.exceptions import WatcherError
+from typing_extensions import IO, Any, Callable, Iterable, Unpack, NoReturn
 
 def cares_about_SIGWINCH() -> bool: ...
 
@@ -27,6 +30,47 @@ class Remote(Runner):
     inline_env: bool
     channel: Channel
     context: Connection
+    captures: dict[str, CaptureBuffer] | None
+    """
+    The current run's capture buffers by stream name, when a ``capture``
+    policy or ``sink`` is in use; otherwise ``None``.
+
+    Set up per run from two extra `.Connection.run` options (also settable
+    as ``run.capture`` and ``run.sink`` config values):
+
+    - ``capture``: a `.capture.Capture` policy, such as `.capture.Tail`,
+      `.capture.HeadTail` or `.capture.Spill`, deciding how much of each
+      stream is kept, and where. Default: ``None`` (keep everything in
+      memory, exactly as before).
+    - ``sink``: a callable receiving ``(connection, stream_name, text)``
+      for each chunk of output as it arrives, e.g. a `.capture.LineSink`.
+      It's called from the stream's IO thread. If it has a ``flush``
+      method, that's called with ``(connection, stream_name)`` when the
+      stream ends. Default: ``None``.
+
+    .. versionadded:: 3.3
+    """
+    timings: Timings | None
+    """
+    The current run's `.Timings`: ``channel``, ``command`` and ``drain``,
+    plus the connection's own phases if this is the first result since it
+    opened.
+
+    .. versionadded:: 3.3
+    """
+    read_chunk_size: int
+    """
+    Bytes requested per read from the channel's stdout and stderr.
+
+    Larger than the superclass' default, so bulk output takes fewer
+    wakeups. Overridden per run by the ``read_chunk_size`` option (or
+    ``run.read_chunk_size`` config value). Default: ``32768``.
+
+    .. versionadded:: 3.3
+    """
+    _started: float | None
+    _exited: float | None
+    _killed: bool
     
     def __init__(self, *args, **kwargs):
         """
@@ -54,10 +98,69 @@ class Remote(Runner):
         timeout: float | None = None
     ) -> None: ...
 
+    def _setup(self, command: str, kwargs: dict[str, Any]) -> None: ...
+
     def send_start_message(self, command: str) -> None: ...
 
     def run(self, command: str, **kwargs: Unpack[RunKwargs]) -> InvokeResult | None: ...
 
+    def handle_stdout(self, buffer_: list[str], hide: bool, output: IO[str]) -> None: ...
+
+    def handle_stderr(self, buffer_: list[str], hide: bool, output: IO[str]) -> None: ...
+
+    def _capture_output(self,
+        name: str,
+        hide: bool,
+        output: IO[str],
+        reader: Callable[[int], bytes]
+    ) -> None: ...
+
+    def respond(self, buffer_: list[str] | CaptureBuffer) -> None:
+        """
+        Feed the stream so far to watchers, as the superclass does.
+
+        Does nothing when there are no watchers (the superclass joins the
+        whole buffer for every chunk regardless), or once a capture buffer is
+        `~.capture.CaptureBuffer.truncated`.
+
+        .. versionchanged:: 3.3
+            Skip the work when there are no watchers, and support capture
+            buffers.
+        """
+        ...
+
+    def wait(self) -> None:
+        """
+        Wait for the command to exit, then record its ``command`` timing.
+
+        When the ``event_driven`` option (or ``run.event_driven`` config
+        value, default ``True``) is set, this blocks on the channel's
+        ``status_event``, waking as soon as the exit status arrives instead
+        of polling every ``input_sleep``. Set it to ``False`` for the
+        superclass' polling loop.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def handle_stdin(self,
+        input_: IO[str],
+        output: IO[str],
+        echo: bool = False,
+    ) -> None:
+        """
+        Forward local stdin to the channel, as the superclass does.
+
+        When ``event_driven``, the thread doesn't sleep between reads while
+        input keeps arriving, and otherwise waits on the
+        ``program_finished`` event, so it exits as soon as the command does.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def _collate_result(self, watcher_errors: list[WatcherError]) -> Result: ...
+
     def read_proc_stdout(self, num_bytes: int) -> bytes: ...
 
     def read_proc_stderr(self, num_bytes: int) -> bytes: ...
@@ -104,5 +207,82 @@ class Result(InvokeResult):
     """
     
     connection: Connection
+    timings: Timings | None
+    """
+    How long each phase of connecting and running took (see `.Timings`), or
+    ``None`` for results not produced by `.Remote` (such as the
+    per-command results of `.Connection.run_batch`).
+
+    .. versionadded:: 3.3
+    """
+    _stdout: str | CaptureBuffer
+    _stderr: str | CaptureBuffer
 
     def __init__(self, **kwargs) -> None: ...
+
+    @property
+    def stdout(self) -> str:  # type: ignore[override]
+        """
+        Captured standard output.
+
+        When a ``capture`` policy was in use, this is produced from the
+        capture buffer on each access (reading it back from disk, for
+        `.capture.Spill`); see `captures` to get at the buffers themselves.
+
+        .. versionchanged:: 3.3
+            Became a property, to support capture policies.
+        """
+        ...
+
+    @property
+    def stderr(self) -> str:  # type: ignore[override]
+        """
+        Captured standard error; see `stdout`.
+
+        .. versionchanged:: 3.3
+            Became a property, to support capture policies.
+        """
+        ...
+
+    @property
+    def captures(self) -> dict[str, CaptureBuffer]:
+        """
+        The capture buffers behind `stdout` and `stderr`, by stream name;
+        empty unless a ``capture`` policy or ``sink`` was in use.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+
+def batch_script(commands: Iterable[str], token: str, stop_on_failure: bool = False) -> str:
+    """
+    Build the shell script `.Connection.run_batch` executes.
+
+    Each command runs in its own subshell, bracketed by ``token``-based
+    start and end marker lines on both stdout and stderr; the end marker
+    carries the command's exit code. With ``stop_on_failure``, the script
+    exits after the first command with a nonzero exit code.
+
+    .. versionadded:: 3.3
+    """
+    ...
+
+
+def split_batch(
+    result: Result,
+    commands: list[str],
+    token: str,
+    hide: tuple[str, ...] = ()
+) -> list[Result]:
+    """
+    Split the `Result` of a `batch_script` into one `Result` per command.
+
+    Commands which never started (because of ``stop_on_failure``) get no
+    result. If the script ended in the middle of a command, that command's
+    result holds its partial output and the script's exit code, and is the
+    last one.
+
+    .. versionadded:: 3.3
+    """
+    ...
@@ -0,0 +1,200 @@
+import select
+import shlex
+import sys
+import uuid
+from threading import RLock
+from time import monotonic
+
+from invoke.exceptions import CommandTimedOut, UnexpectedExit
+from invoke.runners import default_encoding, normalize_hide
+
+from .runners import Result
+from .timing import Timings
+from .util import debug
+
+
+class ShellSession:
+    read_chunk_size = 32768
+
+    def __init__(self, connection, persist=False, shell=None, env=None):
+        self.connection = connection
+        self.persist = persist
+        self.shell = shell or connection.config.run.shell
+        self.env = dict(connection.config.run.env, **(env or {}))
+        self.channel = None
+        self.commands = 0
+        self._token = "fabric-session-{}".format(uuid.uuid4().hex)
+        self._lock = RLock()
+
+    def __repr__(self):
+        return "<ShellSession {!r} shell={!r} persist={}>".format(
+            self.connection, self.shell, self.persist
+        )
+
+    @property
+    def is_open(self):
+        return self.channel is not None and not self.channel.closed
+
+    def open(self):
+        with self._lock:
+            if self.is_open:
+                return
+            self.connection.open()
+            channel = self.connection.create_session()
+            channel.exec_command(self.shell)
+            self.channel = channel
+            if self.env:
+                self._send(
+                    "".join(
+                        "export {}={}\n".format(key, shlex.quote(str(value)))
+                        for key, value in self.env.items()
+                    )
+                )
+            debug("Opened {!r}".format(self))
+
+    def close(self):
+        with self._lock:
+            channel, self.channel = self.channel, None
+            if channel is None or channel.closed:
+                return
+            try:
+                channel.sendall(b"exit\n")
+                channel.shutdown_write()
+            except (EOFError, OSError):
+                pass
+            channel.close()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, text):
+        self.channel.sendall(text.encode(self._encoding()))
+
+    def _encoding(self):
+        return self.connection.config.run.encoding or default_encoding()
+
+    def script(self, command, index):
+        marker = shlex.quote("{}:{}".format(self._token, index))
+        if self.persist:
+            wrapped = "{{ {}\n}} < /dev/null".format(command)
+        else:
+            wrapped = "( {}\n) < /dev/null".format(command)
+        return (
+            "{}\n__fabric_rc=$?\n"
+            "printf '\\n%s:%d\\n' {} $__fabric_rc\n"
+            "printf '\\n%s:%d\\n' {} $__fabric_rc >&2\n"
+        ).format(wrapped, marker, marker)
+
+    def run(self, command, **kwargs):
+        config = self.connection.config.run
+        opts = {}
+        for key in (
+            "echo",
+            "echo_format",
+            "err_stream",
+            "hide",
+            "out_stream",
+            "warn",
+        ):
+            opts[key] = kwargs.pop(key, config[key])
+        timeout = kwargs.pop("timeout", None)
+        if kwargs:
+            err = "run() got unexpected keyword arguments: {!r}"
+            raise TypeError(err.format(list(kwargs.keys())))
+        hide = normalize_hide(opts["hide"])
+        timeout = timeout or self.connection.config.timeouts.command
+        with self._lock:
+            self.open()
+            index = self.commands
+            self.commands += 1
+            timings = Timings(
+                self.connection,
+                self.connection.config.timings.hooks,
+                base=self.connection._take_open_timings(),
+            )
+            with timings.phase("command"):
+                self._send(self.script(command, index))
+                try:
+                    streams, exited, timed_out = self._collect(index, timeout)
+                finally:
+                    self.connection._invalidate_metadata()
+            if exited is None:
+                # The shell itself went away, e.g. after a persistent ``exit``;
+                # its exit status stands in for the command's.
+                exited = (
+                    -1 if timed_out else self.channel.recv_exit_status()
+                )
+                self.close()
+        encoding = self._encoding()
+        result = Result(
+            connection=self.connection,
+            stdout=streams[0].decode(encoding, "replace"),
+            stderr=streams[1].decode(encoding, "replace"),
+            encoding=encoding,
+            command=command,
+            shell=self.shell,
+            env=self.env,
+            exited=exited,
+            pty=False,
+            hide=hide,
+            timings=timings,
+        )
+        if opts["echo"]:
+            print(opts["echo_format"].format(command=command))
+        if "stdout" not in hide:
+            (opts["out_stream"] or sys.stdout).write(result.stdout)
+        if "stderr" not in hide:
+            (opts["err_stream"] or sys.stderr).write(result.stderr)
+        if timed_out:
+            raise CommandTimedOut(result, timeout)
+        if result.failed and not opts["warn"]:
+            raise UnexpectedExit(result)
+        return result
+
+    def _collect(self, index, timeout):
+        channel = self.channel
+        end = "\n{}:{}:".format(self._token, index).encode()
+        readers = (channel.recv, channel.recv_stderr)
+        ready = (channel.recv_ready, channel.recv_stderr_ready)
+        buffers = [bytearray(), bytearray()]
+        stops = [None, None]
+        codes = [None, None]
+        eof = [False, False]
+        deadline = None if timeout is None else monotonic() + timeout
+        while not all(eof[i] or codes[i] is not None for i in (0, 1)):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self.close()
+                    return self._streams(buffers, stops), None, True
+            if not (ready[0]() or ready[1]() or channel.eof_received):
+                select.select([channel], [], [], remaining)
+            for i in (0, 1):
+                if codes[i] is not None or eof[i]:
+                    continue
+                if not ready[i]():
+                    # Exhausted buffers after EOF mean the shell has exited.
+                    eof[i] = channel.eof_received
+                    continue
+                buffers[i] += readers[i](self.read_chunk_size)
+                if stops[i] is None:
+                    found = buffers[i].find(end)
+                    if found != -1:
+                        stops[i] = found
+                if stops[i] is not None:
+                    rest = buffers[i][stops[i] + len(end) :]
+                    if b"\n" in rest:
+                        codes[i] = int(rest.split(b"\n", 1)[0])
+        exited = codes[0] if codes[0] is not None else codes[1]
+        return self._streams(buffers, stops), exited, False
+
+    def _streams(self, buffers, stops):
+        return tuple(
+            bytes(buffer if stop is None else buffer[:stop])
+            for buffer, stop in zip(buffers, stops)
+        )
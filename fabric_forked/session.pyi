@@ -0,0 +1,164 @@
+"""
+Persistent remote shells for running many small commands quickly.
+"""
+
+from threading import RLock
+
+from paramiko.channel import Channel
+from typing_extensions import IO, Any, Self
+
+from .connection import Connection
+from .runners import Result
+from .timing import Timings
+
+
+class ShellSession:
+    """
+    A single remote shell process, fed one command at a time.
+
+    Obtained via `.Connection.session`. Each `.Connection.run` opens a
+    channel, sends an exec request and starts a new remote shell before the
+    command itself runs. A session pays for that once: its `run` writes the
+    command to the already-running shell, followed by a unique marker line
+    on stdout and stderr carrying the exit code, and reads both streams up
+    to that marker. Each command still gets its own `.Result`.
+
+    By default, each command runs in a subshell, so ``cd``, ``export`` or
+    ``exit`` in one don't affect the next, as with `.Connection.run`. With
+    ``persist=True``, commands run in the session's shell itself, so such
+    changes carry over. If a command exits that shell, its exit code becomes
+    the command's, and the next `run` starts a fresh shell (losing any
+    persisted state).
+
+    Commands' stdin is ``/dev/null``, and they run without a pseudo-terminal.
+    Each command must be complete shell syntax by itself.
+
+    Sessions are context managers, closing the shell on exit. They may be
+    shared between threads; commands then run one at a time.
+
+    .. versionadded:: 3.3
+    """
+
+    read_chunk_size: int
+    """
+    Bytes requested per read from the channel. Default: ``32768``.
+    """
+    connection: Connection
+    persist: bool
+    shell: str
+    env: dict[str, Any]
+    channel: Channel | None
+    """
+    The session channel running `shell`, or ``None`` when not open.
+    """
+    commands: int
+    """
+    How many commands have been sent, across restarts of the shell.
+    """
+    _token: str
+    _lock: RLock
+
+    def __init__(self,
+        connection: Connection,
+        persist: bool = False,
+        shell: str | None = None,
+        env: dict[str, Any] | None = None,
+    ) -> None:
+        """
+        :param connection: The `.Connection` to run commands over.
+
+        :param bool persist:
+            Run commands in the session's shell instead of a subshell each,
+            so that changes to its working directory, variables and so on
+            persist. Default: ``False``.
+
+        :param str shell:
+            The remote shell to run. Must be POSIX compatible. Default: the
+            ``run.shell`` config value.
+
+        :param dict env:
+            Environment variables exported in the shell when it starts, on
+            top of the ``run.env`` config value.
+        """
+        ...
+
+    def __repr__(self) -> str: ...
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Whether the remote shell is running.
+        """
+        ...
+
+    def open(self) -> None:
+        """
+        Start the remote shell, if it isn't running. Called by `run` and on
+        entering the ``with`` block.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Ask the remote shell to exit and close its channel.
+
+        The `.Connection` itself stays open.
+        """
+        ...
+
+    def __enter__(self) -> Self: ...
+
+    def __exit__(self, *exc: Any) -> None: ...
+
+    def _send(self, text: str) -> None: ...
+
+    def _encoding(self) -> str: ...
+
+    def script(self, command: str, index: int) -> str:
+        """
+        Return the shell code sent to run ``command`` as the session's
+        ``index``-th command: the command, followed by printing its end
+        marker and exit code to stdout and stderr.
+        """
+        ...
+
+    def run(self,
+        command: str,
+        echo: bool = ...,
+        echo_format: str = ...,
+        err_stream: IO[str] | None = ...,
+        hide: bool | str | None = ...,
+        out_stream: IO[str] | None = ...,
+        timeout: float | None = None,
+        warn: bool = ...,
+    ) -> Result:
+        """
+        Run ``command`` in the session's shell.
+
+        The keyword arguments are as for `.Connection.run`, and default to
+        the same config values. Output is shown once the command has
+        finished, instead of while it runs.
+
+        ``timeout`` (or the ``timeouts.command`` config value) closes the
+        session when exceeded, since the shell can't otherwise be
+        interrupted without a pseudo-terminal; the next `run` starts a
+        fresh one.
+
+        :returns: A `.Result` whose `~.Result.timings` include ``command``.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` if the command exited
+            nonzero, unless ``warn`` is set;
+            `~invoke.exceptions.CommandTimedOut` if it timed out.
+        """
+        ...
+
+    def _collect(self,
+        index: int,
+        timeout: float | None,
+    ) -> tuple[tuple[bytes, bytes], int | None, bool]: ...
+
+    def _streams(self,
+        buffers: list[bytearray],
+        stops: list[int | None],
+    ) -> tuple[bytes, bytes]: ...
@@ -6,6 +6,7 @@ from .connection import Connection
 class Task(invoke.Task):
     def __init__(self, *args, **kwargs):
         self.hosts = kwargs.pop("hosts", None)
+        self.barrier = kwargs.pop("barrier", None)
         super().__init__(*args, **kwargs)
 
 
@@ -18,6 +18,7 @@ class Task(invoke.Task):
     """
     
     hosts: list[str | ConnectionKwargs]
+    barrier: str | None
 
     def __init__(self, *args, **kwargs) -> None: ...
 
@@ -64,7 +65,21 @@ def task(*args, **kwargs) -> Callable[..., Any]:
             task will execute on that host multiple times (including making
             separate connections).
 
+    :param str barrier:
+        Name of a barrier which hosts must all reach before any of them runs
+        this task, when tasks are run with :option:`--pipeline`. Pipelining
+        otherwise lets each host work through its own chain of tasks at its
+        own pace; a barrier re-synchronizes them, e.g. so that no host
+        restarts until every host has deployed. Hosts which failed earlier in
+        their chain are not waited for. Ignored in other execution modes.
+
+        Tasks sharing a barrier name synchronize with each other. If a host's
+        chain reaches the same barrier more than once, its Nth arrival waits
+        for the Nth arrival of other hosts.
+
     .. versionadded:: 2.1
+    .. versionchanged:: 3.3
+        Added the ``barrier`` parameter.
     """
     ...
 
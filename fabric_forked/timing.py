@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+from time import monotonic
+
+from paramiko.transport import Transport
+
+
+class Timings(dict):
+    def __init__(self, connection=None, hooks=(), base=None):
+        super().__init__()
+        self.connection = connection
+        self.hooks = tuple(hooks or ())
+        self.marks = {}
+        if base is not None:
+            self.update(base)
+            self.marks.update(base.marks)
+
+    def record(self, phase, start, end=None):
+        if end is None:
+            end = monotonic()
+        self.marks[phase] = (start, end)
+        self[phase] = end - start
+        for hook in self.hooks:
+            hook(self.connection, phase, start, end)
+        return end
+
+    @contextmanager
+    def phase(self, name):
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+
+class TimedTransport(Transport):
+    timings = None
+
+    def __init__(self, *args, **kwargs):
+        self.timings = kwargs.pop("timings", None)
+        super().__init__(*args, **kwargs)
+
+    def start_client(self, *args, **kwargs):
+        timings, self.timings = self.timings, None
+        if timings is None:
+            return super().start_client(*args, **kwargs)
+        with timings.phase("kex"):
+            return super().start_client(*args, **kwargs)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
@@ -0,0 +1,111 @@
+"""
+Per-phase latency measurements for connections, commands and transfers.
+"""
+
+from paramiko.transport import Transport
+
+from typing_extensions import Any, Callable, ContextManager, Iterable
+
+from .connection import Connection
+
+TimingHook = Callable[[Connection | None, str, float, float], None]
+
+
+class Timings(dict[str, float]):
+    """
+    Durations, in seconds, of the phases of one operation, by phase name.
+
+    `.Connection.open` records:
+
+    - ``dns``: resolving the host name;
+    - ``connect``: the TCP handshake;
+    - ``gateway``: opening a channel (or starting a command) through the
+      `.Connection.gateway`, instead of ``dns`` and ``connect``;
+    - ``kex``: the SSH banner exchange and key exchange;
+    - ``auth``: host key verification and authentication.
+
+    `.Remote` adds ``channel`` (opening the session channel), ``command``
+    (from sending the command until its exit status arrived) and ``drain``
+    (from then until all of its output was read). `.Transfer` adds
+    ``transfer``, the wall time of the whole call. Only the first such
+    result after a connection opened also includes its connection phases,
+    so each handshake is counted once when results are aggregated (e.g. by
+    `.GroupResult.timing_percentiles`).
+
+    Phases which did not happen are absent: a connection taken from a
+    `.TransportPool`, or one using a caller-supplied ``sock`` or
+    ``transport_factory`` connect kwarg, records fewer of them.
+
+    Every recorded phase is also passed to each of the ``timings.hooks``
+    config callables, as ``hook(connection, phase, start, end)``, where
+    ``start`` and ``end`` are `time.monotonic` values. Hooks run on the
+    thread doing the work, so they should be quick (e.g. update a metrics
+    histogram). A hook is called again for the same phase each time it
+    happens, e.g. for every command run over a connection.
+
+    .. versionadded:: 3.3
+    """
+
+    connection: Connection | None
+    hooks: tuple[TimingHook, ...]
+    marks: dict[str, tuple[float, float]]
+    """
+    ``(start, end)`` `time.monotonic` values of each recorded phase.
+    """
+
+    def __init__(self,
+        connection: Connection | None = None,
+        hooks: Iterable[TimingHook] = (),
+        base: Timings | None = None,
+    ) -> None:
+        """
+        :param connection: Passed on to ``hooks``.
+        :param hooks: Callables notified of each phase recorded.
+        :param base:
+            Existing timings to start from, e.g. the connection's, so a
+            result carries the connect phases too. Hooks are not called for
+            these.
+        """
+        ...
+
+    def record(self, phase: str, start: float, end: float | None = None) -> float:
+        """
+        Record ``phase`` as lasting from ``start`` until ``end`` (default:
+        now), notify the hooks, and return ``end``.
+        """
+        ...
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """
+        Context manager recording its body as phase ``name``, even if it
+        raises.
+        """
+        ...
+
+
+class TimedTransport(Transport):
+    """
+    `~paramiko.transport.Transport` recording the key exchange done by its
+    first `start_client` call as the ``kex`` phase of ``timings``.
+
+    `.Connection.open` passes it as the ``transport_factory`` to
+    `.SSHClient.connect <paramiko.client.SSHClient.connect>`.
+
+    .. versionadded:: 3.3
+    """
+
+    timings: Timings | None
+
+    def __init__(self, *args: Any, timings: Timings | None = None, **kwargs: Any) -> None: ...
+
+    def start_client(self, *args: Any, **kwargs: Any) -> None: ...
+
+
+def percentile(values: Iterable[float], pct: float) -> float | None:
+    """
+    Return the ``pct``-th percentile (0 to 100) of ``values``, interpolating
+    linearly between the closest ranks, or ``None`` if there are no values.
+
+    .. versionadded:: 3.3
+    """
+    ...
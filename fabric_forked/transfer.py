@@ -1,9 +1,25 @@
+import hashlib
 import os
 import posixpath
+import shlex
 import stat
+import string
+import tarfile
+import uuid
+from fnmatch import fnmatch
+from functools import partial
+from queue import Queue
+from threading import Event, Thread
+from time import monotonic
 
 from pathlib import Path
 
+from invoke.exceptions import ThreadException, UnexpectedExit
+from invoke.util import ExceptionHandlingThread
+from paramiko.sftp_client import SFTPClient
+
+from .runners import Result as RunResult
+from .timing import Timings
 from .util import debug
 
 
@@ -15,19 +31,38 @@ class Transfer:
     def sftp(self):
         return self.connection.sftp()
 
+    @property
+    def metadata(self):
+        return self.connection.remote_metadata()
+
     def is_remote_dir(self, path):
-        try:
-            return stat.S_ISDIR(self.sftp.stat(path).st_mode)
-        except IOError:
-            return False
+        return self.metadata.is_dir(path)
+
+    def _timings(self, start):
+        timings = Timings(
+            self.connection,
+            self.connection.config.timings.hooks,
+            base=self.connection._take_open_timings(),
+        )
+        timings.record("transfer", start)
+        return timings
 
-    def get(self, remote, local=None, preserve_mode=True):
+    def get(
+        self,
+        remote,
+        local=None,
+        preserve_mode=True,
+        stripes=None,
+        chunk_size=None,
+        prefetch=None,
+        skip_unchanged=False,
+    ):
         if not remote:
             raise ValueError("Remote path must not be empty!")
+        _check_skip_unchanged(skip_unchanged)
+        start = monotonic()
         orig_remote = remote
-        remote = posixpath.join(
-            self.sftp.getcwd() or self.sftp.normalize("."), remote
-        )
+        remote = posixpath.join(self.metadata.cwd(), remote)
         orig_local = local
         is_file_like = hasattr(local, "write") and callable(local.write)
         remote_filename = posixpath.basename(remote)
@@ -48,25 +83,51 @@ class Transfer:
                 dir_path, _ = os.path.split(local)
             local = os.path.abspath(local)
             Path(dir_path).mkdir(parents=True, exist_ok=True)
+        transferred = skipped = None
         if is_file_like:
             self.sftp.getfo(remotepath=remote, fl=local)
         else:
-            self.sftp.get(remotepath=remote, localpath=local)
-            if preserve_mode:
-                remote_mode = self.sftp.stat(remote).st_mode
-                mode = stat.S_IMODE(remote_mode)
-                os.chmod(local, mode)
+            stripes, chunk_size, prefetch = self._stripe_settings(
+                stripes, chunk_size, prefetch
+            )
+            remote_stat = self.sftp.stat(remote)
+            self.metadata.update(remote, remote_stat)
+            transferred, skipped = self._get_path(
+                sftp=self.sftp,
+                remote=remote,
+                local=local,
+                remote_stat=remote_stat,
+                preserve_mode=preserve_mode,
+                skip_unchanged=skip_unchanged,
+                stripes=stripes,
+                chunk_size=chunk_size,
+                prefetch=prefetch,
+            )
         return Result(
             orig_remote=orig_remote,
             remote=remote,
             orig_local=orig_local,
             local=local,
             connection=self.connection,
+            bytes_transferred=transferred,
+            bytes_skipped=skipped,
+            timings=self._timings(start),
         )
 
-    def put(self, local, remote=None, preserve_mode=True):
+    def put(
+        self,
+        local,
+        remote=None,
+        preserve_mode=True,
+        stripes=None,
+        chunk_size=None,
+        prefetch=None,
+        skip_unchanged=False,
+    ):
         if not local:
             raise ValueError("Local path must not be empty!")
+        _check_skip_unchanged(skip_unchanged)
+        start = monotonic()
         is_file_like = hasattr(local, "write") and callable(local.write)
         orig_remote = remote
         if is_file_like:
@@ -96,9 +157,7 @@ class Transfer:
                         )
                     )
         prejoined_remote = remote
-        remote = posixpath.join(
-            self.sftp.getcwd() or self.sftp.normalize("."), remote
-        )
+        remote = posixpath.join(self.metadata.cwd(), remote)
         if remote != prejoined_remote:
             msg = "Massaged relative remote path {!r} into {!r}"
             debug(msg.format(prejoined_remote, remote))
@@ -111,35 +170,1170 @@ class Transfer:
                         orig_local, local
                     )
                 )  # noqa
+        transferred = skipped = None
         if is_file_like:
             msg = "Uploading file-like object {!r} to {!r}"
             debug(msg.format(local, remote))
             pointer = local.tell()
             try:
                 local.seek(0)
-                self.sftp.putfo(fl=local, remotepath=remote)
+                attr = self.sftp.putfo(fl=local, remotepath=remote)
+                self.metadata.update(remote, attr)
             finally:
                 local.seek(pointer)
         else:
             debug("Uploading {!r} to {!r}".format(local, remote))
-            self.sftp.put(localpath=local, remotepath=remote)
-            if preserve_mode:
-                local_mode = os.stat(local).st_mode
-                mode = stat.S_IMODE(local_mode)
-                self.sftp.chmod(remote, mode)
+            stripes, chunk_size, prefetch = self._stripe_settings(
+                stripes, chunk_size, prefetch
+            )
+            remote_stat = None
+            if skip_unchanged:
+                remote_stat = self._remote_stat(remote)
+            transferred, skipped = self._put_path(
+                sftp=self.sftp,
+                local=local,
+                remote=remote,
+                remote_stat=remote_stat,
+                preserve_mode=preserve_mode,
+                skip_unchanged=skip_unchanged,
+                stripes=stripes,
+                chunk_size=chunk_size,
+                prefetch=prefetch,
+            )
         return Result(
             orig_remote=orig_remote,
             remote=remote,
             orig_local=orig_local,
             local=local,
             connection=self.connection,
+            bytes_transferred=transferred,
+            bytes_skipped=skipped,
+            timings=self._timings(start),
+        )
+
+    def _get_path(
+        self,
+        sftp,
+        remote,
+        local,
+        remote_stat,
+        preserve_mode,
+        skip_unchanged,
+        callback=None,
+        stripes=1,
+        chunk_size=None,
+        prefetch=None,
+    ):
+        local_stat = None
+        if skip_unchanged and os.path.isfile(local):
+            local_stat = os.stat(local)
+        size = remote_stat.st_size if remote_stat is not None else None
+        if skip_unchanged and self._unchanged(
+            local, local_stat, remote, remote_stat, skip_unchanged
+        ):
+            debug("Skipping unchanged {!r}".format(remote))
+            transferred, skipped = 0, size
+        elif skip_unchanged and self._should_delta(size, local_stat):
+            transferred = self._get_delta(sftp, remote, local, size)
+            skipped = size - transferred
+        elif stripes > 1 and size is not None and self._should_stripe(size):
+            self._get_striped(
+                remote, local, size, stripes, chunk_size, prefetch
+            )
+            transferred, skipped = size, 0
+        elif size is not None:
+            self._download(sftp, remote, local, size, callback)
+            transferred, skipped = size, 0
+        else:
+            sftp.get(remotepath=remote, localpath=local, callback=callback)
+            transferred, skipped = os.path.getsize(local), 0
+        if preserve_mode:
+            remote_mode = (remote_stat or sftp.stat(remote)).st_mode
+            mode = stat.S_IMODE(remote_mode)
+            os.chmod(local, mode)
+        if skip_unchanged:
+            os.utime(local, (remote_stat.st_atime, remote_stat.st_mtime))
+        return transferred, skipped
+
+    def _put_path(
+        self,
+        sftp,
+        local,
+        remote,
+        remote_stat,
+        preserve_mode,
+        skip_unchanged,
+        callback=None,
+        stripes=1,
+        chunk_size=None,
+        prefetch=None,
+    ):
+        local_stat = os.stat(local)
+        size = local_stat.st_size
+        attr = None
+        unchanged = skip_unchanged and self._unchanged(
+            local, local_stat, remote, remote_stat, skip_unchanged
+        )
+        if unchanged:
+            debug("Skipping unchanged {!r}".format(local))
+            attr = remote_stat
+            transferred, skipped = 0, size
+        elif skip_unchanged and self._should_delta(size, remote_stat):
+            transferred = self._put_delta(
+                sftp, local, remote, size, remote_stat.st_size
+            )
+            skipped = size - transferred
+        elif stripes > 1 and self._should_stripe(size):
+            self._put_striped(
+                local, remote, size, stripes, chunk_size, prefetch
+            )
+            transferred, skipped = size, 0
+        else:
+            attr = sftp.put(
+                localpath=local, remotepath=remote, callback=callback
+            )
+            transferred, skipped = size, 0
+        if preserve_mode:
+            mode = stat.S_IMODE(local_stat.st_mode)
+            if not (unchanged and stat.S_IMODE(remote_stat.st_mode) == mode):
+                sftp.chmod(remote, mode)
+                if attr is not None:
+                    attr.st_mode = stat.S_IFMT(attr.st_mode) | mode
+        if skip_unchanged and not (
+            unchanged and int(remote_stat.st_mtime) == int(local_stat.st_mtime)
+        ):
+            sftp.utime(remote, (local_stat.st_atime, local_stat.st_mtime))
+            if attr is not None:
+                attr.st_atime = int(local_stat.st_atime)
+                attr.st_mtime = int(local_stat.st_mtime)
+        if attr is not None:
+            self.metadata.update(remote, attr)
+        else:
+            self.metadata.invalidate(remote)
+        return transferred, skipped
+
+    def _download(self, sftp, remote, local, size, callback=None):
+        chunk_size = self.connection.config.transfer.chunk_size
+        received = 0
+        with sftp.open(remote, "rb") as remote_file:
+            remote_file.prefetch(size)
+            with open(local, "wb") as local_file:
+                while True:
+                    data = remote_file.read(chunk_size)
+                    if not data:
+                        break
+                    local_file.write(data)
+                    received += len(data)
+                    if callback is not None:
+                        callback(received, size)
+        if received != size:
+            raise IOError(
+                "size mismatch in get!  {} != {}".format(received, size)
+            )
+
+    def _remote_stat(self, path):
+        try:
+            return self.metadata.stat(path)
+        except IOError:
+            return None
+
+    def _unchanged(self, local, local_stat, remote, remote_stat, mode):
+        if local_stat is None or remote_stat is None:
+            return False
+        if local_stat.st_size != remote_stat.st_size:
+            return False
+        if mode == "checksum":
+            remote_hash = self._remote_hash(remote)
+            return remote_hash is not None and remote_hash == _file_hash(
+                local, self.hash_algorithm
+            )
+        # SFTP only carries whole-second times, so that's as precise as the
+        # comparison can get; the sizes matching above backs it up.
+        return int(local_stat.st_mtime) == int(remote_stat.st_mtime)
+
+    def _should_delta(self, size, other_stat):
+        threshold = self.connection.config.transfer.delta_threshold
+        return (
+            threshold is not None
+            and other_stat is not None
+            and size >= threshold
+            and other_stat.st_size >= threshold
+        )
+
+    @property
+    def hash_algorithm(self):
+        return self.connection.config.transfer.hash_algorithm
+
+    @property
+    def hash_command(self):
+        command = self.connection.config.transfer.hash_command
+        return command or "{}sum".format(self.hash_algorithm)
+
+    def _check_digest(self, digest, path):
+        length = hashlib.new(self.hash_algorithm).digest_size * 2
+        if len(digest) != length or digest.strip(string.hexdigits):
+            err = "{!r} printed {!r} for {!r}, which isn't a {} digest!"
+            raise ValueError(
+                err.format(
+                    self.hash_command, digest, path, self.hash_algorithm
+                )
+            )
+        return digest
+
+    def _remote_hash(self, path):
+        command = "{} {}".format(self.hash_command, shlex.quote(path))
+        result = self.connection.run(
+            command, hide=True, warn=True, in_stream=False
+        )
+        if result.failed or not result.stdout.strip():
+            return None
+        return self._check_digest(result.stdout.split()[0].lower(), path)
+
+    def _remote_block_hashes(self, path, size, block_size):
+        count = -(-size // block_size)
+        # Hash every block in one read of the file where Python is around;
+        # otherwise fall back to one dd and hash_command per block.
+        command = (
+            "if command -v python3 >/dev/null 2>&1; then"
+            " exec python3 -c {script} {algorithm} {path} {block_size}; fi; "
+            "i=0; while [ $i -lt {count} ]; do "
+            "dd if={path} bs={block_size} skip=$i count=1 2>/dev/null | {hash}"
+            "; i=$((i + 1)); done"
+        ).format(
+            script=shlex.quote(_BLOCK_HASH_SCRIPT),
+            algorithm=shlex.quote(self.hash_algorithm),
+            count=count,
+            path=shlex.quote(path),
+            block_size=block_size,
+            hash=self.hash_command,
+        )
+        result = self.connection.run(
+            command, hide=True, warn=True, in_stream=False
+        )
+        if result.failed:
+            return None
+        hashes = [
+            self._check_digest(x.split()[0].lower(), path)
+            for x in result.stdout.splitlines()
+        ]
+        return hashes if len(hashes) == count else None
+
+    def _put_delta(self, sftp, local, remote, size, remote_size):
+        block_size = self.connection.config.transfer.delta_block_size
+        hashes = self._remote_block_hashes(remote, remote_size, block_size)
+        if hashes is None:
+            msg = "Couldn't hash {!r} remotely, sending it whole"
+            debug(msg.format(remote))
+            sftp.put(localpath=local, remotepath=remote)
+            return size
+        sent = 0
+        with open(local, "rb") as local_file:
+            with sftp.open(remote, "r+b") as remote_file:
+                remote_file.set_pipelined(True)
+                for index, offset in enumerate(range(0, size, block_size)):
+                    data = local_file.read(block_size)
+                    if index < len(hashes) and hashes[index] == _hash(
+                        data, self.hash_algorithm
+                    ):
+                        continue
+                    remote_file.seek(offset)
+                    remote_file.write(data)
+                    sent += len(data)
+                if remote_size != size:
+                    remote_file.truncate(size)
+        msg = "Sent {} changed bytes of {!r} ({} total)"
+        debug(msg.format(sent, local, size))
+        return sent
+
+    def _get_delta(self, sftp, remote, local, size):
+        block_size = self.connection.config.transfer.delta_block_size
+        hashes = self._remote_block_hashes(remote, size, block_size)
+        if hashes is None:
+            msg = "Couldn't hash {!r} remotely, fetching it whole"
+            debug(msg.format(remote))
+            sftp.get(remotepath=remote, localpath=local)
+            return size
+        with open(local, "r+b") as local_file:
+            changed = []
+            for index, offset in enumerate(range(0, size, block_size)):
+                data = local_file.read(block_size)
+                if _hash(data, self.hash_algorithm) != hashes[index]:
+                    changed.append((offset, min(block_size, size - offset)))
+            with sftp.open(remote, "rb") as remote_file:
+                for (offset, _), data in zip(
+                    changed, remote_file.readv(changed)
+                ):
+                    local_file.seek(offset)
+                    local_file.write(data)
+            local_file.truncate(size)
+        received = sum(length for _, length in changed)
+        msg = "Fetched {} changed bytes of {!r} ({} total)"
+        debug(msg.format(received, remote, size))
+        return received
+
+    def put_tree(
+        self,
+        local,
+        remote=None,
+        preserve_mode=True,
+        include=None,
+        exclude=None,
+        workers=4,
+        progress=None,
+        skip_unchanged=False,
+    ):
+        _check_skip_unchanged(skip_unchanged)
+        if not local:
+            raise ValueError("Local path must not be empty!")
+        start = monotonic()
+        orig_local, orig_remote = local, remote
+        local = os.path.abspath(local)
+        if not os.path.isdir(local):
+            raise ValueError(
+                "put_tree() needs a local directory, got {!r}!".format(local)
+            )
+        if not remote:
+            remote = os.path.basename(local)
+        remote = posixpath.join(self.metadata.cwd(), remote)
+        debug("Uploading tree {!r} to {!r}".format(local, remote))
+        restricted = []
+
+        def jobs():
+            for dirpath, dirnames, filenames in os.walk(local):
+                relative = os.path.relpath(dirpath, local)
+                parts = [] if relative == os.curdir else relative.split(os.sep)
+                remote_dir = posixpath.join(remote, *parts)
+                mode = None
+                if preserve_mode:
+                    mode = stat.S_IMODE(os.stat(dirpath).st_mode)
+                created = self._remote_mkdir(
+                    remote_dir, None if mode is None else mode | stat.S_IRWXU
+                )
+                if created and mode is not None and _restrictive(mode):
+                    restricted.append((remote_dir, mode))
+                existing = {}
+                if skip_unchanged and not created:
+                    existing = {
+                        attr.filename: attr
+                        for attr in self.sftp.listdir_attr(remote_dir)
+                    }
+                dirnames[:] = [
+                    name
+                    for name in sorted(dirnames)
+                    if not _excluded(posixpath.join(*parts, name), exclude)
+                ]
+                for name in sorted(filenames):
+                    relpath = posixpath.join(*parts, name)
+                    if _selected(relpath, include, exclude):
+                        yield self._put_file, (
+                            os.path.join(dirpath, name),
+                            posixpath.join(remote_dir, name),
+                            relpath,
+                            existing.get(name),
+                            preserve_mode,
+                            skip_unchanged,
+                            progress,
+                        )
+
+        files = self._run_workers(jobs(), workers)
+        for path, mode in reversed(restricted):
+            self.sftp.chmod(path, mode)
+        return TreeResult(
+            orig_remote=orig_remote,
+            remote=remote,
+            orig_local=orig_local,
+            local=local,
+            connection=self.connection,
+            files=files,
+            timings=self._timings(start),
+        )
+
+    def get_tree(
+        self,
+        remote,
+        local=None,
+        preserve_mode=True,
+        include=None,
+        exclude=None,
+        workers=4,
+        progress=None,
+        skip_unchanged=False,
+    ):
+        _check_skip_unchanged(skip_unchanged)
+        if not remote:
+            raise ValueError("Remote path must not be empty!")
+        start = monotonic()
+        orig_remote, orig_local = remote, local
+        remote = posixpath.join(self.metadata.cwd(), remote)
+        if not self.is_remote_dir(remote):
+            raise ValueError(
+                "get_tree() needs a remote directory, got {!r}!".format(remote)
+            )
+        remote_dirname = posixpath.basename(remote.rstrip("/"))
+        if not local:
+            local = remote_dirname
+        local = local.format(
+            host=self.connection.host,
+            user=self.connection.user,
+            port=self.connection.port,
+            dirname=posixpath.dirname(remote.rstrip("/")),
+            basename=remote_dirname,
+        )
+        if local.endswith(os.sep):
+            local = os.path.join(local, remote_dirname)
+        local = os.path.abspath(local)
+        debug("Downloading tree {!r} to {!r}".format(remote, local))
+        skipped = {}
+        restricted = []
+
+        def jobs():
+            Path(local).mkdir(parents=True, exist_ok=True)
+            pending = [()]
+            while pending:
+                parts = pending.pop(0)
+                remote_dir = posixpath.join(remote, *parts)
+                local_dir = os.path.join(local, *parts)
+                entries = sorted(
+                    self.sftp.listdir_attr(remote_dir),
+                    key=lambda x: x.filename,
+                )
+                # Symlinked files need their target's attributes; look them
+                # all up in one batch rather than one SFTP stat per link.
+                targets = self.metadata.stat_many(
+                    posixpath.join(remote_dir, attr.filename)
+                    for attr in entries
+                    if stat.S_ISLNK(attr.st_mode)
+                )
+                for attr in entries:
+                    name = attr.filename
+                    relpath = posixpath.join(*parts, name)
+                    path = posixpath.join(remote_dir, name)
+                    if stat.S_ISLNK(attr.st_mode):
+                        # Links are only followed to files: a directory link
+                        # may loop back into the tree, and a dangling one has
+                        # nothing to fetch.
+                        attr, reason = targets[path], None
+                        if attr is None:
+                            reason = "dangling symlink"
+                        elif stat.S_ISDIR(attr.st_mode):
+                            reason = "symlink to a directory"
+                        if reason is not None:
+                            if _selected(relpath, include, exclude):
+                                skipped[relpath] = reason
+                            continue
+                    if stat.S_ISDIR(attr.st_mode):
+                        if _excluded(relpath, exclude):
+                            continue
+                        local_path = os.path.join(local_dir, name)
+                        Path(local_path).mkdir(exist_ok=True)
+                        if preserve_mode:
+                            mode = stat.S_IMODE(attr.st_mode)
+                            os.chmod(local_path, mode | stat.S_IRWXU)
+                            if _restrictive(mode):
+                                restricted.append((local_path, mode))
+                        pending.append(parts + (name,))
+                    elif _selected(relpath, include, exclude):
+                        yield self._get_file, (
+                            path,
+                            os.path.join(local_dir, name),
+                            relpath,
+                            attr,
+                            preserve_mode,
+                            skip_unchanged,
+                            progress,
+                        )
+
+        files = self._run_workers(jobs(), workers)
+        for path, mode in reversed(restricted):
+            os.chmod(path, mode)
+        return TreeResult(
+            orig_remote=orig_remote,
+            remote=remote,
+            orig_local=orig_local,
+            local=local,
+            connection=self.connection,
+            files=files,
+            skipped=skipped,
+            timings=self._timings(start),
+        )
+
+    def put_archive(
+        self,
+        local,
+        remote=None,
+        preserve_mode=True,
+        include=None,
+        exclude=None,
+        compression=None,
+        progress=None,
+    ):
+        flag = _compression_flag(compression)
+        if not local:
+            raise ValueError("Local path must not be empty!")
+        start = monotonic()
+        orig_local, orig_remote = local, remote
+        local = os.path.abspath(local)
+        if not os.path.isdir(local):
+            raise ValueError(
+                "put_archive() needs a local directory, got {!r}!".format(
+                    local
+                )
+            )
+        if not remote:
+            remote = os.path.basename(local)
+        remote = posixpath.join(self.metadata.cwd(), remote)
+        command = "mkdir -p {0} && tar -x{1}f - -C {0} {2}".format(
+            shlex.quote(remote),
+            flag,
+            _TAR_EXTRACT_OPTIONS[bool(preserve_mode)],
+        )
+        debug("Uploading tree {!r} to {!r} via tar".format(local, remote))
+
+        def normalize(info):
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            if not preserve_mode:
+                info.mode = 0o777 if info.isdir() else 0o666
+            return info
+
+        files = []
+        channel = self.connection.create_session()
+        try:
+            stream = _ChannelStream(channel)
+            channel.exec_command(command)
+            stream.start()
+            mode = "w|{}".format(compression or "")
+            with tarfile.open(fileobj=stream, mode=mode) as archive:
+                archive.add(
+                    local, arcname=".", recursive=False, filter=normalize
+                )
+                for dirpath, dirnames, filenames in os.walk(local):
+                    relative = os.path.relpath(dirpath, local)
+                    parts = (
+                        [] if relative == os.curdir else relative.split(os.sep)
+                    )
+                    dirnames[:] = [
+                        name
+                        for name in sorted(dirnames)
+                        if not _excluded(posixpath.join(*parts, name), exclude)
+                    ]
+                    for name in dirnames:
+                        archive.add(
+                            os.path.join(dirpath, name),
+                            arcname=posixpath.join(*parts, name),
+                            recursive=False,
+                            filter=normalize,
+                        )
+                    for name in sorted(filenames):
+                        relpath = posixpath.join(*parts, name)
+                        if not _selected(relpath, include, exclude):
+                            continue
+                        path = os.path.join(dirpath, name)
+                        archive.add(
+                            path,
+                            arcname=relpath,
+                            recursive=False,
+                            filter=normalize,
+                        )
+                        size = os.lstat(path).st_size
+                        if progress:
+                            progress(relpath, size, size)
+                        files.append(
+                            Result(
+                                orig_remote=relpath,
+                                remote=posixpath.join(remote, relpath),
+                                orig_local=relpath,
+                                local=path,
+                                connection=self.connection,
+                                bytes_transferred=size,
+                            )
+                        )
+            channel.shutdown_write()
+        except (OSError, tarfile.TarError):
+            self._archive_failed(channel, command, stream)
+            raise
+        else:
+            self._check_archive_exit(channel, command, stream)
+        finally:
+            channel.close()
+            self.metadata.invalidate(remote)
+        return TreeResult(
+            orig_remote=orig_remote,
+            remote=remote,
+            orig_local=orig_local,
+            local=local,
+            connection=self.connection,
+            files=files,
+            archive_bytes=stream.count,
+            timings=self._timings(start),
+        )
+
+    def get_archive(
+        self,
+        remote,
+        local=None,
+        preserve_mode=True,
+        include=None,
+        exclude=None,
+        compression=None,
+        progress=None,
+    ):
+        flag = _compression_flag(compression)
+        if not remote:
+            raise ValueError("Remote path must not be empty!")
+        start = monotonic()
+        orig_remote, orig_local = remote, local
+        remote = posixpath.join(self.metadata.cwd(), remote)
+        if not self.is_remote_dir(remote):
+            raise ValueError(
+                "get_archive() needs a remote directory, got {!r}!".format(
+                    remote
+                )
+            )
+        remote_dirname = posixpath.basename(remote.rstrip("/"))
+        if not local:
+            local = remote_dirname
+        local = local.format(
+            host=self.connection.host,
+            user=self.connection.user,
+            port=self.connection.port,
+            dirname=posixpath.dirname(remote.rstrip("/")),
+            basename=remote_dirname,
+        )
+        if local.endswith(os.sep):
+            local = os.path.join(local, remote_dirname)
+        local = os.path.abspath(local)
+        # Patterns without a slash match basenames in tar as they do here,
+        # so those can already be skipped remotely; the rest are applied
+        # below, while extracting.
+        remote_excludes = "".join(
+            " --exclude={}".format(shlex.quote(pattern))
+            for pattern in exclude or ()
+            if "/" not in pattern
+        )
+        command = "tar -c{}f -{} -C {} .".format(
+            flag, remote_excludes, shlex.quote(remote)
+        )
+        debug("Downloading tree {!r} to {!r} via tar".format(remote, local))
+        Path(local).mkdir(parents=True, exist_ok=True)
+        extract = {"set_attrs": bool(preserve_mode)}
+        if hasattr(tarfile, "data_filter"):
+            extract["filter"] = "data"
+        files = []
+        skipped = []
+        directories = []
+        channel = self.connection.create_session()
+        try:
+            stream = _ChannelStream(channel)
+            channel.exec_command(command)
+            stream.start()
+            with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                for member in archive:
+                    relpath = posixpath.normpath(member.name)
+                    if relpath == os.curdir:
+                        continue
+                    if relpath.startswith(("/", "../")) or relpath == "..":
+                        raise ValueError(
+                            "Refusing to extract {!r} outside of {!r}!".format(
+                                member.name, local
+                            )
+                        )
+                    if any(
+                        relpath.startswith(prefix) for prefix in skipped
+                    ):
+                        continue
+                    if member.isdir():
+                        if _excluded(relpath, exclude):
+                            skipped.append(relpath + "/")
+                            continue
+                    elif not _selected(relpath, include, exclude):
+                        continue
+                    member.name = relpath
+                    if member.isdir():
+                        # As in TarFile.extractall, directories get their
+                        # attributes last, so read-only ones can be filled.
+                        archive.extract(
+                            member, local, **dict(extract, set_attrs=False)
+                        )
+                        path = os.path.join(local, *relpath.split("/"))
+                        mode = stat.S_IMODE(os.stat(path).st_mode)
+                        os.chmod(path, mode | stat.S_IRWXU)
+                        if preserve_mode:
+                            directories.append(member)
+                        continue
+                    archive.extract(member, local, **extract)
+                    if progress:
+                        progress(relpath, member.size, member.size)
+                    files.append(
+                        Result(
+                            orig_remote=relpath,
+                            remote=posixpath.join(remote, relpath),
+                            orig_local=relpath,
+                            local=os.path.join(local, *relpath.split("/")),
+                            connection=self.connection,
+                            bytes_transferred=member.size,
+                        )
+                    )
+                for member in sorted(
+                    directories, key=lambda x: x.name, reverse=True
+                ):
+                    path = os.path.join(local, *member.name.split("/"))
+                    mode = member.mode
+                    if "filter" in extract:
+                        # The data filter drops directory modes outright;
+                        # keep them, minus the bits it strips from files.
+                        mode &= 0o755
+                    os.chmod(path, mode)
+                    archive.utime(member, path)
+            # Let tar finish writing its trailing padding before it exits.
+            while stream.read(32768):
+                pass
+        except (OSError, tarfile.TarError):
+            self._archive_failed(channel, command, stream)
+            raise
+        else:
+            self._check_archive_exit(channel, command, stream)
+        finally:
+            channel.close()
+        return TreeResult(
+            orig_remote=orig_remote,
+            remote=remote,
+            orig_local=orig_local,
+            local=local,
+            connection=self.connection,
+            files=files,
+            archive_bytes=stream.count,
+            timings=self._timings(start),
         )
 
+    def relay(self, target, path, remote=None, mode=None, checksum=None):
+        start = monotonic()
+        orig_remote = remote
+        dest = Transfer(target)
+        base = posixpath.basename(path)
+        if not remote:
+            remote = base
+        elif dest.is_remote_dir(remote):
+            remote = posixpath.join(remote, base)
+        remote = posixpath.join(dest.metadata.cwd(), remote)
+        partial_path = "{}.fabric-relay-{}".format(remote, uuid.uuid4().hex)
+        receive = "cat > {0} && mv -f {0} {1}".format(
+            shlex.quote(partial_path), shlex.quote(remote)
+        )
+        command = self.connection.config.transfer.relay_command.format(
+            host=target.host,
+            port=target.port,
+            user=target.user,
+            path=shlex.quote(path),
+            command=shlex.quote(receive),
+        )
+        msg = "Relaying {!r} from {!r} to {!r} on {!r}"
+        debug(msg.format(path, self.connection, remote, target))
+        self.connection.run(command, hide=True, in_stream=False)
+        dest.metadata.invalidate(remote)
+        if checksum is not None:
+            dest.verify(remote, checksum)
+        if mode is not None:
+            dest.sftp.chmod(remote, stat.S_IMODE(mode))
+        return Result(
+            orig_remote=orig_remote,
+            remote=remote,
+            orig_local=path,
+            local=path,
+            connection=target,
+            bytes_transferred=dest.sftp.stat(remote).st_size,
+            relayed_from=self.connection,
+            timings=self._timings(start),
+        )
+
+    def verify(self, remote, checksum):
+        actual = self._remote_hash(remote)
+        if actual != checksum:
+            err = "Checksum mismatch for {!r} on {!r}: expected {}, got {}"
+            raise IOError(
+                err.format(remote, self.connection, checksum, actual)
+            )
+
+    def _archive_failed(self, channel, command, stream):
+        # Only a remote end which already went away can explain the error;
+        # otherwise it's local, and closing the channel stops the remote tar
+        # (which would be waiting on us forever).
+        if channel.closed or channel.eof_received:
+            if channel.status_event.wait(_ARCHIVE_EXIT_TIMEOUT):
+                self._check_archive_exit(channel, command, stream)
+        channel.close()
+
+    def _check_archive_exit(self, channel, command, stream):
+        exited = channel.recv_exit_status()
+        if exited == 0:
+            return
+        stream.stderr_done.wait(_ARCHIVE_EXIT_TIMEOUT)
+        stderr = bytes(stream.stderr).decode("utf-8", "replace")
+        raise UnexpectedExit(
+            RunResult(
+                connection=self.connection,
+                command=command,
+                stdout="",
+                stderr=stderr,
+                exited=exited,
+                pty=False,
+                hide=("stdout", "stderr"),
+            )
+        )
+
+    def _stripe_settings(self, stripes, chunk_size, prefetch):
+        config = self.connection.config.transfer
+        if stripes is None:
+            stripes = config.stripes
+        if chunk_size is None:
+            chunk_size = config.chunk_size
+        if prefetch is None:
+            prefetch = config.prefetch
+        return max(stripes, 1), max(chunk_size, 1), max(prefetch, 1)
+
+    def _should_stripe(self, size):
+        threshold = self.connection.config.transfer.stripe_threshold
+        return size > 0 and size >= threshold
+
+    def _stripe_ranges(self, size, stripes, chunk_size):
+        chunks = -(-size // chunk_size)
+        per_stripe = -(-chunks // stripes) * chunk_size
+        return [
+            (start, min(start + per_stripe, size))
+            for start in range(0, size, per_stripe)
+        ]
+
+    def _get_striped(self, remote, local, size, stripes, chunk_size, prefetch):
+        msg = "Downloading {!r} in {} stripes of {}-byte chunks"
+        debug(msg.format(remote, stripes, chunk_size))
+        with open(local, "wb") as fd:
+            fd.truncate(size)
+        jobs = [
+            (
+                self._get_range,
+                (remote, local, start, end, chunk_size, prefetch),
+            )
+            for start, end in self._stripe_ranges(size, stripes, chunk_size)
+        ]
+        self._run_workers(jobs, len(jobs))
+
+    def _get_range(
+        self, sftp, remote, local, start, end, chunk_size, prefetch
+    ):
+        chunks = [
+            (offset, min(chunk_size, end - offset))
+            for offset in range(start, end, chunk_size)
+        ]
+        fd = os.open(local, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        try:
+            with sftp.open(remote, "rb") as remote_file:
+                for i in range(0, len(chunks), prefetch):
+                    batch = chunks[i : i + prefetch]
+                    for (offset, _), data in zip(
+                        batch, remote_file.readv(batch)
+                    ):
+                        _pwrite(fd, data, offset)
+        finally:
+            os.close(fd)
+
+    def _put_striped(self, local, remote, size, stripes, chunk_size, prefetch):
+        msg = "Uploading {!r} in {} stripes of {}-byte chunks"
+        debug(msg.format(local, stripes, chunk_size))
+        with self.sftp.open(remote, "wb") as remote_file:
+            remote_file.truncate(size)
+        jobs = [
+            (self._put_range, (local, remote, start, end, chunk_size))
+            for start, end in self._stripe_ranges(size, stripes, chunk_size)
+        ]
+        self._run_workers(jobs, len(jobs))
+
+    def _put_range(self, sftp, local, remote, start, end, chunk_size):
+        with open(local, "rb") as local_file:
+            with sftp.open(remote, "r+b") as remote_file:
+                remote_file.set_pipelined(True)
+                local_file.seek(start)
+                remote_file.seek(start)
+                offset = start
+                while offset < end:
+                    data = local_file.read(min(chunk_size, end - offset))
+                    if not data:
+                        break
+                    remote_file.write(data)
+                    offset += len(data)
+
+    def _remote_mkdir(self, path, mode=None):
+        try:
+            if mode is None:
+                self.sftp.mkdir(path)
+            else:
+                self.sftp.mkdir(path, stat.S_IMODE(mode))
+        except IOError:
+            if not self.is_remote_dir(path):
+                raise
+            return False
+        return True
+
+    def _put_file(
+        self,
+        sftp,
+        local,
+        remote,
+        relpath,
+        remote_stat,
+        preserve_mode,
+        skip_unchanged,
+        progress,
+    ):
+        callback = partial(progress, relpath) if progress else None
+        transferred, skipped = self._put_path(
+            sftp=sftp,
+            local=local,
+            remote=remote,
+            remote_stat=remote_stat,
+            preserve_mode=preserve_mode,
+            skip_unchanged=skip_unchanged,
+            callback=callback,
+        )
+        return Result(
+            orig_remote=relpath,
+            remote=remote,
+            orig_local=relpath,
+            local=local,
+            connection=self.connection,
+            bytes_transferred=transferred,
+            bytes_skipped=skipped,
+        )
+
+    def _get_file(
+        self,
+        sftp,
+        remote,
+        local,
+        relpath,
+        remote_stat,
+        preserve_mode,
+        skip_unchanged,
+        progress,
+    ):
+        callback = partial(progress, relpath) if progress else None
+        transferred, skipped = self._get_path(
+            sftp=sftp,
+            remote=remote,
+            local=local,
+            remote_stat=remote_stat,
+            preserve_mode=preserve_mode,
+            skip_unchanged=skip_unchanged,
+            callback=callback,
+        )
+        return Result(
+            orig_remote=relpath,
+            remote=remote,
+            orig_local=relpath,
+            local=local,
+            connection=self.connection,
+            bytes_transferred=transferred,
+            bytes_skipped=skipped,
+        )
+
+    def _run_workers(self, jobs, workers):
+        queue = Queue()
+        failed = Event()
+        results = []
+        threads = [
+            ExceptionHandlingThread(
+                target=self._worker,
+                kwargs=dict(queue=queue, failed=failed, results=results),
+            )
+            for _ in range(max(workers, 1))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for job in jobs:
+                if failed.is_set():
+                    break
+                queue.put(job)
+        finally:
+            for _ in threads:
+                queue.put(None)
+            for thread in threads:
+                thread.join()
+        wrappers = [x.exception() for x in threads if x.exception()]
+        if wrappers:
+            raise ThreadException(wrappers)
+        return results
+
+    def _worker(self, queue, failed, results):
+        sftp = SFTPClient.from_transport(self.connection.transport)
+        try:
+            while True:
+                job = queue.get()
+                if job is None:
+                    return
+                if failed.is_set():
+                    continue
+                method, args = job
+                try:
+                    results.append(method(sftp, *args))
+                except BaseException:
+                    failed.set()
+                    raise
+        finally:
+            sftp.close()
+
+
+def _pwrite(fd, data, offset):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+_ARCHIVE_EXIT_TIMEOUT = 5
+
+_BLOCK_HASH_SCRIPT = """\
+import hashlib, sys
+algorithm, path, size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+with open(path, "rb") as fd:
+    for block in iter(lambda: fd.read(size), b""):
+        print(hashlib.new(algorithm, block).hexdigest())
+"""
+
+_COMPRESSION_FLAGS = {None: "", "gz": "z", "bz2": "j", "xz": "J"}
+
+# Ownership is never restored; modes are (with -p) when preserve_mode is set,
+# otherwise the remote umask applies, even for root.
+_TAR_EXTRACT_OPTIONS = {
+    True: "--no-same-owner -p",
+    False: "--no-same-owner --no-same-permissions",
+}
+
+
+def _compression_flag(compression):
+    if compression not in _COMPRESSION_FLAGS:
+        err = "compression must be None, 'gz', 'bz2' or 'xz', not {!r}!"
+        raise ValueError(err.format(compression))
+    return _COMPRESSION_FLAGS[compression]
+
+
+class _ChannelStream:
+    stderr_limit = 65536
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.count = 0
+        self.stderr = bytearray()
+        self.stderr_done = Event()
+
+    def start(self):
+        # Keep reading stderr meanwhile, so a chatty tar can't fill the
+        # channel window and stall the transfer.
+        Thread(target=self._drain_stderr, daemon=True).start()
+
+    def _drain_stderr(self):
+        try:
+            while True:
+                data = self.channel.recv_stderr(32768)
+                if not data:
+                    return
+                self.stderr += data
+                del self.stderr[: -self.stderr_limit]
+        finally:
+            self.stderr_done.set()
+
+    def write(self, data):
+        self.channel.sendall(data)
+        self.count += len(data)
+
+    def read(self, size):
+        data = self.channel.recv(size)
+        self.count += len(data)
+        return data
+
+
+def _check_skip_unchanged(skip_unchanged):
+    if skip_unchanged not in (False, None, True, "mtime", "checksum"):
+        err = "skip_unchanged must be a bool, 'mtime' or 'checksum', not {!r}!"
+        raise ValueError(err.format(skip_unchanged))
+
+
+def _hash(data, algorithm):
+    return hashlib.new(algorithm, data).hexdigest()
+
+
+def _file_hash(path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as fd:
+        for block in iter(partial(fd.read, 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _restrictive(mode):
+    # Directories whose owner can't write or enter them are only given that
+    # mode once their contents are in place, deepest first, as tarfile does.
+    return mode & stat.S_IRWXU != stat.S_IRWXU
+
+
+def _excluded(relpath, exclude):
+    name = posixpath.basename(relpath)
+    return any(
+        fnmatch(relpath, pattern) or fnmatch(name, pattern)
+        for pattern in exclude or ()
+    )
+
+
+def _selected(relpath, include, exclude):
+    if _excluded(relpath, exclude):
+        return False
+    if include is None:
+        return True
+    name = posixpath.basename(relpath)
+    return any(
+        fnmatch(relpath, pattern) or fnmatch(name, pattern)
+        for pattern in include
+    )
+
 
 class Result:
-    def __init__(self, local, orig_local, remote, orig_remote, connection):
+    def __init__(
+        self,
+        local,
+        orig_local,
+        remote,
+        orig_remote,
+        connection,
+        bytes_transferred=None,
+        bytes_skipped=None,
+        timings=None,
+        relayed_from=None,
+    ):
         self.local = local
         self.orig_local = orig_local
         self.remote = remote
         self.orig_remote = orig_remote
         self.connection = connection
+        self.bytes_transferred = bytes_transferred
+        self.bytes_skipped = bytes_skipped
+        self.timings = timings
+        self.relayed_from = relayed_from
+
+
+class TreeResult(Result):
+    def __init__(self, files, archive_bytes=None, skipped=None, **kwargs):
+        kwargs.setdefault(
+            "bytes_transferred",
+            sum(x.bytes_transferred or 0 for x in files),
+        )
+        kwargs.setdefault(
+            "bytes_skipped", sum(x.bytes_skipped or 0 for x in files)
+        )
+        super().__init__(**kwargs)
+        self.files = files
+        self.archive_bytes = archive_bytes
+        self.skipped = skipped or {}
@@ -2,14 +2,26 @@
 File transfer via SFTP and/or SCP.
 """
 
+from queue import Queue
+from threading import Event
+
+from paramiko.channel import Channel
+from paramiko.sftp_attr import SFTPAttributes
 from paramiko.sftp_client import SFTPClient
 
-from os import PathLike
+from os import PathLike, stat_result
 from typing_extensions import (
-    IO
+    Any,
+    IO,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
 )
 
 from .connection import Connection
+from .metadata import RemoteMetadataCache
+from .timing import Timings
 
 
 class Transfer:
@@ -20,12 +32,35 @@ class Transfer:
     @property
     def sftp(self) -> SFTPClient: ...
     
-    def is_remote_dir(self, path: PathLike[str | bytes]) -> bool: ...
+    @property
+    def metadata(self) -> RemoteMetadataCache:
+        """
+        The connection's `.RemoteMetadataCache`.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def is_remote_dir(self, path: PathLike[str | bytes]) -> bool:
+        """
+        Return whether ``path`` is a remote directory.
+
+        .. versionchanged:: 3.3
+            Answered from the connection's `.RemoteMetadataCache` when
+            possible.
+        """
+        ...
+
+    def _timings(self, start: float) -> Timings: ...
     
     def get(self,
         remote: PathLike[str | bytes],
         local: PathLike[str | bytes] | IO[str | bytes] | None = None,
-        preserve_mode: bool = True
+        preserve_mode: bool = True,
+        stripes: int | None = None,
+        chunk_size: int | None = None,
+        prefetch: int | None = None,
+        skip_unchanged: bool | Literal["mtime", "checksum"] = False
     ) -> Result:
         """
         Copy a file from wrapped connection's host to the local filesystem.
@@ -86,7 +121,43 @@ class Transfer:
             Whether to `os.chmod` the local file so it matches the remote
             file's mode (default: ``True``).
 
-        :returns: A `.Result` object.
+        :param int stripes:
+            Number of SFTP channels to download over in parallel. When above
+            ``1`` and the remote file is at least ``transfer.stripe_threshold``
+            bytes, the file is split into that many contiguous ranges, each
+            fetched by its own channel with pipelined reads and written into
+            a preallocated local file with positional writes. Has no effect
+            when ``local`` is a file-like object. Default: the
+            ``transfer.stripes`` config value (``1``, i.e. no striping).
+
+        :param int chunk_size:
+            Size, in bytes, of each read request when striping. Default: the
+            ``transfer.chunk_size`` config value (``32768``).
+
+        :param int prefetch:
+            How many read requests each stripe keeps in flight. Default: the
+            ``transfer.prefetch`` config value (``64``).
+
+        :param skip_unchanged:
+            Avoid re-sending data the local file already has. With ``True``
+            or ``"mtime"``, the download is skipped when the local file's size
+            and modification time match the remote file's (to the second,
+            which is all SFTP reports); with ``"checksum"``, sizes must match
+            and the remote file's digest, computed by running `hash_command`
+            on the remote host, must equal the local file's `hash_algorithm`
+            digest.
+
+            Otherwise, if both files are at least ``transfer.delta_threshold``
+            bytes, they are compared in ``transfer.delta_block_size`` blocks
+            and only the differing blocks are fetched. The remote blocks are
+            hashed in one command: a single pass of ``python3`` when the
+            remote host has it, else ``dd`` and `hash_command` per block. Either way, the local file's modification time is then
+            set to the remote one's so the next comparison is cheap. Default:
+            ``False`` (always download).
+
+        :returns:
+            A `.Result` object, whose ``bytes_transferred`` and
+            ``bytes_skipped`` report how much data was actually fetched.
 
         .. versionadded:: 2.0
         .. versionchanged:: 2.6
@@ -94,13 +165,20 @@ class Transfer:
             attributes.
         .. versionchanged:: 2.6
             Create missing ``local`` directories automatically.
+        .. versionchanged:: 3.3
+            Added the ``stripes``, ``chunk_size``, ``prefetch`` and
+            ``skip_unchanged`` parameters.
         """
         ...
     
     def put(self,
         local: PathLike[str | bytes] | IO[str | bytes],
         remote: PathLike[str | bytes] | None = None,
-        preserve_mode: bool = True
+        preserve_mode: bool = True,
+        stripes: int | None = None,
+        chunk_size: int | None = None,
+        prefetch: int | None = None,
+        skip_unchanged: bool | Literal["mtime", "checksum"] = False
     ) -> Result:
         """
         Upload a file from the local filesystem to the current connection.
@@ -143,12 +221,565 @@ class Transfer:
             Whether to ``chmod`` the remote file so it matches the local file's
             mode (default: ``True``).
 
-        :returns: A `.Result` object.
+        :param int stripes:
+            As with `get`: when above ``1`` and the local file is at least
+            ``transfer.stripe_threshold`` bytes, the remote file is
+            preallocated and written in that many parallel ranges, each over
+            its own pipelined SFTP channel.
+
+        :param int chunk_size:
+            Size, in bytes, of each write when striping; see `get`.
+
+        :param int prefetch:
+            Accepted for symmetry with `get`; writes are pipelined by
+            Paramiko itself.
+
+        :param skip_unchanged:
+            As with `get`, in the other direction: unchanged remote files are
+            left alone, large changed ones only have their differing blocks
+            rewritten (and are truncated to the local size), and the remote
+            modification time is set to the local one afterwards.
+
+        :returns:
+            A `.Result` object, whose ``bytes_transferred`` and
+            ``bytes_skipped`` report how much data was actually sent.
 
         .. versionadded:: 2.0
+        .. versionchanged:: 3.3
+            Added the ``stripes``, ``chunk_size``, ``prefetch`` and
+            ``skip_unchanged`` parameters.
+        """
+        ...
+    
+    def put_tree(self,
+        local: PathLike[str | bytes],
+        remote: PathLike[str | bytes] | None = None,
+        preserve_mode: bool = True,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        workers: int = 4,
+        progress: Callable[[str, int, int], Any] | None = None,
+        skip_unchanged: bool | Literal["mtime", "checksum"] = False
+    ) -> TreeResult:
+        """
+        Upload a local directory tree to the current connection.
+
+        The local tree is walked in the calling thread while ``workers``
+        threads, each with its own SFTP channel on the connection's transport,
+        upload the files found so far; transfers thus begin before the walk
+        is complete. Remote directories are created as they are reached,
+        before any of their files are queued.
+
+        :param str local:
+            Local directory to upload. Its *contents* end up in ``remote``.
+
+        :param str remote:
+            Remote directory to upload into; created if missing (as are any
+            subdirectories). Relative paths are relative to the remote working
+            directory. Default: the local directory's basename.
+
+        :param bool preserve_mode:
+            Whether to ``chmod`` remote files and directories so they match
+            their local counterparts (default: ``True``). New directories
+            whose mode would stop their owner from writing into them are
+            created writable, and only get their mode (deepest first) once
+            every file has been sent.
+
+        :param include:
+            Glob patterns (as per `fnmatch`) selecting which files to send,
+            matched against each file's ``/``-separated path relative to
+            ``local`` and against its basename. Default: ``None`` (all files).
+            Does not affect which directories are walked.
+
+        :param exclude:
+            Glob patterns, matched like ``include``, for files *and
+            directories* to skip; an excluded directory is not walked at all.
+            Wins over ``include``.
+
+        :param int workers:
+            Number of concurrent SFTP channels to transfer files over.
+            Default: ``4``.
+
+        :param progress:
+            Optional callable invoked as ``progress(relpath, transferred,
+            total)`` while each file is sent (see the ``callback`` argument of
+            `~paramiko.sftp_client.SFTPClient.put`).
+
+        :param skip_unchanged:
+            As for `put`, applied to each file. Existing remote directories
+            are listed once each to obtain the attributes to compare against.
+
+        :returns: A `.TreeResult` object.
+
+        :raises:
+            `~invoke.exceptions.ThreadException` wrapping any errors raised
+            by the transfer threads; no new files are started once one fails.
+
+        .. versionadded:: 3.3
+        """
+        ...
+    
+    def get_tree(self,
+        remote: PathLike[str | bytes],
+        local: PathLike[str | bytes] | None = None,
+        preserve_mode: bool = True,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        workers: int = 4,
+        progress: Callable[[str, int, int], Any] | None = None,
+        skip_unchanged: bool | Literal["mtime", "checksum"] = False
+    ) -> TreeResult:
+        """
+        Download a remote directory tree to the local filesystem.
+
+        The mirror image of `put_tree`: the remote tree is listed one
+        directory at a time (using ``listdir_attr``, so no per-file ``stat``
+        is needed) while ``workers`` SFTP channels download the files found
+        so far. Local directories are created as they are reached.
+
+        Symlinks to files are downloaded as regular files holding the
+        target's contents (their targets are looked up in one batch per
+        directory; see `.RemoteMetadataCache.stat_many`). Symlinks to
+        directories are not followed, since they may loop back into the
+        tree, and dangling symlinks have nothing to fetch: both are listed in
+        the result's `~.TreeResult.skipped` instead of failing the transfer.
+
+        :param str remote:
+            Remote directory to download. May be absolute, or relative to the
+            remote working directory.
+
+        :param str local:
+            Local directory to download into; its *contents* will match
+            ``remote``. Interpolated just like the ``local`` argument to
+            `get` (``{host}``, ``{user}``, ``{port}``, ``{dirname}`` and
+            ``{basename}``), and likewise has the remote directory's basename
+            appended if it ends in `os.sep`. Default: the remote directory's
+            basename, in the current working directory.
+
+        :param bool preserve_mode:
+            Whether to `os.chmod` local files and directories so they match
+            their remote counterparts (default: ``True``). As with
+            `put_tree`, directories stay writable by their owner until every
+            file has been fetched.
+
+        :param include: As for `put_tree`.
+        :param exclude: As for `put_tree`.
+        :param int workers: As for `put_tree`.
+        :param progress: As for `put_tree`.
+        :param skip_unchanged: As for `get`, applied to each file.
+
+        :returns: A `.TreeResult` object.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def put_archive(self,
+        local: PathLike[str | bytes],
+        remote: PathLike[str | bytes] | None = None,
+        preserve_mode: bool = True,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        compression: Literal["gz", "bz2", "xz"] | None = None,
+        progress: Callable[[str, int, int], Any] | None = None,
+    ) -> TreeResult:
+        """
+        Upload a local directory tree as a single tar stream.
+
+        Instead of SFTP requests per file, the tree is packed with `tarfile`
+        straight into an exec channel running ``tar -x`` on the remote end,
+        so packing, sending and unpacking overlap and no temporary archive
+        is written on either side. For trees of many small files this is
+        much faster than `put_tree`; it requires ``tar`` on the remote host,
+        and always rewrites every file.
+
+        Symbolic links are sent as links. Remote ownership is never set from
+        the archive.
+
+        :param str local: As for `put_tree`.
+        :param str remote: As for `put_tree`.
+
+        :param bool preserve_mode:
+            Whether remote files and directories get their local modes
+            (default: ``True``). Otherwise, they get the remote defaults.
+
+        :param include: As for `put_tree`.
+        :param exclude: As for `put_tree`.
+
+        :param str compression:
+            ``"gz"``, ``"bz2"`` or ``"xz"`` to compress the stream (locally,
+            with the standard library, and in the remote ``tar``), which
+            helps on slow links. Default: ``None``.
+
+        :param progress:
+            Optional callable invoked as ``progress(relpath, size, size)``
+            once each file has been packed.
+
+        :returns:
+            A `.TreeResult` object, whose ``archive_bytes`` is the size of the
+            (possibly compressed) stream sent.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` if the remote ``tar`` (or
+            creating ``remote``) fails. Local errors, such as a file vanishing
+            while the tree is packed, are raised as-is after closing the
+            channel, which stops the remote ``tar``.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def get_archive(self,
+        remote: PathLike[str | bytes],
+        local: PathLike[str | bytes] | None = None,
+        preserve_mode: bool = True,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        compression: Literal["gz", "bz2", "xz"] | None = None,
+        progress: Callable[[str, int, int], Any] | None = None,
+    ) -> TreeResult:
+        """
+        Download a remote directory tree as a single tar stream.
+
+        The mirror image of `put_archive`: the remote end runs ``tar -c``
+        over an exec channel, and the stream is unpacked locally with
+        `tarfile` as it arrives. Members which would land outside ``local``
+        are refused (and, where `tarfile` supports extraction filters, the
+        ``"data"`` filter is applied).
+
+        :param str remote: As for `get_tree`.
+        :param str local: As for `get_tree`.
+
+        :param bool preserve_mode:
+            Whether local files and directories get their remote modes and
+            modification times (default: ``True``). Directories get theirs
+            once the whole archive is extracted, deepest first, as with
+            `tarfile.TarFile.extractall`, so read-only ones can still be
+            filled.
+
+        :param include: As for `put_tree`.
+
+        :param exclude:
+            As for `put_tree`. Patterns without a ``/`` are also passed to
+            the remote ``tar`` as ``--exclude``, so matching files aren't
+            sent at all; other patterns are applied while unpacking.
+
+        :param str compression: As for `put_archive`.
+
+        :param progress:
+            Optional callable invoked as ``progress(relpath, size, size)``
+            once each file has been unpacked.
+
+        :returns:
+            A `.TreeResult` object, whose ``archive_bytes`` is the size of the
+            (possibly compressed) stream received.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` if the remote ``tar`` fails.
+            Local errors while unpacking are raised as-is after closing the
+            channel.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def relay(self,
+        target: Connection,
+        path: str,
+        remote: str | None = None,
+        mode: int | None = None,
+        checksum: str | None = None,
+    ) -> Result:
+        """
+        Copy a file from this connection's host straight to another host.
+
+        The data goes from host to host, not through the local machine: this
+        host runs the ``transfer.relay_command`` config value, which by
+        default is ``ssh -o BatchMode=yes -p {port} {user}@{host} {command} <
+        {path}``. The placeholders are filled from ``target`` and ``path``,
+        and ``{command}`` writes stdin to a temporary file next to the
+        destination, then renames it into place. This host must thus be able
+        to log into ``target`` without prompting, and already trust its host
+        key; e.g. via agent forwarding (``forward_agent``) or keys of its own.
+        Set the config value to use something else, such as ``scp`` or
+        ``rsync``, or a different address for ``target``.
+
+        Used by `.Group.put` when given a ``fanout``.
+
+        :param target: The `.Connection` to copy to.
+
+        :param str path: Absolute path of the file on this host.
+
+        :param str remote:
+            Destination on ``target``, interpreted as by `put`. Default:
+            ``path``'s basename, in the remote working directory.
+
+        :param int mode:
+            Mode to ``chmod`` the copy to, if given.
+
+        :param str checksum:
+            Expected `hash_algorithm` hex digest of the file; if given, the
+            copy is checked with `verify`.
+
+        :returns: A `.Result` whose ``connection`` is ``target``.
+
+        :raises:
+            `~invoke.exceptions.UnexpectedExit` if the relay command fails,
+            or `OSError` if the copy doesn't match ``checksum``.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def verify(self, remote: str, checksum: str) -> None:
+        """
+        Check a remote file's hash (from `hash_command`) against
+        ``checksum``, a `hash_algorithm` hex digest.
+
+        :raises:
+            `OSError` if they differ, or the file can't be hashed;
+            `ValueError` if `hash_command` doesn't print `hash_algorithm`
+            digests.
+
+        .. versionadded:: 3.3
         """
         ...
 
+    def _archive_failed(self,
+        channel: Channel,
+        command: str,
+        stream: _ChannelStream,
+    ) -> None: ...
+
+    def _check_archive_exit(self,
+        channel: Channel,
+        command: str,
+        stream: _ChannelStream,
+    ) -> None: ...
+    
+    def _get_path(self,
+        sftp: SFTPClient,
+        remote: str,
+        local: str,
+        remote_stat: SFTPAttributes | None,
+        preserve_mode: bool,
+        skip_unchanged: bool | str,
+        callback: Callable[[int, int], Any] | None = None,
+        stripes: int = 1,
+        chunk_size: int | None = None,
+        prefetch: int | None = None
+    ) -> tuple[int, int]: ...
+
+    def _put_path(self,
+        sftp: SFTPClient,
+        local: str,
+        remote: str,
+        remote_stat: SFTPAttributes | None,
+        preserve_mode: bool,
+        skip_unchanged: bool | str,
+        callback: Callable[[int, int], Any] | None = None,
+        stripes: int = 1,
+        chunk_size: int | None = None,
+        prefetch: int | None = None
+    ) -> tuple[int, int]: ...
+
+    def _download(self,
+        sftp: SFTPClient,
+        remote: str,
+        local: str,
+        size: int,
+        callback: Callable[[int, int], Any] | None = None
+    ) -> None: ...
+
+    def _remote_stat(self, path: str) -> SFTPAttributes | None: ...
+
+    def _unchanged(self,
+        local: str,
+        local_stat: stat_result | None,
+        remote: str,
+        remote_stat: SFTPAttributes | None,
+        mode: bool | str
+    ) -> bool: ...
+
+    def _should_delta(self, size: int, other_stat: stat_result | SFTPAttributes | None) -> bool: ...
+
+    @property
+    def hash_algorithm(self) -> str:
+        """
+        The `hashlib` algorithm name used for file digests, from the
+        ``transfer.hash_algorithm`` config value (default: ``"sha256"``).
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    @property
+    def hash_command(self) -> str:
+        """
+        The remote command printing a file's `hash_algorithm` digest: the
+        ``transfer.hash_command`` config value, or ``<algorithm>sum`` (e.g.
+        ``sha256sum``) when that is ``None`` (the default).
+
+        Its output is checked against the algorithm's digest length, so a
+        mismatched pair of settings raises `ValueError` instead of making
+        every comparison fail.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
+    def _check_digest(self, digest: str, path: str) -> str: ...
+
+    def _remote_hash(self, path: str) -> str | None: ...
+
+    def _remote_block_hashes(self, path: str, size: int, block_size: int) -> list[str] | None: ...
+
+    def _put_delta(self, sftp: SFTPClient, local: str, remote: str, size: int, remote_size: int) -> int: ...
+
+    def _get_delta(self, sftp: SFTPClient, remote: str, local: str, size: int) -> int: ...
+
+    def _stripe_settings(self,
+        stripes: int | None,
+        chunk_size: int | None,
+        prefetch: int | None
+    ) -> tuple[int, int, int]: ...
+    
+    def _should_stripe(self, size: int) -> bool: ...
+    
+    def _stripe_ranges(self, size: int, stripes: int, chunk_size: int) -> list[tuple[int, int]]: ...
+    
+    def _get_striped(self,
+        remote: str,
+        local: str,
+        size: int,
+        stripes: int,
+        chunk_size: int,
+        prefetch: int
+    ) -> None: ...
+    
+    def _get_range(self,
+        sftp: SFTPClient,
+        remote: str,
+        local: str,
+        start: int,
+        end: int,
+        chunk_size: int,
+        prefetch: int
+    ) -> None: ...
+    
+    def _put_striped(self,
+        local: str,
+        remote: str,
+        size: int,
+        stripes: int,
+        chunk_size: int,
+        prefetch: int
+    ) -> None: ...
+    
+    def _put_range(self,
+        sftp: SFTPClient,
+        local: str,
+        remote: str,
+        start: int,
+        end: int,
+        chunk_size: int
+    ) -> None: ...
+    
+    def _remote_mkdir(self, path: str, mode: int | None = None) -> bool: ...
+    
+    def _put_file(self,
+        sftp: SFTPClient,
+        local: str,
+        remote: str,
+        relpath: str,
+        remote_stat: SFTPAttributes | None,
+        preserve_mode: bool,
+        skip_unchanged: bool | str,
+        progress: Callable[[str, int, int], Any] | None
+    ) -> Result: ...
+    
+    def _get_file(self,
+        sftp: SFTPClient,
+        remote: str,
+        local: str,
+        relpath: str,
+        remote_stat: SFTPAttributes,
+        preserve_mode: bool,
+        skip_unchanged: bool | str,
+        progress: Callable[[str, int, int], Any] | None
+    ) -> Result: ...
+    
+    def _run_workers(self,
+        jobs: Iterable[tuple[Callable[..., Result | None], tuple[Any, ...]]],
+        workers: int
+    ) -> list[Result | None]: ...
+    
+    def _worker(self,
+        queue: Queue[tuple[Callable[..., Result], tuple[Any, ...]] | None],
+        failed: Event,
+        results: list[Result]
+    ) -> None: ...
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> None: ...
+
+
+_ARCHIVE_EXIT_TIMEOUT: float
+_BLOCK_HASH_SCRIPT: str
+_COMPRESSION_FLAGS: dict[str | None, str]
+_TAR_EXTRACT_OPTIONS: dict[bool, str]
+
+
+def _compression_flag(compression: str | None) -> str: ...
+
+
+class _ChannelStream:
+    """
+    Minimal file-like wrapper letting `tarfile` stream to or from a
+    `~paramiko.channel.Channel`, counting bytes as they pass.
+
+    `start` reads the channel's stderr in a background thread, keeping the
+    last ``stderr_limit`` bytes in ``stderr`` for error reports.
+    """
+
+    stderr_limit: int
+    channel: Channel
+    count: int
+    stderr: bytearray
+    stderr_done: Event
+
+    def __init__(self, channel: Channel) -> None: ...
+
+    def start(self) -> None: ...
+
+    def _drain_stderr(self) -> None: ...
+
+    def write(self, data: bytes) -> None: ...
+
+    def read(self, size: int) -> bytes: ...
+
+
+def _check_skip_unchanged(skip_unchanged: Any) -> None: ...
+
+
+def _hash(data: bytes, algorithm: str) -> str: ...
+
+
+def _file_hash(path: str, algorithm: str) -> str: ...
+
+
+def _restrictive(mode: int) -> bool: ...
+
+
+def _excluded(relpath: str, exclude: Iterable[str] | None) -> bool: ...
+
+
+def _selected(
+    relpath: str,
+    include: Iterable[str] | None,
+    exclude: Iterable[str] | None
+) -> bool: ...
+
 
 class Result:
     """
@@ -171,11 +802,79 @@ class Result:
     remote: PathLike[str | bytes]
     orig_remote: PathLike[str | bytes] | None
     connection: Connection
+    bytes_transferred: int | None
+    """
+    Bytes actually sent or received, or ``None`` when unknown (e.g. for
+    file-like objects).
+
+    .. versionadded:: 3.3
+    """
+    bytes_skipped: int | None
+    """
+    Bytes not sent because ``skip_unchanged`` found them already in place.
+
+    .. versionadded:: 3.3
+    """
+    timings: Timings | None
+    """
+    ``transfer``, the duration of the `.Transfer.get`, `.Transfer.put`,
+    `.Transfer.get_tree` or `.Transfer.put_tree` call, plus the connection's
+    `.Timings` if this is the first result since it opened; ``None`` for
+    the per-file results of a tree transfer.
+
+    .. versionadded:: 3.3
+    """
+    relayed_from: Connection | None
+    """
+    For `.Transfer.relay`, the `.Connection` the file was copied from (and
+    ``local`` is its path there); otherwise ``None``.
+
+    .. versionadded:: 3.3
+    """
 
     def __init__(self,
         local: PathLike[str | bytes] | IO[str | bytes],
         orig_local: PathLike[str | bytes] | IO[str | bytes] | None,
         remote: PathLike[str | bytes],
         orig_remote: PathLike[str | bytes] | None,
-        connection: Connection
-    ) -> None: ...
\ No newline at end of file
+        connection: Connection,
+        bytes_transferred: int | None = None,
+        bytes_skipped: int | None = None,
+        timings: Timings | None = None,
+        relayed_from: Connection | None = None
+    ) -> None: ...
+
+
+class TreeResult(Result):
+    """
+    A `.Result` for a whole-directory transfer (`.Transfer.put_tree`,
+    `.Transfer.get_tree`, `.Transfer.put_archive` or
+    `.Transfer.get_archive`).
+
+    ``local`` and ``remote`` are the roots of the transferred trees; ``files``
+    holds one `.Result` per transferred file (in completion order), whose
+    ``orig_local``/``orig_remote`` are the file's path relative to those
+    roots. ``bytes_transferred`` and ``bytes_skipped`` are totals over
+    ``files``.
+
+    .. versionadded:: 3.3
+    """
+
+    files: list[Result]
+    archive_bytes: int | None
+    """
+    For archive transfers, the size of the tar stream sent or received;
+    otherwise ``None``.
+    """
+    skipped: dict[str, str]
+    """
+    Relative paths of the entries which were left out, mapped to why (e.g.
+    ``"dangling symlink"``; see `.Transfer.get_tree`).
+    """
+
+    def __init__(self,
+        files: list[Result],
+        archive_bytes: int | None = None,
+        skipped: dict[str, str] | None = None,
+        **kwargs
+    ) -> None: ...
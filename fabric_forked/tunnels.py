@@ -1,13 +1,266 @@
 import select
+import selectors
 import socket
-import time
-from threading import Event
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
 
-from invoke.exceptions import ThreadException
 from invoke.util import ExceptionHandlingThread
 
+from .util import debug
 
-class TunnelManager(ExceptionHandlingThread):
+
+class TunnelLoop(ExceptionHandlingThread):
+    buffer_size = 256 * 1024
+    stall_interval = 0.01
+
+    def __init__(self, finished=None, buffer_size=None, open_workers=8):
+        super().__init__()
+        self.finished = Event() if finished is None else finished
+        if buffer_size is not None:
+            self.buffer_size = buffer_size
+        self.open_workers = open_workers
+        self._selector = selectors.DefaultSelector()
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(
+            self._wakeup, selectors.EVENT_READ, self._drain_wakeup
+        )
+        self._calls = deque()
+        self._listeners = []
+        self._pairs = set()
+        self._stalled = set()
+        self._errors = []
+        self._opener = None
+        self._lock = Lock()
+
+    def call_soon(self, func, *args):
+        self._calls.append((func, args))
+        self._wake()
+
+    def stop(self):
+        self.finished.set()
+        self._wake()
+
+    def add_listener(self, sock, open_channel):
+        sock.setblocking(False)
+        self.call_soon(self._add_listener, sock, open_channel)
+
+    def add_tunnel(self, channel, sock):
+        self.call_soon(self._add_pair, channel, sock)
+
+    def _wake(self):
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            pass
+
+    def _drain_wakeup(self, mask):
+        try:
+            while self._wakeup.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _run(self):
+        try:
+            while not self.finished.is_set():
+                while self._calls:
+                    func, args = self._calls.popleft()
+                    func(*args)
+                timeout = self.stall_interval if self._stalled else 1
+                for key, mask in self._selector.select(timeout):
+                    key.data(mask)
+                for pair in list(self._stalled):
+                    pair.flush_channel()
+        finally:
+            self._shutdown()
+        if self._errors:
+            raise self._errors[0]
+
+    def _shutdown(self):
+        if self._opener is not None:
+            self._opener.shutdown(wait=True)
+        for sock in self._listeners:
+            sock.close()
+        for pair in list(self._pairs):
+            pair.close()
+        while self._calls:
+            func, args = self._calls.popleft()
+            if func == self._add_pair:
+                for obj in args:
+                    obj.close()
+        self._selector.close()
+        self._wakeup.close()
+        self._waker.close()
+
+    def _add_listener(self, sock, open_channel):
+        self._listeners.append(sock)
+        self._selector.register(
+            sock,
+            selectors.EVENT_READ,
+            lambda mask: self._accept(sock, open_channel),
+        )
+
+    def _accept(self, listener, open_channel):
+        while True:
+            try:
+                sock, addr = listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self._opener is None:
+                self._opener = ThreadPoolExecutor(
+                    max_workers=self.open_workers,
+                    thread_name_prefix="fabric-tunnel",
+                )
+            self._opener.submit(self._open, open_channel, sock, addr)
+
+    def _open(self, open_channel, sock, addr):
+        try:
+            channel = open_channel(addr)
+        except Exception as e:
+            debug("Couldn't open tunnel channel: {!r}".format(e))
+            sock.close()
+            with self._lock:
+                self._errors.append(e)
+            return
+        self.add_tunnel(channel, sock)
+
+    def _add_pair(self, channel, sock):
+        if self.finished.is_set():
+            channel.close()
+            sock.close()
+            return
+        pair = TunnelPair(self, channel, sock)
+        self._pairs.add(pair)
+        pair.update()
+
+    def _set_events(self, fileobj, events, callback):
+        try:
+            key = self._selector.get_key(fileobj)
+        except KeyError:
+            key = None
+        if key is None:
+            if events:
+                self._selector.register(fileobj, events, callback)
+        elif not events:
+            self._selector.unregister(fileobj)
+        elif key.events != events:
+            self._selector.modify(fileobj, events, callback)
+
+
+class TunnelPair:
+    def __init__(self, loop, channel, sock):
+        self.loop = loop
+        self.channel = channel
+        self.sock = sock
+        self.buffer = bytearray(loop.buffer_size)
+        self.to_channel = None
+        self.to_sock = None
+        self.sock_eof = False
+        self.channel_eof = False
+        self.closed = False
+        channel.settimeout(0.0)
+        sock.setblocking(False)
+
+    def update(self):
+        if self.closed:
+            return
+        if (
+            self.sock_eof
+            and self.channel_eof
+            and self.to_channel is None
+            and self.to_sock is None
+        ):
+            self.close()
+            return
+        sock_events = 0
+        if not self.sock_eof and self.to_channel is None:
+            sock_events |= selectors.EVENT_READ
+        if self.to_sock is not None:
+            sock_events |= selectors.EVENT_WRITE
+        channel_events = 0
+        if not self.channel_eof and self.to_sock is None:
+            channel_events = selectors.EVENT_READ
+        self.loop._set_events(self.sock, sock_events, self.on_sock)
+        self.loop._set_events(self.channel, channel_events, self.on_channel)
+        if self.to_channel is not None:
+            self.loop._stalled.add(self)
+        else:
+            self.loop._stalled.discard(self)
+
+    def on_sock(self, mask):
+        try:
+            if mask & selectors.EVENT_WRITE:
+                self.flush_sock()
+            if mask & selectors.EVENT_READ and self.to_channel is None:
+                received = self.sock.recv_into(self.buffer)
+                if received:
+                    self.to_channel = memoryview(self.buffer)[:received]
+                    self.flush_channel()
+                else:
+                    self.sock_eof = True
+                    self.channel.shutdown_write()
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            debug("Closing tunnel after socket error: {!r}".format(e))
+            self.close()
+        self.update()
+
+    def on_channel(self, mask):
+        try:
+            data = self.channel.recv(self.loop.buffer_size)
+        except socket.timeout:
+            return
+        if data:
+            self.to_sock = memoryview(data)
+            self.flush_sock()
+        else:
+            self.channel_eof = True
+            try:
+                self.sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+        self.update()
+
+    def flush_channel(self):
+        while self.to_channel is not None and self.channel.send_ready():
+            if self.channel.closed:
+                self.close()
+                return
+            try:
+                sent = self.channel.send(self.to_channel)
+            except socket.timeout:
+                break
+            self.to_channel = self.to_channel[sent:] or None
+        self.update()
+
+    def flush_sock(self):
+        try:
+            while self.to_sock is not None:
+                sent = self.sock.send(self.to_sock)
+                self.to_sock = self.to_sock[sent:] or None
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            debug("Closing tunnel after socket error: {!r}".format(e))
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.loop._set_events(self.sock, 0, None)
+        self.loop._set_events(self.channel, 0, None)
+        self.loop._stalled.discard(self)
+        self.loop._pairs.discard(self)
+        self.channel.close()
+        self.sock.close()
+
+
+class TunnelManager(TunnelLoop):
     def __init__(
         self,
         local_host,
@@ -16,44 +269,25 @@ class TunnelManager(ExceptionHandlingThread):
         remote_port,
         transport,
         finished,
+        buffer_size=None,
     ):
-        super().__init__()
+        super().__init__(finished=finished, buffer_size=buffer_size)
         self.local_address = (local_host, local_port)
         self.remote_address = (remote_host, remote_port)
         self.transport = transport
-        self.finished = finished
 
     def _run(self):
-        tunnels = []
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        sock.setblocking(0)
         sock.bind(self.local_address)
-        sock.listen(1)
-        while not self.finished.is_set():
-            try:
-                tun_sock, local_addr = sock.accept()
-                tun_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            except BlockingIOError:
-                time.sleep(0.01)
-                continue
-            channel = self.transport.open_channel(
-                "direct-tcpip", self.remote_address, local_addr
-            )
-            finished = Event()
-            tunnel = Tunnel(channel=channel, sock=tun_sock, finished=finished)
-            tunnel.start()
-            tunnels.append(tunnel)
-        exceptions = []
-        for tunnel in tunnels:
-            tunnel.finished.set()
-            tunnel.join()
-            wrapper = tunnel.exception()
-            if wrapper:
-                exceptions.append(wrapper)
-        if exceptions:
-            raise ThreadException(exceptions)
-        sock.close()
+        sock.listen(socket.SOMAXCONN)
+        self.add_listener(sock, self.open_channel)
+        super()._run()
+
+    def open_channel(self, local_addr):
+        return self.transport.open_channel(
+            "direct-tcpip", self.remote_address, local_addr
+        )
 
 
 class Tunnel(ExceptionHandlingThread):
@@ -89,3 +323,23 @@ class Tunnel(ExceptionHandlingThread):
         if len(data) == 0:
             return True
         writer.sendall(data)
+
+
+class GatewayChannel:
+    def __init__(self, channel, slots):
+        self.channel = channel
+        self.slots = slots
+        self._released = False
+        self._lock = Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.channel, name)
+
+    def close(self):
+        try:
+            self.channel.close()
+        finally:
+            with self._lock:
+                if not self._released:
+                    self._released = True
+                    self.slots.release()
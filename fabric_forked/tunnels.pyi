@@ -5,34 +5,210 @@ If you're looking for simple, end-user-focused connection forwarding, please
 see `.Connection`, e.g. `.Connection.forward_local`.
 """
 
+import selectors
 import socket
-from threading import Event
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Event, Lock
 
 from paramiko import Transport, Channel
 from invoke.util import ExceptionHandlingThread
 
-from typing_extensions import Literal
+from typing_extensions import Any, Callable, Literal
 
 
-class TunnelManager(ExceptionHandlingThread):
+class TunnelLoop(ExceptionHandlingThread):
     """
-    Thread subclass for tunnelling connections over SSH between two endpoints.
+    Single-threaded, `selectors`-driven engine forwarding data between local
+    sockets and SSH channels.
 
-    Specifically, one instance of this class is sufficient to sit around
-    forwarding any number of individual connections made to one end of the
-    tunnel or the other. If you need to forward connections between more than
-    one set of ports, you'll end up instantiating multiple TunnelManagers.
+    One thread multiplexes any number of listening sockets and
+    socket/channel pairs (see `TunnelPair`), so a single forward can carry
+    hundreds of concurrent connections without a thread per connection.
+    Listeners are woken by the selector rather than polled, and new
+    ``direct-tcpip`` channels are opened on a small thread pool so slow
+    channel opens never stall data already flowing.
+
+    Methods other than `run` may be called from any thread; they hand their
+    work to the loop thread.
+
+    .. versionadded:: 3.3
+    """
+
+    buffer_size: int
+    """
+    Size of each pair's reusable socket read buffer, and of each channel
+    read. Default: 256 KiB.
+    """
+
+    stall_interval: float
+    """
+    How often, in seconds, to retry writes to channels whose SSH window is
+    full. Channels offer no file descriptor to wait on for that.
+    """
+
+    finished: Event
+    open_workers: int
+    _selector: selectors.BaseSelector
+    _wakeup: socket.socket
+    _waker: socket.socket
+    _calls: deque[tuple[Callable[..., Any], tuple[Any, ...]]]
+    _listeners: list[socket.socket]
+    _pairs: set[TunnelPair]
+    _stalled: set[TunnelPair]
+    _errors: list[Exception]
+    _opener: ThreadPoolExecutor | None
+    _lock: Lock
+
+    def __init__(self,
+        finished: Event | None = None,
+        buffer_size: int | None = None,
+        open_workers: int = 8
+    ) -> None:
+        """
+        :param finished:
+            `~threading.Event` which, once set, stops the loop. Prefer `stop`,
+            which also wakes the loop immediately.
+
+        :param int buffer_size: Overrides `buffer_size` when given.
+
+        :param int open_workers:
+            Number of threads used to open channels for newly accepted
+            connections. Default: ``8``.
+        """
+        ...
+
+    def call_soon(self, func: Callable[..., Any], *args: Any) -> None:
+        """
+        Run ``func(*args)`` on the loop thread at its next iteration.
+        """
+        ...
+
+    def stop(self) -> None:
+        """
+        Stop the loop, closing all listeners and tunnels.
+
+        Errors raised while opening channels are re-raised by the loop thread
+        once it has stopped (see `~invoke.util.ExceptionHandlingThread`).
+        """
+        ...
+
+    def add_listener(self,
+        sock: socket.socket,
+        open_channel: Callable[[tuple[str, int]], Channel]
+    ) -> None:
+        """
+        Serve a listening socket.
+
+        Every accepted connection is paired with the channel returned by
+        ``open_channel(client_address)``. If that raises, only that
+        connection is dropped.
+        """
+        ...
+
+    def add_tunnel(self, channel: Channel, sock: socket.socket) -> None:
+        """
+        Start forwarding between an already-connected socket and channel.
+        """
+        ...
+
+    def _wake(self) -> None: ...
+
+    def _drain_wakeup(self, mask: int) -> None: ...
+
+    def _run(self) -> None: ...
+
+    def _shutdown(self) -> None: ...
+
+    def _add_listener(self,
+        sock: socket.socket,
+        open_channel: Callable[[tuple[str, int]], Channel]
+    ) -> None: ...
+
+    def _accept(self,
+        listener: socket.socket,
+        open_channel: Callable[[tuple[str, int]], Channel]
+    ) -> None: ...
+
+    def _open(self,
+        open_channel: Callable[[tuple[str, int]], Channel],
+        sock: socket.socket,
+        addr: tuple[str, int]
+    ) -> None: ...
+
+    def _add_pair(self, channel: Channel, sock: socket.socket) -> None: ...
+
+    def _set_events(self,
+        fileobj: socket.socket | Channel,
+        events: int,
+        callback: Callable[[int], None] | None
+    ) -> None: ...
+
+
+class TunnelPair:
+    """
+    One socket/channel pair forwarded by a `TunnelLoop`.
+
+    Data read from the socket goes into a reusable buffer and is only read
+    again once the channel has accepted all of it. Data read from the channel
+    is likewise drained into the socket before more is read. A slow reader on
+    either side thus pushes back on its writer (via TCP or the SSH window)
+    instead of queueing data in memory. End-of-file is forwarded as a
+    half-close; the pair is closed once both directions are done, or on a
+    socket error.
+
+    .. versionadded:: 3.3
+    """
+
+    loop: TunnelLoop
+    channel: Channel
+    sock: socket.socket
+    buffer: bytearray
+    to_channel: memoryview | None
+    to_sock: memoryview | None
+    sock_eof: bool
+    channel_eof: bool
+    closed: bool
+
+    def __init__(self, loop: TunnelLoop, channel: Channel, sock: socket.socket) -> None: ...
+
+    def update(self) -> None:
+        """
+        (Re)register interest in whichever events can make progress.
+        """
+        ...
+
+    def on_sock(self, mask: int) -> None: ...
+
+    def on_channel(self, mask: int) -> None: ...
+
+    def flush_channel(self) -> None: ...
+
+    def flush_sock(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class TunnelManager(TunnelLoop):
+    """
+    Tunnel loop serving one local listening port, for
+    `.Connection.forward_local`.
+
+    Binds ``local_host:local_port`` and forwards each connection made to it
+    over a new ``direct-tcpip`` channel to ``remote_host:remote_port``.
 
     Wraps a `~paramiko.transport.Transport`, which should already be connected
     to the remote server.
 
     .. versionadded:: 2.0
+    .. versionchanged:: 3.3
+        Rebuilt on `TunnelLoop`: connections are forwarded by the manager's
+        own thread instead of one `Tunnel` thread each.
     """
     
     local_address: tuple[str, int]
     remote_address: tuple[str, int]
     transport: Transport
-    finished: Event
 
     def __init__(self,
         local_host: str,
@@ -41,16 +217,28 @@ class TunnelManager(ExceptionHandlingThread):
         remote_port: int,
         transport: Transport,
         finished: Event,
+        buffer_size: int | None = None,
     ) -> None:
         ...
 
     def _run(self) -> None: ...
 
+    def open_channel(self, local_addr: tuple[str, int]) -> Channel:
+        """
+        Open a ``direct-tcpip`` channel to the remote address.
+
+        .. versionadded:: 3.3
+        """
+        ...
+
 
 class Tunnel(ExceptionHandlingThread):
     """
     Bidirectionally forward data between an SSH channel and local socket.
 
+    .. note::
+        No longer used by Fabric itself, which forwards via `TunnelLoop`.
+
     .. versionadded:: 2.0
     """
     
@@ -73,3 +261,26 @@ class Tunnel(ExceptionHandlingThread):
         .. versionadded:: 2.0
         """
         ...
+
+
+class GatewayChannel:
+    """
+    Socket-like wrapper for a gateway ``direct-tcpip`` channel.
+
+    Delegates everything to the wrapped `~paramiko.channel.Channel`, and
+    releases one of its gateway's channel slots (see
+    `.Connection.open_gateway`) the first time it is closed.
+
+    .. versionadded:: 3.3
+    """
+
+    channel: Channel
+    slots: BoundedSemaphore
+    _released: bool
+    _lock: Lock
+
+    def __init__(self, channel: Channel, slots: BoundedSemaphore) -> None: ...
+
+    def __getattr__(self, name: str) -> Any: ...
+
+    def close(self) -> None: ...
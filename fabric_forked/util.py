@@ -3,7 +3,7 @@ import sys
 
 
 log = logging.getLogger("fabric")
-for x in ("debug",):
+for x in ("debug", "warning"):
     globals()[x] = getattr(log, x)
 
 
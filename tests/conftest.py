@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.server import Server
+from fabric_forked import Connection
+
+
+@pytest.fixture
+def server():
+    with Server() as server:
+        yield server
+
+
+@pytest.fixture
+def cxn(server):
+    cxn = Connection(
+        "user@{}".format(server.host), connect_kwargs={"password": "x"}
+    )
+    yield cxn
+    cxn.close()
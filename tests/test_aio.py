@@ -0,0 +1,44 @@
+import asyncio
+
+from fabric_forked.aio import AsyncConnection
+
+
+def _run(cxn, *commands, **kwargs):
+    async def main():
+        acxn = AsyncConnection(connection=cxn)
+        return [await acxn.run(x, hide=True, **kwargs) for x in commands]
+
+    return asyncio.run(main())
+
+
+class TestAsyncRun:
+    def test_records_timings_like_connection_run(self, cxn):
+        phases = []
+        cxn.config.timings.hooks = [
+            lambda cxn, phase, start, end: phases.append(phase)
+        ]
+        first, second = _run(cxn, "echo one", "echo two")
+        assert first.stdout == "one\n"
+        assert {"connect", "channel", "command", "drain"} <= set(first.timings)
+        assert "connect" not in second.timings
+        assert {"channel", "command", "drain"} <= set(second.timings)
+        assert phases.count("connect") == 1
+        assert phases.count("command") == 2
+
+    def test_invalidates_remote_metadata(self, cxn):
+        metadata = cxn.remote_metadata()
+        metadata.cwd()
+        assert metadata._cwd is not None
+        _run(cxn, "true")
+        assert metadata._cwd is None
+
+    def test_reads_in_threads_without_add_reader(self, cxn, monkeypatch):
+        def add_reader(self, fd, callback, *args):
+            raise NotImplementedError
+
+        monkeypatch.setattr(
+            asyncio.SelectorEventLoop, "add_reader", add_reader
+        )
+        (result,) = _run(cxn, "echo out; echo err >&2; exit 3", warn=True)
+        assert (result.stdout, result.stderr) == ("out\n", "err\n")
+        assert result.exited == 3
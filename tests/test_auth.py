@@ -0,0 +1,58 @@
+import pytest
+from paramiko.config import SSHConfig
+
+from fabric_forked import Config
+from fabric_forked.auth import KeyCache, OpenSSHAuthStrategy, SharedAgent
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    monkeypatch.delenv("SSH_AUTH_SOCK", raising=False)
+    closed = []
+    monkeypatch.setattr(SharedAgent, "close", lambda self: closed.append(self))
+    return closed
+
+
+class TestKeyCacheAgent:
+    def test_shares_agent_within_ttl(self, closed):
+        cache = KeyCache()
+        first, second = cache.agent(60), cache.agent(60)
+        assert first is second
+        cache.release(first)
+        cache.release(second)
+        assert closed == []
+        cache.clear()
+        assert closed == [first]
+
+    def test_replaced_agent_closes_after_last_release(self, closed):
+        cache = KeyCache()
+        old = cache.agent(1e-9)
+        new = cache.agent(1e-9)
+        assert new is not old
+        assert closed == []
+        cache.release(old)
+        assert closed == [old]
+        cache.release(new)
+        assert closed == [old]
+
+    def test_unused_agent_closes_when_replaced(self, closed):
+        cache = KeyCache()
+        old = cache.agent(1e-9)
+        cache.release(old)
+        assert closed == []
+        cache.agent(1e-9)
+        assert closed == [old]
+
+    def test_strategies_release_their_agent_once(self, closed, monkeypatch):
+        monkeypatch.setattr(OpenSSHAuthStrategy, "key_cache", KeyCache())
+        config = Config(overrides={"authentication": {"agent_ttl": 60}})
+        first, second = [
+            OpenSSHAuthStrategy(SSHConfig(), config, "user") for _ in "ab"
+        ]
+        assert first.agent is second.agent
+        first.close()
+        first.close()
+        OpenSSHAuthStrategy.key_cache.clear()
+        assert closed == []
+        second.close()
+        assert closed == [second.agent]
@@ -0,0 +1,58 @@
+import pytest
+
+from fabric_forked import Config, Connection, clear_gateway_cache
+from fabric_forked import connection as connection_module
+
+
+@pytest.fixture
+def jump_config(server, tmp_path):
+    ssh_config = tmp_path / "ssh_config"
+    ssh_config.write_text(
+        "Host target other\n"
+        "  HostName 127.0.0.1\n"
+        "  Port {0}\n"
+        "  ProxyJump user@localhost:{0}\n".format(server.port)
+    )
+    config = Config(
+        runtime_ssh_path=str(ssh_config),
+        overrides={
+            "proxy_jump": {"shared": True},
+            "connect_kwargs": {"password": "x"},
+        },
+    )
+    yield config
+    clear_gateway_cache()
+
+
+def _cached_gateways():
+    return [cxn for cxn, _ in connection_module._gateways.values()]
+
+
+class TestSharedGateways:
+    def test_shared_while_any_user_is_open(self, jump_config):
+        a = Connection("user@target", config=jump_config)
+        b = Connection("user@other", config=jump_config)
+        assert a.gateway is b.gateway
+        a.run("true", hide=True, in_stream=False)
+        b.run("true", hide=True, in_stream=False)
+        gateway = a.gateway
+        a.close()
+        assert gateway.is_connected
+        b.close()
+        assert not gateway.is_connected
+        assert _cached_gateways() == []
+
+    def test_reopen_takes_gateway_from_cache_again(self, jump_config):
+        cxn = Connection("user@target", config=jump_config)
+        cxn.run("true", hide=True, in_stream=False)
+        first = cxn.gateway
+        cxn.close()
+        assert not first.is_connected
+        cxn.run("true", hide=True, in_stream=False)
+        assert _cached_gateways() == [cxn.gateway]
+        other = Connection("user@other", config=jump_config)
+        assert other.gateway is cxn.gateway
+        other.close()
+        cxn.close()
+        assert not cxn.gateway.is_connected
+        assert _cached_gateways() == []
@@ -0,0 +1,41 @@
+from invoke import Call, Collection, Task
+
+from fabric_forked import Connection, Executor
+from fabric_forked.group import GroupResult
+from fabric_forked.tasks import ConnectionCall
+
+
+def _fail(c):
+    raise RuntimeError("boom")
+
+
+class TestFailureReport:
+    def test_hosts_differing_only_by_port_get_distinct_labels(self):
+        executor = Executor(Collection())
+        task = Task(_fail, name="deploy")
+        calls = [
+            ConnectionCall(task, init_kwargs=dict(host="web1", port=port))
+            for port in (2201, 2202)
+        ]
+        results = GroupResult()
+        labels = {}
+        for call in calls:
+            cxn = Connection(**call.init_kwargs)
+            results[cxn] = RuntimeError("boom")
+            labels[cxn] = executor.host_label(call)
+        report = executor.failure_report(Call(task), results, labels)
+        assert "  web1:2201: RuntimeError: boom" in report.splitlines()
+        assert "  web1:2202: RuntimeError: boom" in report.splitlines()
+
+    def test_unlabeled_connections_include_user_and_port(self):
+        executor = Executor(Collection())
+        results = GroupResult()
+        for port in (2201, 2202):
+            results[Connection("deploy@web1", port=port)] = RuntimeError("x")
+        report = executor.failure_report(
+            Call(Task(_fail, name="deploy")), results
+        )
+        assert report.splitlines()[1:] == [
+            "  deploy@web1:2201: RuntimeError: x",
+            "  deploy@web1:2202: RuntimeError: x",
+        ]
@@ -0,0 +1,106 @@
+import os
+
+
+def _tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "file").write_text("data")
+    return src
+
+
+class TestGetTree:
+    def test_follows_symlinks_to_files(self, cxn, tmp_path):
+        src = _tree(tmp_path)
+        os.symlink(src / "file", src / "link")
+        result = cxn.get_tree(str(src), str(tmp_path / "dst"))
+        link = tmp_path / "dst" / "link"
+        assert not link.is_symlink()
+        assert link.read_text() == "data"
+        assert result.skipped == {}
+
+    def test_skips_symlinks_to_directories(self, cxn, tmp_path):
+        src = _tree(tmp_path)
+        os.symlink(src / "sub", src / "dirlink")
+        # Would loop forever if followed.
+        os.symlink(src, src / "sub" / "up")
+        result = cxn.get_tree(str(src), str(tmp_path / "dst"))
+        assert (tmp_path / "dst" / "file").read_text() == "data"
+        assert not (tmp_path / "dst" / "dirlink").exists()
+        assert result.skipped == {
+            "dirlink": "symlink to a directory",
+            "sub/up": "symlink to a directory",
+        }
+
+    def test_skips_dangling_symlinks(self, cxn, tmp_path):
+        src = _tree(tmp_path)
+        os.symlink(src / "missing", src / "dangling")
+        result = cxn.get_tree(str(src), str(tmp_path / "dst"))
+        assert (tmp_path / "dst" / "file").read_text() == "data"
+        assert not (tmp_path / "dst" / "dangling").exists()
+        assert result.skipped == {"dangling": "dangling symlink"}
+        assert [x.orig_remote for x in result.files] == ["file"]
+
+    def test_skipped_links_honor_exclude(self, cxn, tmp_path):
+        src = _tree(tmp_path)
+        os.symlink(src / "missing", src / "dangling")
+        result = cxn.get_tree(
+            str(src), str(tmp_path / "dst"), exclude=["dangling"]
+        )
+        assert result.skipped == {}
+
+
+def _read_only_tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "ro" / "inner").mkdir(parents=True)
+    (src / "ro" / "inner" / "file").write_text("data")
+    (src / "ro" / "file").write_text("data")
+    os.chmod(src / "ro" / "inner", 0o555)
+    os.chmod(src / "ro", 0o500)
+    return src
+
+
+def _restore(*paths):
+    for path in paths:
+        for dirpath, dirnames, _ in os.walk(path):
+            os.chmod(dirpath, 0o755)
+
+
+class TestTreeDirectoryModes:
+    def test_put_tree_applies_read_only_modes_last(self, cxn, tmp_path):
+        src = _read_only_tree(tmp_path)
+        dst = tmp_path / "dst"
+        try:
+            cxn.put_tree(str(src), str(dst))
+            assert (dst / "ro" / "inner" / "file").read_text() == "data"
+            assert os.stat(dst / "ro").st_mode & 0o777 == 0o500
+            assert os.stat(dst / "ro" / "inner").st_mode & 0o777 == 0o555
+        finally:
+            _restore(src, dst)
+
+    def test_get_tree_applies_read_only_modes_last(self, cxn, tmp_path):
+        src = _read_only_tree(tmp_path)
+        dst = tmp_path / "dst"
+        try:
+            cxn.get_tree(str(src), str(dst))
+            assert (dst / "ro" / "inner" / "file").read_text() == "data"
+            assert os.stat(dst / "ro").st_mode & 0o777 == 0o500
+            assert os.stat(dst / "ro" / "inner").st_mode & 0o777 == 0o555
+            # Rerunning into the read-only copy works too.
+            cxn.get_tree(str(src), str(dst))
+        finally:
+            _restore(src, dst)
+
+
+class TestArchiveDirectoryModes:
+    def test_get_archive_applies_read_only_modes_last(self, cxn, tmp_path):
+        src = _read_only_tree(tmp_path)
+        dst = tmp_path / "dst"
+        try:
+            result = cxn.get_archive(str(src), str(dst))
+            assert (dst / "ro" / "inner" / "file").read_text() == "data"
+            assert os.stat(dst / "ro").st_mode & 0o777 == 0o500
+            assert os.stat(dst / "ro" / "inner").st_mode & 0o777 == 0o555
+            assert len(result.files) == 2
+            cxn.get_archive(str(src), str(dst))
+        finally:
+            _restore(src, dst)